@@ -0,0 +1,120 @@
+"""Guild picker autocomplete of the blacklist commands, linear scan against GuildPickers.
+
+Run with ``python -m benchmarks.autocomplete`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import timeit
+from types import SimpleNamespace
+from typing import Dict, List
+
+from discord.app_commands import Choice
+
+from utils.database.connection import DatabaseConnection
+from utils.extra import ChatType, FilterType
+
+
+def random_name() -> str:
+    words = ["".join(random.choices(string.ascii_letters, k=random.randint(3, 9))) for _ in range(random.randint(1, 4))]
+    return " ".join(words)
+
+
+def legacy_blacklist_autocomplete(db: DatabaseConnection, guild_id: int, current: str) -> List[Choice]:
+    # what blacklist_guild_autocomplete did before the index.
+    records = [record for record in db.global_chats if record.guild and record.server_id != guild_id]
+
+    guilds: list[Choice] = [Choice(name=f"{record.guild}", value=str(record.server_id)) for record in records]
+    startswith: list[Choice] = [choices for choices in guilds if choices.name.startswith(current)]
+
+    if not (current and startswith):
+        return guilds[0:25]
+
+    return startswith[0:25]
+
+
+def legacy_unblacklist_autocomplete(db: DatabaseConnection, guild_id: int, current: str) -> List[Choice]:
+    records = [
+        record
+        for record in db.blacklists
+        if isinstance(record.entity, SimpleNamespace) and record.server_id == guild_id
+    ]
+
+    guilds: list[Choice] = [Choice(name=f"{record.entity.name}", value=str(record.entity_id)) for record in records]
+    startswith: list[Choice] = [choices for choices in guilds if choices.name.startswith(current)]
+
+    if not (current and startswith):
+        return guilds[0:25]
+
+    return startswith[0:25]
+
+
+def indexed_blacklist_autocomplete(db: DatabaseConnection, guild_id: int, current: str) -> List[Choice]:
+    guilds = db.guild_pickers.search_global_chats(current, exclude=guild_id)
+    if current and not guilds:
+        guilds = db.guild_pickers.search_global_chats("", exclude=guild_id)
+    return [Choice(name=name, value=str(server_id)) for server_id, name in guilds]
+
+
+def indexed_unblacklist_autocomplete(db: DatabaseConnection, guild_id: int, current: str) -> List[Choice]:
+    guilds = db.guild_pickers.search_blacklisted(guild_id, current)
+    if current and not guilds:
+        guilds = db.guild_pickers.search_blacklisted(guild_id, "")
+    return [Choice(name=name, value=str(server_id)) for server_id, name in guilds]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guilds", type=int, default=5000)
+    parser.add_argument("--blacklists", type=int, default=50_000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    guilds: Dict[int, SimpleNamespace] = {}
+    for _ in range(args.guilds):
+        guild_id = random.getrandbits(60)
+        guilds[guild_id] = SimpleNamespace(id=guild_id, name=random_name(), get_member=lambda _: None)
+    guild_ids = list(guilds)
+
+    bot = SimpleNamespace(get_guild=guilds.get, get_user=lambda _: None)
+    db = DatabaseConnection(bot, "")  # type: ignore # only the caches are used
+    db._load_global_chats((guild_id, random.getrandbits(60), None, ChatType.public.value) for guild_id in guild_ids)
+
+    # one busy server blacklisted many guilds, the rest a few users and guilds each.
+    busy = guild_ids[0]
+    rows = []
+    for row_id in range(args.blacklists):
+        server_id = busy if row_id % 10 == 0 else random.choice(guild_ids)
+        if random.random() < 0.3:
+            rows.append(
+                (row_id, server_id, random.choice(guild_ids), True, False, False, FilterType.server, None, False)
+            )
+        else:
+            rows.append((row_id, server_id, random.getrandbits(60), True, False, False, FilterType.user, None, False))
+    db._load_blacklists(rows)
+    print(f"{len(guilds)} guilds, {len(db.guild_pickers.blacklisted.get(busy, ()))} blacklisted by the busiest")
+
+    sample = guilds[guild_ids[7]].name
+    queries = {"empty": "", "one letter": sample[:1], "prefix": sample[:4], "substring": sample[2:6], "none": "zzzzzz"}
+
+    kinds = (
+        ("blacklist", legacy_blacklist_autocomplete, indexed_blacklist_autocomplete),
+        ("unblacklist", legacy_unblacklist_autocomplete, indexed_unblacklist_autocomplete),
+    )
+    print(f"{'picker':>12} {'query':>11} {'scan (ms)':>10} {'index (ms)':>10} {'matches':>8}")
+    for kind, legacy, indexed in kinds:
+        for label, query in queries.items():
+            scan = timeit.timeit(lambda: legacy(db, busy, query), number=max(args.number // 20, 1))
+            index = timeit.timeit(lambda: indexed(db, busy, query), number=args.number)
+            print(
+                f"{kind:>12} {label:>11} {scan / max(args.number // 20, 1) * 1000:>10.3f} "
+                f"{index / args.number * 1000:>10.3f} {len(indexed(db, busy, query)):>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Blacklist lookups per relayed message, linear scan against BlacklistIndex.
+
+Run with ``python -m benchmarks.blacklist`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+
+from utils.database.connection import DatabaseConnection
+from utils.database.models import Blacklist
+from utils.extra import ChatType, FilterType
+
+
+def seed(db: DatabaseConnection, rows: int, servers: list[int]) -> None:
+    for row_id in range(rows):
+        blacklist_type = random.choice((FilterType.user, FilterType.server))
+        entity_id = random.choice(servers[1:]) if blacklist_type is FilterType.server else random.getrandbits(60)
+        global_ban = blacklist_type is FilterType.user and random.random() < 0.01
+        data = {
+            "id": row_id,
+            "server_id": 0 if global_ban else random.choice(servers),
+            "entity_id": entity_id,
+            "pub": True,
+            "dev": random.random() > 0.5,
+            "private": False,
+            "blacklist_type": blacklist_type.value,
+            "reason": None,
+            "repeat": False,
+        }
+        db._store_blacklist(Blacklist(db, data))  # type: ignore # dicts are fine here
+
+
+def legacy_lookup(db: DatabaseConnection, servers: list[int], guild_id: int, author_id: int) -> list[int]:
+    # what global_chat_handler did before the index.
+    blacklisted_servers = [
+        record.entity_id
+        for record in db.blacklists
+        if not record._global and record.blacklist_type.server and record.server_id == guild_id and record.pub
+    ]
+    if db.get_blacklist(0, author_id) or db.get_blacklist(0, guild_id) or db.get_blacklist(guild_id, author_id):
+        return []
+
+    return [
+        server_id
+        for server_id in servers
+        if server_id not in blacklisted_servers
+        and not db.get_blacklist(server_id, author_id)
+        and not db.get_blacklist(server_id, guild_id)
+    ]
+
+
+def indexed_lookup(db: DatabaseConnection, servers: list[int], guild_id: int, author_id: int) -> list[int]:
+    if db.blacklist_index.is_blacklisted(guild_id, author_id):
+        return []
+
+    excluded = db.blacklist_index.excluded_servers(guild_id, author_id, ChatType.public)
+    return [server_id for server_id in servers if server_id not in excluded]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--servers", type=int, default=500)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    servers = [random.getrandbits(60) for _ in range(args.servers)]
+    db = DatabaseConnection(None, "")  # type: ignore # no bot or database needed
+
+    seed_time = timeit.timeit(lambda: seed(db, args.rows, servers), number=1)
+    print(f"seeded {len(db.blacklists)} rows in {seed_time * 1000:.1f} ms")
+
+    guild_id, author_id = servers[0], random.getrandbits(60)
+    # one server blacklisted the author, so the result isn't every server.
+    author_blacklist = {
+        "id": args.rows,
+        "server_id": servers[1],
+        "entity_id": author_id,
+        "pub": True,
+        "dev": False,
+        "private": False,
+        "blacklist_type": FilterType.user.value,
+        "reason": None,
+        "repeat": False,
+    }
+    db._store_blacklist(Blacklist(db, author_blacklist))  # type: ignore # dicts are fine here
+    expected = legacy_lookup(db, servers, guild_id, author_id)
+    assert expected == indexed_lookup(db, servers, guild_id, author_id)
+    print(f"{len(expected)} of {len(servers)} servers receive the message")
+
+    for name, lookup in (("linear scan", legacy_lookup), ("BlacklistIndex", indexed_lookup)):
+        seconds = timeit.timeit(lambda: lookup(db, servers, guild_id, author_id), number=args.number)
+        print(f"{name:>15}: {seconds / args.number * 1000:.3f} ms per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""How long blacklist changes made by one process take to reach the cache of another.
+
+Needs a Postgres database migrated like the bot's, given by ``DB_key``. The follower installs
+the notify triggers like a bot with ``DB_LISTEN``. The rows it adds use server ID 1 and are
+removed again. ``tests/test_cache_sync.py`` checks the same without timing it.
+Run with ``python -m benchmarks.cache_sync`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+
+from utils.database.connection import DatabaseConnection
+
+SERVER_ID = 1
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[max(0, int(len(values) * fraction) - 1)]
+
+
+async def follow(dsn: str, entities: int, ready, results) -> None:
+    db = DatabaseConnection(None, dsn)  # type: ignore # models don't need the bot here
+    await db.create_connection()
+    await db.listen()
+    await db.warm_up()
+    ready.set()
+
+    seen: dict[int, float] = {}
+    gone: dict[int, float] = {}
+    deadline = time.monotonic() + 60
+    while len(gone) < entities and time.monotonic() < deadline:
+        for entity_id in range(2, entities + 2):
+            blacklisted = db.get_blacklist(SERVER_ID, entity_id) is not None
+            if blacklisted and entity_id not in seen:
+                seen[entity_id] = time.time()
+            elif not blacklisted and entity_id in seen and entity_id not in gone:
+                gone[entity_id] = time.time()
+        await asyncio.sleep(0.001)
+
+    results.put((seen, gone))
+    await db.close()
+
+
+def follower(dsn: str, entities: int, ready, results) -> None:
+    asyncio.run(follow(dsn, entities, ready, results))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=200)
+    args = parser.parse_args()
+
+    dsn = os.environ["DB_key"]
+    ready, results = multiprocessing.Event(), multiprocessing.Queue()
+    process = multiprocessing.Process(target=follower, args=(dsn, args.entities, ready, results))
+    process.start()
+    await asyncio.to_thread(ready.wait)
+
+    db = DatabaseConnection(None, dsn)  # type: ignore
+    await db.create_connection()
+
+    added: dict[int, float] = {}
+    for entity_id in range(2, args.entities + 2):
+        added[entity_id] = time.time()
+        await db.add_blacklist(SERVER_ID, entity_id, pub=True, reason="cache sync benchmark")
+
+    removed: dict[int, float] = {}
+    for entity_id in range(2, args.entities + 2):
+        removed[entity_id] = time.time()
+        await db.remove_blacklist(SERVER_ID, entity_id)
+
+    seen, gone = await asyncio.to_thread(results.get)
+    process.join()
+    await db.close()
+
+    for label, sent, received in (("insert", added, seen), ("delete", removed, gone)):
+        lags = [(received[key] - sent[key]) * 1000 for key in received if key in sent]
+        if not lags:
+            print(f"{label}: no changes arrived")
+            continue
+        print(
+            f"{label}: {len(lags)}/{len(sent)} arrived, p50 {statistics.median(lags):.1f} ms, "
+            f"p99 {percentile(lags, 0.99):.1f} ms, max {max(lags):.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
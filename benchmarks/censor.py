@@ -0,0 +1,86 @@
+"""CensorEngine against the profanity.censor, censor_link and censor_invite chain.
+
+Checks that both give the same output on a generated corpus before timing them.
+Run with ``python -m benchmarks.censor`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import timeit
+
+from better_profanity import profanity
+
+import utils
+from utils.censor import CensorEngine
+
+FILLER = ["hello", "world", "global", "chat", "Sincroni", "class", "assume", "hell0", "grape", "tits-up", "ünïcødé"]
+SEPARATORS = [" ", " ", " ", ", ", ". ", "!", "?? ", "-", "_", "\n", " :) ", "... ", "🎉", " - "]
+LINKS = ["https://example.com/path?q=1", "discord.gg/abcdef", "https://discord.com/invite/xyz", "http://a.b/c"]
+
+
+def legacy_censor(text: str) -> str:
+    # what the cogs did before CensorEngine.
+    text = profanity.censor(text, censor_char="#")
+    text = utils.censor_link(text)
+    return utils.censor_invite(text)
+
+
+def vary(word: str) -> str:
+    chars = []
+    for char in word:
+        if char in profanity.CHARS_MAPPING and random.random() < 0.3:
+            char = random.choice(profanity.CHARS_MAPPING[char])
+        chars.append(char.upper() if random.random() < 0.2 else char)
+    return "".join(chars)
+
+
+def make_message(swear_words: list[str], words: int) -> str:
+    parts = [random.choice(["", "", "> ", "**", "  "])]
+    for _ in range(words):
+        roll = random.random()
+        if roll < 0.15:
+            parts.append(vary(random.choice(swear_words)))
+        elif roll < 0.2:
+            parts.append(random.choice(LINKS))
+        else:
+            parts.append(random.choice(FILLER))
+        parts.append(random.choice(SEPARATORS))
+
+    if random.random() < 0.5:
+        parts.pop()
+    return "".join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", type=int, default=2000, help="messages to compare")
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    profanity.add_censor_words(["balls", "ballss", "ʙᴀʟʟꜱ", "kys"])
+    engine = CensorEngine(profanity)
+    swear_words = [str(word) for word in profanity.CENSOR_WORDSET]
+
+    corpus = [make_message(swear_words, random.randint(0, 30)) for _ in range(args.corpus)]
+    corpus += ["", "a", "ab", "!", "a!", "!a", "kys", "kys!", " balls", "son of a bitch", "s.o.b. hi", "2 girls 1 cup"]
+    for text in corpus:
+        expected = legacy_censor(text)
+        assert engine.censor(text) == expected, (text, expected, engine.censor(text))
+    print(f"identical output on {len(corpus)} messages")
+
+    for label, words in (("short", 10), ("medium", 60), ("long (~2000 chars)", 300)):
+        messages = [make_message(swear_words, words) for _ in range(20)]
+        legacy = timeit.timeit(lambda: [legacy_censor(text) for text in messages], number=args.number)
+        compiled = timeit.timeit(lambda: [engine.censor(text) for text in messages], number=args.number)
+        per_message = args.number * len(messages)
+        print(
+            f"{label:>18}: chain {legacy / per_message * 1000:8.3f} ms, "
+            f"CensorEngine {compiled / per_message * 1000:8.3f} ms ({legacy / compiled:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Delivery latency of FanOut against a fake webhook server.
+
+Run with ``python -m benchmarks.fanout`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+
+from aiohttp import ClientSession, TCPConnector, web
+
+from utils.delivery import FanOut
+
+
+async def start_fake_webhook_server(latency: float, port: int) -> web.AppRunner:
+    async def execute_webhook(request: web.Request) -> web.Response:
+        await request.read()
+        await asyncio.sleep(latency)
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post("/api/webhooks/{webhook_id}/{token}", execute_webhook)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the fake webhook takes to respond")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--destinations", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 25, 50])
+    args = parser.parse_args()
+
+    runner = await start_fake_webhook_server(args.latency, args.port)
+    base_url = f"http://127.0.0.1:{args.port}/api/webhooks"
+
+    async with ClientSession(connector=TCPConnector(limit=0)) as session:
+
+        async def deliver(destination: int) -> bool:
+            async with session.post(f"{base_url}/{destination}/token", json={"content": "benchmark"}) as resp:
+                return resp.status == 204
+
+        print(f"{'destinations':>12} {'concurrency':>11} {'p50 (ms)':>10} {'p99 (ms)':>10} {'total (ms)':>10}")
+        for count in args.destinations:
+            for concurrency in args.concurrency:
+                results = await FanOut(concurrency).run(range(count), deliver)
+                latencies = [result.latency * 1000 for result in results]
+                print(
+                    f"{count:>12} {concurrency:>11} {statistics.median(latencies):>10.1f} "
+                    f"{percentile(latencies, 99):>10.1f} {max(latencies):>10.1f}"
+                )
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""Event loop lag while censoring a burst of long messages with each CensorExecutor mode.
+
+Run with ``python -m benchmarks.loop_lag`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from better_profanity import profanity
+
+from utils.censor import CensorEngine, CensorExecutor
+
+from .censor import make_message
+
+
+async def measure_lag(stop: asyncio.Event, interval: float, lags: list[float]) -> None:
+    # how late a 5ms sleep wakes up is how long something else held the loop.
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval))
+
+
+async def run(executor: CensorExecutor, messages: list[str], interval: float) -> tuple[float, list[float]]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_lag(stop, interval, lags))
+    await asyncio.sleep(interval * 2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[executor.censor(text) for text in messages])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await monitor
+    return elapsed, lags
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.005)
+    args = parser.parse_args()
+
+    random.seed(0)
+    profanity.add_censor_words(["balls", "ballss", "ʙᴀʟʟꜱ", "kys"])
+    swear_words = [str(word) for word in profanity.CENSOR_WORDSET]
+    messages = [make_message(swear_words, 300)[:2000] for _ in range(args.messages)]
+
+    engine = CensorEngine(profanity)
+    engine.censor(messages[0])  # compile before timing
+
+    print(f"{'mode':>8} {'total (ms)':>11} {'p50 lag (ms)':>13} {'p99 lag (ms)':>13} {'max lag (ms)':>13}")
+    for mode in (None, "thread", "process"):
+        executor = CensorExecutor(engine, mode, threshold=0)  # type: ignore # mode is a valid literal
+        executor.start()
+        if mode == "process":
+            await executor.censor(messages[0])  # start the workers before timing
+
+        elapsed, lags = await run(executor, messages, args.interval)
+        executor.shutdown()
+
+        lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+        print(
+            f"{str(mode):>8} {elapsed * 1000:>11.1f} {statistics.median(lags_ms):>13.2f} "
+            f"{lags_ms[int(len(lags_ms) * 0.99) - 1]:>13.2f} {lags_ms[-1]:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
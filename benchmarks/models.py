@@ -0,0 +1,95 @@
+"""Memory and construction time of the slotted models against the previous plain classes.
+
+Loads 100k blacklist rows into both and compares bytes per row, construction time and
+how long reading ``blacklist_type`` takes.
+Run with ``python -m benchmarks.models`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import time
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from utils.database.models import Blacklist
+from utils.extra import FilterType
+
+
+class LegacyBlacklist:
+    # Blacklist before it was slotted, with the enum built on every access.
+    def __init__(self, connection: Any, data: Dict[str, Any], /) -> None:
+        self._connection = connection
+
+        self.id = data["id"]
+        self.server_id = data["server_id"]
+        self.entity_id = data["entity_id"]
+        self.pub = data["pub"]
+        self.dev = data["dev"]
+        self.private = data["private"]
+        self.raw_blacklist_type = data["blacklist_type"]
+        self.reason = data["reason"]
+        self.repeat = data["repeat"]
+
+    @property
+    def blacklist_type(self) -> FilterType:
+        return FilterType(self.raw_blacklist_type)
+
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    random.seed(0)
+    return [
+        {
+            "id": index,
+            "server_id": random.choice([0, random.getrandbits(60)]),
+            "entity_id": random.getrandbits(60),
+            "pub": random.random() < 0.5,
+            "dev": random.random() < 0.2,
+            "private": random.random() < 0.1,
+            "blacklist_type": random.randint(0, 1),
+            "reason": "No reason provided",
+            "repeat": random.random() < 0.1,
+        }
+        for index in range(count)
+    ]
+
+
+def measure(cls: Callable[..., Any], rows: List[Dict[str, Any]]) -> tuple[list, float, int]:
+    gc.collect()
+    start = time.perf_counter()
+    models = [cls(None, row) for row in rows]
+    elapsed = time.perf_counter() - start
+    del models
+
+    # timed separately, tracemalloc slows every allocation down.
+    gc.collect()
+    tracemalloc.start()
+    models = [cls(None, row) for row in rows]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return models, elapsed, allocated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"{'model':>16} {'bytes/row':>10} {'build (ms)':>11} {'blacklist_type (ns)':>20}")
+    for name, cls in (("LegacyBlacklist", LegacyBlacklist), ("Blacklist", Blacklist)):
+        models, elapsed, allocated = measure(cls, rows)
+        sample = models[: min(len(models), 10_000)]
+        access = timeit.timeit(lambda: [model.blacklist_type for model in sample], number=10)
+        print(
+            f"{name:>16} {allocated / len(rows):>10.0f} {elapsed * 1000:>11.1f} "
+            f"{access / (10 * len(sample)) * 1e9:>20.1f}"
+        )
+        del models, sample
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""Relays synthetic messages end to end through ``Global.global_chat_handler``.
+
+The bot doesn't log in: its guilds, channels and messages are made from payloads like the gateway
+sends, its ``DatabaseConnection`` is seeded in memory and every destination's webhook points at a
+local stand-in for Discord's API that can add latency and answer with 429s.
+Reports messages per second, per destination latency, CPU time and allocations per message.
+
+Run with ``python -m benchmarks.relay`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import discord
+from aiohttp import ClientSession, web
+from better_profanity import profanity
+from discord.ext import commands
+
+from utils.censor import CensorEngine, CensorExecutor
+from utils.database.connection import DatabaseConnection
+from utils.delivery import DeliveryResult
+from utils.dispatch import MessageDispatcher
+from utils.extra import ChatType, FilterType
+from utils.metrics import Metrics
+from utils.outbox import DeliveryOutbox
+from utils.relays import RelayStore
+from utils.scheduler import DeliveryScheduler
+from utils.tracing import Tracer
+
+# snowflakes have to be 17 digits or more for webhook URLs to parse.
+SNOWFLAKE = 10**17
+WEBHOOK_TOKEN = "t" * 68
+WORDS = (
+    "hello there how is everyone doing today the weather is nice and the bot seems fast "
+    "check https://example.com or discord.gg/invite shit happens balls <@{user}> again"
+).split()
+
+
+def json_response(data: Dict[str, Any], *, status: int = 200, headers: Dict[str, str]) -> web.Response:
+    # discord.py only decodes a body whose content type is exactly application/json, without a charset.
+    headers = {**headers, "Content-Type": "application/json"}
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers)
+
+
+class FakeDiscord:
+    """Answers webhook executions like Discord's API, after ``latency`` seconds.
+
+    A ``rate_limited`` fraction of requests get a 429 that discord.py retries after ``retry_after``.
+    """
+
+    def __init__(self, latency: float, jitter: float, rate_limited: float, retry_after: float) -> None:
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.rate_limited: float = rate_limited
+        self.retry_after: float = retry_after
+
+        self.requests: int = 0
+        self.rate_limits: int = 0
+        self._next_id: int = SNOWFLAKE * 9
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/api/v10/webhooks/{webhook_id}/{token}", self.execute_webhook)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore # aiohttp keeps the server private
+        return f"http://127.0.0.1:{port}/api/v10"
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def execute_webhook(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.requests += 1
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+
+        webhook_id = request.match_info["webhook_id"]
+        if random.random() < self.rate_limited:
+            self.rate_limits += 1
+            # discord.py only retries a 429 with a Via header, the ones Cloudflare sends don't have it.
+            headers = {
+                "Via": "1.1 google",
+                "X-RateLimit-Limit": "5",
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset-After": str(self.retry_after),
+                "X-RateLimit-Bucket": webhook_id,
+                "Retry-After": str(self.retry_after),
+            }
+            body = {"message": "You are being rate limited.", "retry_after": self.retry_after, "global": False}
+            return json_response(body, status=429, headers=headers)
+
+        self._next_id += 1
+        return json_response(
+            {
+                "id": str(self._next_id),
+                "type": 0,
+                "channel_id": str(int(webhook_id) - SNOWFLAKE),
+                "webhook_id": webhook_id,
+                "author": {"id": webhook_id, "username": payload.get("username", "webhook"), "avatar": None},
+                "content": payload.get("content") or "",
+                "embeds": payload.get("embeds", []),
+                "attachments": [],
+                "mentions": [],
+                "mention_roles": [],
+                "mention_everyone": False,
+                "pinned": False,
+                "tts": False,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "edited_timestamp": None,
+                "flags": 0,
+            },
+            headers={"X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "4", "X-RateLimit-Reset-After": "2"},
+        )
+
+
+class BenchmarkBot(commands.Bot):
+    """What ``Global`` uses of ``Sincroni``, without a token, a gateway or a database."""
+
+    session: ClientSession
+    scheduler: DeliveryScheduler
+
+    def __init__(self) -> None:
+        super().__init__(command_prefix="s.", intents=discord.Intents.all())
+        # what the READY event would set.
+        self._connection.user = discord.ClientUser(
+            state=self._connection,
+            data={"id": str(SNOWFLAKE), "username": "Sincroni", "discriminator": "0", "avatar": None, "bot": True},
+        )
+        self.db = DatabaseConnection(self, "")  # type: ignore # never connects
+        self.censor = CensorEngine(profanity)
+        self.censor_executor = CensorExecutor(self.censor)
+        self.dispatcher = MessageDispatcher(self)  # type: ignore
+        self.outbox = DeliveryOutbox(self)  # type: ignore
+        self.relays = RelayStore(self)  # type: ignore
+        self.metrics = Metrics(self)  # type: ignore
+        self.tracer = Tracer()
+
+    def get_webhook_from_url(self, url: str, session: Optional[ClientSession] = None) -> Optional[discord.Webhook]:
+        try:
+            return discord.Webhook.from_url(url, session=session or self.session)
+        except Exception:
+            return None
+
+
+def add_guild(bot: BenchmarkBot, guild_id: int) -> discord.TextChannel:
+    """Add a guild with one text channel to the bot's cache, like a GUILD_CREATE would."""
+    state = bot._connection
+    data: Dict[str, Any] = {
+        "id": str(guild_id),
+        "name": f"Guild {guild_id - SNOWFLAKE}",
+        "icon": None,
+        "owner_id": str(SNOWFLAKE),
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "roles": [
+            {
+                "id": str(guild_id),
+                "name": "@everyone",
+                "permissions": "0",
+                "position": 0,
+                "color": 0,
+                "hoist": False,
+                "managed": False,
+                "mentionable": False,
+            }
+        ],
+        "channels": [
+            {
+                "id": str(guild_id + SNOWFLAKE),
+                "type": 0,
+                "name": "global-chat",
+                "position": 0,
+                "permission_overwrites": [],
+            }
+        ],
+        "member_count": 1,
+    }
+    guild = discord.Guild(data=data, state=state)
+    state._add_guild(guild)
+    return guild.text_channels[0]
+
+
+def user_payload(user_id: int) -> Dict[str, Any]:
+    return {"id": str(user_id), "username": f"user{user_id % 1000}", "avatar": None, "discriminator": "0"}
+
+
+def make_message(
+    bot: BenchmarkBot,
+    channel: discord.TextChannel,
+    message_id: int,
+    author_id: int,
+    content: Optional[str] = None,
+    *,
+    mentions: Sequence[int] = (),
+    mention_everyone: bool = False,
+    reply: bool = False,
+) -> discord.Message:
+    """A message like the gateway sends, random words unless ``content`` is given."""
+    if content is None:
+        content = " ".join(random.choices(WORDS, k=random.randint(4, 40))).format(user=author_id)
+
+    data: Dict[str, Any] = {
+        "id": str(message_id),
+        "type": 19 if reply else 0,
+        "channel_id": str(channel.id),
+        "guild_id": str(channel.guild.id),
+        "author": user_payload(author_id),
+        "member": {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False},
+        "content": content,
+        "embeds": [],
+        "attachments": [],
+        "mentions": [user_payload(user_id) for user_id in mentions],
+        "mention_roles": [],
+        "mention_everyone": mention_everyone,
+        "pinned": False,
+        "tts": False,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "edited_timestamp": None,
+    }
+    if reply:
+        # a reply to a message that isn't cached, the gateway sends the reference without it then.
+        data["message_reference"] = {"message_id": str(message_id - 1), "channel_id": str(channel.id)}
+    return discord.Message(state=bot._connection, channel=channel, data=data)  # type: ignore
+
+
+def seed(
+    bot: BenchmarkBot,
+    global_chats: int,
+    blacklists: int,
+    colors: int,
+    authors: List[int],
+    chat_types: Optional[Sequence[int]] = None,
+) -> List[discord.TextChannel]:
+    """Fill the caches with a global chat per fake guild, blacklists and embed colors.
+
+    Every global chat is public unless ``chat_types`` has the raw chat type of each.
+    """
+    channels = [add_guild(bot, SNOWFLAKE + index) for index in range(1, global_chats + 1)]
+    server_ids = [channel.guild.id for channel in channels]
+    if chat_types is None:
+        chat_types = [ChatType.public.value] * global_chats
+
+    bot.db._load_global_chats(
+        (
+            channel.guild.id,
+            channel.id,
+            f"https://discord.com/api/webhooks/{channel.id + SNOWFLAKE}/{WEBHOOK_TOKEN}",
+            chat_type,
+        )
+        for channel, chat_type in zip(channels, chat_types)
+    )
+
+    rows = []
+    for row_id in range(blacklists):
+        if random.random() < 0.2:
+            blacklist_type, entity_id = FilterType.server, random.choice(server_ids)
+        else:
+            # mostly users that never talk, a few of the authors.
+            blacklist_type = FilterType.user
+            entity_id = random.choice(authors) if random.random() < 0.05 else random.getrandbits(60)
+        rows.append(
+            (row_id, random.choice(server_ids), entity_id, True, False, False, blacklist_type.value, None, False)
+        )
+    bot.db._load_blacklists(rows)
+
+    bot.db._load_embed_colors(
+        (server_id, chat_type, random.getrandbits(24)) for server_id, chat_type in zip(server_ids[:colors], chat_types)
+    )
+    bot.db.warmed_up.set()
+    return channels
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Run:
+    """The timings of relayed messages and of their destinations."""
+
+    def __init__(self) -> None:
+        self.messages: int = 0
+        self.handler: List[float] = []
+        self.results: List[DeliveryResult] = []
+
+    async def relay(self, bot: BenchmarkBot, handler: Any, message: discord.Message) -> None:
+        """Relay a message like the dispatcher would, get_context included."""
+        start = time.perf_counter()
+        prepared = await bot.dispatcher.prepare(message)
+        results = await handler(prepared) if prepared is not None else None
+        self.handler.append(time.perf_counter() - start)
+        self.messages += 1
+        self.results.extend(results or ())
+
+    def report(self, wall: float, cpu: float, fake: FakeDiscord) -> None:
+        latencies = [result.latency * 1000 for result in self.results if result.delivered]
+        handler_times = [seconds * 1000 for seconds in self.handler]
+        failed = sum(1 for result in self.results if result.failed)
+
+        print(f"{'messages':<24} {self.messages} in {wall:.2f}s, {self.messages / wall:.1f} messages/s")
+        print(
+            f"{'destinations':<24} {len(self.results) / max(self.messages, 1):.1f} per message, "
+            f"{len(latencies)} delivered, {failed} failed, {fake.requests} requests, {fake.rate_limits} rate limited"
+        )
+        print(
+            f"{'destination latency':<24} p50 {percentile(latencies, 50):.1f}ms, "
+            f"p90 {percentile(latencies, 90):.1f}ms, p99 {percentile(latencies, 99):.1f}ms, "
+            f"max {max(latencies, default=0.0):.1f}ms"
+        )
+        print(
+            f"{'message latency':<24} p50 {percentile(handler_times, 50):.1f}ms, "
+            f"p99 {percentile(handler_times, 99):.1f}ms"
+        )
+        # the fake server runs in the same process, its share of the CPU time is included.
+        print(f"{'cpu per message':<24} {cpu / max(self.messages, 1) * 1000:.2f}ms")
+
+
+async def relay(
+    bot: BenchmarkBot,
+    handler: Any,
+    channels: List[discord.TextChannel],
+    authors: List[int],
+    count: int,
+    concurrency: int,
+) -> Run:
+    """Relay ``count`` messages from random global chats, ``concurrency`` of them at a time."""
+    run = Run()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(message_id: int) -> None:
+        async with semaphore:
+            await run.relay(
+                bot, handler, make_message(bot, random.choice(channels), message_id, random.choice(authors))
+            )
+
+    base = SNOWFLAKE * 5 + random.getrandbits(32)
+    await asyncio.gather(*[send(base + index) for index in range(count)])
+    return run
+
+
+async def measure_allocations(
+    bot: BenchmarkBot, handler: Any, channels: List[discord.TextChannel], authors: List[int], count: int
+) -> Tuple[float, float]:
+    """The peak and retained bytes traced per message, relayed one at a time."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    peaks = []
+    for _ in range(count):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        await relay(bot, handler, channels, authors, 1, 1)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return sum(peaks) / count, retained / count
+
+
+async def start_bot(fake: FakeDiscord, delivery_concurrency: int) -> Tuple[BenchmarkBot, Any]:
+    """A bot with the Global cog loaded, sending to ``fake``. Returns it and its global chat handler."""
+    discord.http.Route.BASE = await fake.start()
+
+    bot = BenchmarkBot()
+    bot.scheduler = DeliveryScheduler(delivery_concurrency)
+    bot.session = ClientSession(trace_configs=[bot.scheduler.trace_config])
+    await bot.load_extension("cogs.global")
+    return bot, bot.get_cog("Global").global_chat_handler  # type: ignore
+
+
+async def close_bot(bot: BenchmarkBot, fake: FakeDiscord) -> None:
+    await bot.unload_extension("cogs.global")
+    await bot.scheduler.close()
+    bot.censor_executor.shutdown()
+    await bot.session.close()
+    await fake.close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """The options of the fake API and the delivery, shared with ``benchmarks.replay``."""
+    parser.add_argument("--delivery-concurrency", type=int, default=50, help="the DeliveryScheduler's limit")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the fake API takes to answer")
+    parser.add_argument("--jitter", type=float, default=0.01, help="up to this many seconds more, at random")
+    parser.add_argument("--rate-limited", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--global-chats", type=int, default=50, help="fake guilds, each with a global chat")
+    parser.add_argument("--blacklists", type=int, default=1000)
+    parser.add_argument("--colors", type=int, default=10, help="guilds with a custom embed color")
+    parser.add_argument("--authors", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10, help="messages relayed at the same time")
+    parser.add_argument("--allocations", type=int, default=10, help="messages relayed under tracemalloc")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    discord.utils.setup_logging(level=40)  # discord.py warns on every 429.
+
+    fake = FakeDiscord(args.latency, args.jitter, args.rate_limited, args.retry_after)
+    bot, handler = await start_bot(fake, args.delivery_concurrency)
+
+    authors = [SNOWFLAKE * 3 + index for index in range(args.authors)]
+    channels = seed(bot, args.global_chats, args.blacklists, args.colors, authors)
+    bot.censor_executor.start()
+
+    try:
+        await relay(bot, handler, channels, authors, args.warmup, args.concurrency)
+        fake.requests = fake.rate_limits = 0
+
+        gc.collect()
+        cpu, wall = time.process_time(), time.perf_counter()
+        run = await relay(bot, handler, channels, authors, args.messages, args.concurrency)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+        print(
+            f"{args.global_chats} global chats, {args.blacklists} blacklists, {args.colors} colors, "
+            f"{args.latency * 1000:.0f}ms latency, {args.rate_limited:.0%} rate limited"
+        )
+        run.report(wall, cpu, fake)
+
+        peak, retained = await measure_allocations(bot, handler, channels, authors, args.allocations)
+    finally:
+        await close_bot(bot, fake)
+
+    print(f"{'allocations per message':<24} peak {peak / 1024:.1f}KiB, retained {retained / 1024:.1f}KiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
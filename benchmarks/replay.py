@@ -0,0 +1,151 @@
+"""Replays a traffic recording through ``Global.global_chat_handler`` against the fake Discord API.
+
+The recording is made by the bot with ``TRAFFIC_RECORD_PATH`` set. Every recorded global chat
+becomes a fake guild with its chat type, and every event a message with the recorded length,
+mentions and time since the previous one, at ``--speed`` times the recorded pace.
+Reports the same throughput and latency as ``benchmarks.relay``, plus how far behind schedule
+messages started, to compare builds under the shape of production traffic.
+
+Run with ``python -m benchmarks.replay RECORDING`` from the repository root.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import random
+import time
+from typing import Dict, List
+
+import discord
+
+from utils.recorder import FLAG_MENTION_EVERYONE, FLAG_REPLY, RelayEvent, read_events
+
+from .relay import (
+    SNOWFLAKE,
+    WORDS,
+    FakeDiscord,
+    Run,
+    add_arguments,
+    close_bot,
+    make_message,
+    percentile,
+    seed,
+    start_bot,
+)
+
+
+def make_content(event: RelayEvent, authors: List[int], channels: List[discord.TextChannel]) -> str:
+    """Content with the mentions of the event, padded with words to its length."""
+    parts = [f"<@{random.choice(authors)}>" for _ in range(event.user_mentions)]
+    parts.extend(f"<@&{SNOWFLAKE * 4 + index}>" for index in range(event.role_mentions))
+    parts.extend(f"<#{random.choice(channels).id}>" for _ in range(event.channel_mentions))
+    if event.flags & FLAG_MENTION_EVERYONE:
+        parts.append("@everyone")
+
+    length = sum(len(part) + 1 for part in parts)
+    while length < event.length:
+        word = random.choice(WORDS).replace("{user}", str(random.choice(authors)))
+        parts.append(word)
+        length += len(word) + 1
+
+    random.shuffle(parts)
+    content = " ".join(parts)
+    # cut to the recorded length unless that would cut a mention.
+    mentions = event.user_mentions + event.role_mentions + event.channel_mentions
+    return content if mentions else content[: max(event.length, 1)]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="a file recorded with TRAFFIC_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="times the recorded pace, 0 for no waiting at all")
+    parser.add_argument("--max-gap", type=float, default=10.0, help="longest recorded silence kept, in seconds")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first events, 0 for all")
+    parser.add_argument("--concurrency", type=int, default=100, help="most messages relayed at the same time")
+    parser.add_argument("--blacklists", type=int, default=100)
+    parser.add_argument("--colors", type=int, default=10, help="guilds with a custom embed color")
+    parser.add_argument("--authors", type=int, default=200)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.recording, "rb") as file:
+        events = list(read_events(file))
+    if args.limit:
+        events = events[: args.limit]
+    if not events:
+        raise SystemExit(f"{args.recording} has no events.")
+
+    random.seed(args.seed)
+    discord.utils.setup_logging(level=40)  # discord.py warns on every 429.
+
+    # a fake global chat for every recorded one, with the same chat type.
+    chat_types: Dict[int, int] = {}
+    for event in events:
+        chat_types.setdefault(event.channel_id, event.chat_type)
+
+    fake = FakeDiscord(args.latency, args.jitter, args.rate_limited, args.retry_after)
+    bot, handler = await start_bot(fake, args.delivery_concurrency)
+
+    authors = [SNOWFLAKE * 3 + index for index in range(args.authors)]
+    channels = seed(bot, len(chat_types), args.blacklists, args.colors, authors, list(chat_types.values()))
+    channel_of = dict(zip(chat_types, channels))
+    bot.censor_executor.start()
+
+    # when each event is due, in recorded seconds since the first, with restarts and quiet nights cut short.
+    offsets = [0.0]
+    for previous, event in zip(events, events[1:]):
+        offsets.append(offsets[-1] + min(max(event.created_at - previous.created_at, 0.0), args.max_gap))
+    recorded = offsets[-1]
+    print(
+        f"{len(events)} events over {recorded:.1f}s in {len(channels)} global chats, "
+        f"replayed at {f'{args.speed:g}x' if args.speed else 'full speed'}, {args.latency * 1000:.0f}ms latency, "
+        f"{args.rate_limited:.0%} rate limited"
+    )
+
+    run = Run()
+    lag: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def replay(index: int, event: RelayEvent, due: float) -> None:
+        async with semaphore:
+            lag.append(max(0.0, time.perf_counter() - due))
+            channel = channel_of[event.channel_id]
+            message = make_message(
+                bot,
+                channel,
+                SNOWFLAKE * 6 + index,
+                random.choice(authors),
+                make_content(event, authors, channels),
+                mention_everyone=bool(event.flags & FLAG_MENTION_EVERYONE),
+                reply=bool(event.flags & FLAG_REPLY),
+            )
+            await run.relay(bot, handler, message)
+
+    try:
+        gc.collect()
+        tasks: List[asyncio.Task] = []
+        cpu, start = time.process_time(), time.perf_counter()
+        for index, (event, offset) in enumerate(zip(events, offsets)):
+            due = start + offset / args.speed if args.speed else start
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(replay(index, event, due)))
+
+        await asyncio.gather(*tasks)
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+
+        run.report(wall, cpu, fake)
+        lag_ms = [seconds * 1000 for seconds in lag]
+        print(
+            f"{'behind schedule':<24} p50 {percentile(lag_ms, 50):.1f}ms, p99 {percentile(lag_ms, 99):.1f}ms, "
+            f"max {max(lag_ms):.1f}ms"
+        )
+    finally:
+        await close_bot(bot, fake)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import asyncio
+import csv
 import functools
+import io
 import os
+import tempfile
 import traceback
-from typing import TYPE_CHECKING, List, Literal, Optional, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Literal, Optional, Tuple, Union
 
 import discord
 from better_profanity import profanity
@@ -13,30 +16,177 @@ from discord.app_commands import Choice
 from discord.ext import commands
 
 import utils
+from utils import transfer
+from utils.breaker import DEFAULT_COOLDOWN, DEFAULT_THRESHOLD, BreakerState, CircuitBreaker, CircuitBreakers, Probe
+from utils.delivery import DeliveryResult, FanOut
 from utils.extra import ChatType, FilterType, rules
+from utils.modlog import ModLog
+from utils.outbox import is_transient
 from utils.views import Confirm
 
 if TYPE_CHECKING:
     from main import Sincroni
+    from utils.database.models import GlobalChatRoute, OutboxEntry
+    from utils.dispatch import PreparedMessage
+    from utils.relays import RelayedCopy
+
+# how many imported rows are added per transaction.
+IMPORT_BATCH_SIZE = 1000
+# how large an export gets before it is written to disk instead of memory.
+EXPORT_SPOOL_SIZE = 1024 * 1024
 
 
 class Global(commands.Cog):
     "Global Chat Commands"
 
+    mod_log: ModLog
+
     def __init__(self, bot: Sincroni):
         self.bot: Sincroni = bot
+        # the bot's DeliveryScheduler limits how many requests are in flight.
+        self.fan_out: FanOut = FanOut(None)
+        self.breakers: CircuitBreakers = CircuitBreakers(
+            threshold=int(os.getenv("GLOBAL_CHAT_BREAKER_THRESHOLD", DEFAULT_THRESHOLD)),
+            cooldown=float(os.getenv("GLOBAL_CHAT_BREAKER_COOLDOWN", DEFAULT_COOLDOWN)),
+            on_state_change=self.on_breaker_state_change,
+        )
+        # send with the bot instead of skipping a global chat when only its webhook is broken.
+        self.webhook_fallback: bool = os.getenv("GLOBAL_CHAT_WEBHOOK_FALLBACK", "").lower() in ("1", "true", "yes")
 
     async def cog_load(self):
         profanity.add_censor_words(["balls", "ballss", "ʙᴀʟʟꜱ", "kys"])
+        self.bot.dispatcher.add_consumer(self.global_chat_handler)
+        self.bot.outbox.set_resender(self.resend_outbox_entry)
+        # guilds that were cached while the cog was unloaded never got a guild event here.
+        self.bot.db.guild_pickers.refresh()
+
+        self.mod_log = ModLog(self.bot, self.mod_webhook if os.getenv("MOD_WEBHOOK") else None)
+        self.mod_log.start()
+        self.breakers.start()
 
         # load censor words plus add a custom way to load them, and check the issue below:
         # https://github.com/JDJG-Holding-Team/Sincroni/issues/16#issue-2069012832
 
     async def cog_unload(self):
+        self.bot.dispatcher.remove_consumer(self.global_chat_handler)
+        self.bot.outbox.set_resender(None)
+        await self.breakers.close()
+        await self.mod_log.close()
         print("cog unloaded")
 
         # a few extra stuff
 
+    def on_breaker_state_change(self, breaker: CircuitBreaker) -> None:
+        kind, destination_id = breaker.key  # type: ignore # keys are ("webhook" | "channel", id)
+        if breaker.state is BreakerState.open:
+            embed = discord.Embed(
+                title="Error",
+                description=f"Sending to this {kind} failed {breaker.failures} times in a row, "
+                "it is skipped until it works again.",
+                color=0xFF0000,
+            )
+            if breaker.last_error is not None:
+                err = breaker.last_error
+                traceback.print_exception(type(err), err, err.__traceback__)
+                embed.add_field(name="Last Error", value=repr(err)[:1024], inline=False)
+        else:
+            embed = discord.Embed(
+                title="Recovered",
+                description=f"This {kind} works again and is sent to.",
+                color=0x2ECC71,
+            )
+
+        for name, value in breaker.fields.items():
+            embed.add_field(name=name, value=value)
+
+        print(f"{kind} {destination_id} is now {breaker.state.value}")
+        self.mod_log.log(embed)
+
+    async def _probe_channel(self, record: Union[GlobalChatRoute, OutboxEntry]) -> None:
+        # the cached lookup relaying uses, a channel only the API still knows can't be sent to either.
+        channel = record.channel
+        if channel is None:
+            raise LookupError(f"Channel {record.channel_id} was not found.")
+
+        if isinstance(channel, (discord.TextChannel, discord.Thread)):
+            perms = channel.permissions_for(channel.guild.me)
+            if not (perms.send_messages and perms.embed_links):
+                raise LookupError(f"Missing permissions to send embeds in channel {record.channel_id}.")
+
+    async def _send_tracked(
+        self,
+        key: Tuple[str, int],
+        send: functools.partial,
+        *,
+        channel_id: int,
+        webhook_url: Optional[str],
+        origin_id: Optional[int],
+        probe: Probe,
+    ) -> discord.Message:
+        """Send a relayed message through the scheduler, first deliveries and outbox retries alike.
+
+        The result counts towards the destination's circuit breaker, and the copy is kept
+        so edits and deletes of the origin message can be relayed too.
+        """
+        try:
+            sent = await self.bot.scheduler.submit(key, send)  # type: ignore # key is a DestinationKey
+        except Exception as err:
+            fields = {"Channel ID": str(channel_id)}
+            if key[0] == "webhook":
+                fields["Webhook URL"] = str(webhook_url)
+
+            # reported once by on_breaker_state_change when the destination is skipped.
+            self.breakers.record_failure(key, err, probe=probe, fields=fields)
+            raise
+
+        self.breakers.record_success(key)
+        if origin_id is not None:
+            self.bot.relays.add(origin_id, channel_id, sent.id, key[1] if key[0] == "webhook" else None)
+        return sent
+
+    async def resend_outbox_entry(self, entry: OutboxEntry) -> bool:
+        """Send a message from the outbox again. ``False`` if its destination is skipped for now."""
+        payload = entry.payload
+        embed = discord.Embed.from_dict(payload["embed"])
+        origin_id = payload.get("message_id")
+
+        if entry.webhook_url is None:
+            key = ("channel", entry.channel_id)
+            if not self.breakers.allow(key):
+                return False
+
+            channel = entry.channel
+            if channel is None:
+                raise LookupError(f"Channel {entry.channel_id} was not found.")
+
+            send = functools.partial(channel.send, embed=embed)
+            probe: Probe = functools.partial(self._probe_channel, entry)
+        else:
+            webhook = entry.webhook
+            if webhook is None:
+                raise LookupError(f"Webhook of channel {entry.channel_id} is invalid.")
+
+            key = ("webhook", webhook.id)
+            if not self.breakers.allow(key):
+                return False
+
+            kwargs: Dict[str, Any] = {
+                "username": payload.get("username"),
+                "avatar_url": payload.get("avatar_url"),
+                "embed": embed,
+                "wait": True,
+            }
+            if thread_id := payload.get("thread_id"):
+                kwargs["thread"] = discord.Object(thread_id)
+
+            send = functools.partial(webhook.send, **kwargs)
+            probe = webhook.fetch
+
+        await self._send_tracked(
+            key, send, channel_id=entry.channel_id, webhook_url=entry.webhook_url, origin_id=origin_id, probe=probe
+        )
+        return True
+
     @staticmethod
     def _check_channel_permissions(
         channel: Union[discord.TextChannel, discord.Thread],
@@ -272,17 +422,11 @@ class Global(commands.Cog):
     async def blacklist_guild_autocomplete(self, interaction: discord.Interaction, current: str) -> List[Choice]:
         # ignore current guild in results
 
-        records = [
-            record for record in self.bot.db.global_chats if record.guild and record.server_id != interaction.guild_id
-        ]
-
-        guilds: list[Choice] = [Choice(name=f"{record.guild}", value=str(record.server_id)) for record in records]
-        startswith: list[Choice] = [choices for choices in guilds if choices.name.startswith(current)]
+        guilds = self.bot.db.guild_pickers.search_global_chats(current, exclude=interaction.guild_id)
+        if current and not guilds:
+            guilds = self.bot.db.guild_pickers.search_global_chats("", exclude=interaction.guild_id)
 
-        if not (current and startswith):
-            return guilds[0:25]
-
-        return startswith[0:25]
+        return [Choice(name=name, value=str(guild_id)) for guild_id, name in guilds]
 
     @blacklist.error
     async def blacklist_error(self, ctx: commands.Context, error):
@@ -380,25 +524,114 @@ class Global(commands.Cog):
 
     @unblacklist.autocomplete("guild")
     async def unblacklist_guild_autocomplete(self, interaction: discord.Interaction, current: str) -> List[Choice]:
-        # ignore current guild in results
+        if interaction.guild_id is None:
+            return []
 
-        records = [
-            record
-            for record in self.bot.db.blacklists
-            if isinstance(record.entity, discord.Guild) and record.server_id == interaction.guild_id
-        ]
+        guilds = self.bot.db.guild_pickers.search_blacklisted(interaction.guild_id, current)
+        if current and not guilds:
+            guilds = self.bot.db.guild_pickers.search_blacklisted(interaction.guild_id, "")
 
-        guilds: list[Choice] = [Choice(name=f"{record.entity}", value=str(record.entity_id)) for record in records]
+        return [Choice(name=name, value=str(guild_id)) for guild_id, name in guilds]
 
-        startswith: list[Choice] = [choices for choices in guilds if choices.name.startswith(current)]
+    @unblacklist.error
+    async def unblacklist_error(self, ctx: commands.Context, error):
+        await ctx.send(error)
 
-        if not (current and startswith):
-            return guilds[0:25]
+    @_global.command(name="blacklist-import")
+    @commands.guild_only()
+    @commands.check_any(commands.has_permissions(manage_messages=True), commands.has_permissions(manage_guild=True))
+    async def blacklist_import(
+        self,
+        ctx: commands.Context,
+        file: discord.Attachment,
+        format: Literal["csv", "jsonl"] = "csv",
+    ):
+        """Imports a file of blacklists into this guild's blacklist, updating the ones that exist.
 
-        return startswith[0:25]
+        Parameters
+        ----------
+        file : discord.Attachment
+            The blacklists, with the columns of an export. Only entity_id is required, the rest default like blacklist.
 
-    @unblacklist.error
-    async def unblacklist_error(self, ctx: commands.Context, error):
+        format: Literal["csv", "jsonl"]
+            Whatever or not the file is CSV with a header or an object per line. Defaults to CSV.
+        """
+
+        if not ctx.guild:
+            return await ctx.send("Something went wrong as the guild should exist", ephemeral=True)
+
+        await ctx.defer(ephemeral=True)
+
+        added = 0
+        invalid: List[str] = []
+        with tempfile.TemporaryFile() as downloaded:
+            # spooled to disk and read a row at a time, ban lists can be large.
+            await transfer.download(self.bot.session, file.url, downloaded)
+
+            batch: List[Dict[str, Any]] = []
+            with io.TextIOWrapper(downloaded, encoding="utf-8-sig", newline="") as rows:
+                try:
+                    for line, row in transfer.read_rows(rows, format):
+                        try:
+                            entry = transfer.parse_blacklist(row)
+                        except ValueError as err:
+                            invalid.append(f"line {line}: {err}")
+                            continue
+
+                        batch.append({"server_id": ctx.guild.id, **entry})
+                        if len(batch) >= IMPORT_BATCH_SIZE:
+                            added += len(await self.bot.db.add_blacklists(batch))
+                            batch = []
+                except (UnicodeDecodeError, csv.Error) as err:
+                    invalid.append(f"stopped reading: {err}")
+
+                if batch:
+                    added += len(await self.bot.db.add_blacklists(batch))
+
+        message = f"Imported {added} blacklists."
+        if invalid:
+            message += f" Skipped {len(invalid)} invalid rows:\n" + "\n".join(invalid[:10])
+
+        await ctx.send(message[:2000], ephemeral=True)
+
+    @blacklist_import.error
+    async def blacklist_import_error(self, ctx: commands.Context, error):
+        await ctx.send(error)
+
+    @_global.command(name="blacklist-export")
+    @commands.guild_only()
+    @commands.check_any(commands.has_permissions(manage_messages=True), commands.has_permissions(manage_guild=True))
+    async def blacklist_export(self, ctx: commands.Context, format: Literal["csv", "jsonl"] = "csv"):
+        """Exports this guild's blacklist as a file that blacklist-import takes.
+
+        Parameters
+        ----------
+        format: Literal["csv", "jsonl"]
+            Whatever or not the file is CSV with a header or an object per line. Defaults to CSV.
+        """
+
+        if not ctx.guild:
+            return await ctx.send("Something went wrong as the guild should exist", ephemeral=True)
+
+        blacklists = (blacklist for blacklist in self.bot.db.blacklists if blacklist.server_id == ctx.guild.id)
+
+        # kept in memory only while small, written to disk after.
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as exported:
+            rows = io.TextIOWrapper(exported, encoding="utf-8", newline="")  # type: ignore
+            count = transfer.write_rows(rows, format, blacklists)
+            # leaves the file open for sending.
+            rows.flush()
+            rows.detach()
+
+            exported.seek(0)
+            await ctx.send(
+                f"Exported {count} blacklists.",
+                file=discord.File(exported, filename=f"blacklist-{ctx.guild.id}.{format}"),  # type: ignore
+                ephemeral=True,
+            )
+
+    @blacklist_export.error
+    async def blacklist_export_error(self, ctx: commands.Context, error):
         await ctx.send(error)
 
     @_global.command(
@@ -528,201 +761,306 @@ class Global(commands.Cog):
         startswith: list[Choice] = [choice for choice in colors if choice.name.startswith(current.lower())]
         return ((startswith or colors) if current else colors)[:25]
 
-    @commands.Cog.listener("on_message")
-    async def global_chat_handler(self, message: discord.Message):
-        supported_message_types = (
-            discord.MessageType.default,
-            discord.MessageType.reply,
+    def relay_embeds(
+        self, message: discord.Message, content: str
+    ) -> Callable[[discord.Color], Tuple[discord.Embed, discord.Embed]]:
+        """The embeds of a relayed message, as ``(embed, webhook_embed)`` for a destination's color.
+
+        ``content`` has to be censored already.
+        """
+        guild_icon = (
+            message.guild.icon.url if message.guild and message.guild.icon else "https://i.imgur.com/3ZUrjUP.png"
+        )
+        guild_name = self.bot.censor.redact(str(message.guild))
+        user_name = self.bot.censor.redact(str(message.author))
+
+        embed = discord.Embed(
+            description=str(content),
+            color=0xEB6D15,
+            timestamp=message.created_at,
         )
-        if (
-            not message.guild
-            or not message.content
-            or message.author.bot
-            or message.type not in supported_message_types
-        ):
-            return
+        embed.set_author(name=user_name, icon_url=message.author.display_avatar.url)
+        embed.set_footer(text=guild_name)
+        embed.set_thumbnail(url=guild_icon)
 
-        ctx = await self.bot.get_context(message)
-        if ctx.valid:
+        webhook_embed = discord.Embed(
+            description=str(content),
+            color=0xEB6D15,
+            timestamp=message.created_at,
+        )
+        webhook_embed.set_footer(text=guild_name, icon_url=guild_icon)
+
+        embeds: Dict[int, Tuple[discord.Embed, discord.Embed]] = {}
+
+        def get_embeds(color: discord.Color) -> Tuple[discord.Embed, discord.Embed]:
+            # destinations are sent to at the same time, so every color gets its own embeds.
+            if color.value not in embeds:
+                colored_embed, colored_webhook_embed = embed.copy(), webhook_embed.copy()
+                colored_embed.color = color
+                colored_webhook_embed.color = color
+                embeds[color.value] = (colored_embed, colored_webhook_embed)
+
+            return embeds[color.value]
+
+        return get_embeds
+
+    async def global_chat_handler(self, prepared: PreparedMessage) -> Optional[List[DeliveryResult[GlobalChatRoute]]]:
+        message, ctx, trace = prepared.message, prepared.context, prepared.trace
+        if not message.guild:
             return
 
         global_chat = self.bot.db.get_global_chat(ctx.channel.id)
         if not global_chat:
             return
 
-        blacklisted_servers = utils.blacklist_lookup(self.bot, global_chat.chat_type, message.guild.id)
-
-        records = list(
-            filter(
-                lambda record: (
-                    record.chat_type is global_chat.chat_type
-                    and record.channel_id != global_chat.channel_id
-                    and not record.server_id in blacklisted_servers
-                ),
-                self.bot.db.global_chats,
+        with trace.span("blacklist"):
+            # the origin's own blacklist, and every server that blacklisted the author or the origin.
+            excluded_servers = self.bot.db.blacklist_index.excluded_servers(
+                message.guild.id, message.author.id, global_chat.chat_type
             )
-        )
+
+            routes = [
+                route
+                for route in self.bot.db.get_routes(global_chat.chat_type)
+                if route.channel_id != global_chat.channel_id and route.server_id not in excluded_servers
+            ]
+
+            author_blacklisted = self.bot.db.blacklist_index.is_blacklisted(message.guild.id, message.author.id)
 
         # have an anti spam check here.
         # this new filter seems to work fine.
 
         guild_icon = message.guild.icon.url if message.guild.icon else "https://i.imgur.com/3ZUrjUP.png"
-        message_content = await commands.clean_content().convert(ctx, message.content)
-
-        mod_embed = discord.Embed(
-            description=str(message_content),
-            color=0xEB6D15,
-            timestamp=ctx.message.created_at,
-        )
-        mod_embed.set_footer(text=str(ctx.guild))
-        mod_embed.set_thumbnail(url=guild_icon)
-
-        mod_embed.add_field(name="Guild ID", value=str(message.guild.id), inline=False)
-        mod_embed.add_field(name="Channel ID", value=str(message.channel.id), inline=False)
-        mod_embed.add_field(name="User ID", value=str(message.author.id), inline=False)
-        mod_embed.add_field(name="Message ID", value=str(message.id), inline=False)
+        with trace.span("clean_content"):
+            message_content = await prepared.clean_content()
+
+        with trace.span("mod_embed"):
+            mod_embed = discord.Embed(
+                description=str(message_content),
+                color=0xEB6D15,
+                timestamp=ctx.message.created_at,
+            )
+            mod_embed.set_footer(text=str(ctx.guild))
+            mod_embed.set_thumbnail(url=guild_icon)
 
-        message_content = profanity.censor(message_content, censor_char="#")
+            mod_embed.add_field(name="Guild ID", value=str(message.guild.id), inline=False)
+            mod_embed.add_field(name="Channel ID", value=str(message.channel.id), inline=False)
+            mod_embed.add_field(name="User ID", value=str(message.author.id), inline=False)
+            mod_embed.add_field(name="Message ID", value=str(message.id), inline=False)
 
-        message_content = utils.censor_link(message_content)
-        message_content = utils.censor_invite(message_content)
+        with trace.span("censor"):
+            message_content = await prepared.censored_content()
 
-        guild_name = utils.censor_link(str(ctx.guild))
-        guild_name = utils.censor_invite(guild_name)
-        user_name = utils.censor_link(str(message.author))
-        user_name = utils.censor_invite(user_name)
+            user_name = self.bot.censor.redact(str(message.author))
 
         # once config is used this will all be optional censorship
         # ie opt in.
 
-        embed = discord.Embed(
-            description=str(message_content),
-            color=0xEB6D15,
-            timestamp=message.created_at,
-        )
-        embed.set_author(name=user_name, icon_url=ctx.author.display_avatar.url)
-        embed.set_footer(text=guild_name)
-        embed.set_thumbnail(url=guild_icon)
-
-        webhook_embed = discord.Embed(
-            description=str(message_content),
-            color=0xEB6D15,
-            timestamp=ctx.message.created_at,
-        )
-        webhook_embed.set_footer(text=guild_name, icon_url=guild_icon)
-
-        global_blacklisted_user = self.bot.db.get_blacklist(0, message.author.id)
-        blacklisted_guild = self.bot.db.get_blacklist(0, message.guild.id)
-        blacklisted_user = self.bot.db.get_blacklist(message.guild.id, message.author.id)
+        with trace.span("embeds"):
+            get_embeds = self.relay_embeds(message, message_content)
 
         # you do not check if the current guild is blacklisted as that is the origin.
 
-        if global_blacklisted_user or blacklisted_guild or blacklisted_user:
-            if self.mod_webhook:
-                try:
-                    await self.mod_webhook.send(
-                        username=f"Blacklisted: {ctx.author}",
-                        embed=mod_embed,
-                        avatar_url="https://i.imgur.com/qyk9vQq.png",
-                    )
-                except (discord.HTTPException, discord.Forbidden):
-                    # Handle invalid mod webhook
-                    mbed = discord.Embed(
-                        title="Blacklisted User",
-                        description="You are blacklisted from the global chat.",
-                        color=0xFF0000,
-                    )
-                    mbed.set_footer(text="You can appeal this decision by contacting the moderators.")
-                    await message.author.send(embed=mbed)
+        if author_blacklisted:
+
+            async def notify_blacklisted() -> None:
+                # Handle invalid mod webhook
+                mbed = discord.Embed(
+                    title="Blacklisted User",
+                    description="You are blacklisted from the global chat.",
+                    color=0xFF0000,
+                )
+                mbed.set_footer(text="You can appeal this decision by contacting the moderators.")
+                await message.author.send(embed=mbed)
 
+            mod_embed.set_author(name=f"Blacklisted: {ctx.author}", icon_url="https://i.imgur.com/qyk9vQq.png")
+            with trace.span("mod_log"):
+                self.mod_log.log(mod_embed, on_failure=notify_blacklisted)
             return
 
-        if self.mod_webhook:
+        # the mod log is sent in the background, relaying doesn't wait for it, so this only times queueing it.
+        with trace.span("mod_log"):
+            mod_embed.set_author(name=str(ctx.author), icon_url=ctx.author.display_avatar.url)
+            self.mod_log.log(mod_embed)
+
+        async def send_or_retry_later(
+            record: GlobalChatRoute, key: Tuple[str, int], send: functools.partial, payload: Dict, probe: Probe
+        ) -> None:
+            webhook_url = record.global_chat.webhook_url if key[0] == "webhook" else None
+            # the outbox retries it through resend_outbox_entry, which relays its edits and deletes too.
+            payload["message_id"] = message.id
             try:
-                await self.mod_webhook.send(
-                    username=str(ctx.author),
-                    embed=mod_embed,
-                    avatar_url=ctx.author.display_avatar.url,
+                await self._send_tracked(
+                    key, send, channel_id=record.channel_id, webhook_url=webhook_url, origin_id=message.id, probe=probe
                 )
-            except (discord.HTTPException, discord.Forbidden):
-                # Handle invalid mod webhook
-                if mod_channel_id := os.getenv("MOD_CHANNEL"):
-                    mcID = int(mod_channel_id)
-                    mod_channel = self.bot.get_channel(mcID)
-                    if not mod_channel:
-                        return print("Failed to send message to mod channel and did not have a mod channel to send to.")
-
-                    await mod_channel.send(
-                        f"Error: {ctx.author} sent a message but the mod webhook is invalid.", embed=mod_embed
-                    )
-                else:
-                    print("Failed to send message to mod channel and did not have a mod channel to send to.")
-        for record in records:
-            # TODO: handle not found global chat channel
-            if not record.channel:
-                print(record.channel_id)
-                continue
-
-            blacklisted_user = self.bot.db.get_blacklist(record.server_id, message.author.id)
-            blacklisted_guild = self.bot.db.get_blacklist(record.server_id, message.guild.id)
-
-            if blacklisted_user or blacklisted_guild:
-                continue
-
-            color_change = self.bot.db.get_embed_color(record.server_id, record.chat_type)
-
-            if color_change:
-                embed.color = color_change.custom_color
-                webhook_embed.color = color_change.custom_color
+            except asyncio.CancelledError:
+                # the bot is closing, send it after the restart.
+                self.bot.outbox.add(record.channel_id, webhook_url, payload)
+                raise
+            except Exception as err:
+                if is_transient(err):
+                    self.bot.outbox.add(record.channel_id, webhook_url, payload, err)
+                raise
+
+        async def deliver(record: GlobalChatRoute) -> bool:
+            channel_key = ("channel", record.channel_id)
+            # skipped until the background probe finds the channel again.
+            if not self.breakers.allow(channel_key):
+                return False
 
-            # changes color for specific guilds only.
-
-            else:
-                embed.color = discord.Color(0xEB6D15)
-                webhook_embed.color = discord.Color(0xEB6D15)
-
-            # changes color back to default so color does not get stuck at the custom color.
-
-            if not record.webhook:
-                try:
-                    await record.channel.send(embed=embed)
-                except (discord.HTTPException, discord.Forbidden) as err:
-                    print(record.channel_id)
-                    traceback.print_exception(type(err), err, err.__traceback__)
-                    # handle error in here.
-
-                continue
+            if not record.channel:
+                self.breakers.record_failure(
+                    channel_key,
+                    LookupError(f"Channel {record.channel_id} was not found."),
+                    probe=functools.partial(self._probe_channel, record),
+                    fields={"Channel ID": str(record.channel_id)},
+                )
+                return False
+
+            # the route's color is the custom color for specific guilds only.
+            record_embed, record_webhook_embed = get_embeds(record.color)
+
+            webhook = record.webhook
+            if webhook and not self.breakers.allow(("webhook", webhook.id)):
+                if not self.webhook_fallback:
+                    return False
+                webhook = None
+
+            if not webhook:
+                await send_or_retry_later(
+                    record,
+                    channel_key,
+                    functools.partial(record.channel.send, embed=record_embed),
+                    {"embed": record_embed.to_dict()},
+                    functools.partial(self._probe_channel, record),
+                )
+                return True
 
+            webhook_key = ("webhook", webhook.id)
             kwargs = {
                 "username": user_name,
-                "embed": webhook_embed,
+                "embed": record_webhook_embed,
                 "avatar_url": ctx.author.display_avatar.url,
+                "wait": True,
             }
             if isinstance(record.channel, discord.Thread):
                 kwargs["thread"] = record.channel
 
-            try:
-                await record.webhook.send(**kwargs)
-            except (discord.HTTPException, discord.Forbidden) as err:
-                print("problematic linked channels")
-                error_mbed = discord.Embed(
-                    title="Error",
-                    description="There was an error sending a message to a linked channel.",
-                    color=0xFF0000,
-                )
-                error_mbed.add_field(name="Channel ID", value=str(record.channel_id))
-                error_mbed.add_field(name="Webhook URL", value=str(record.webhook_url))
+            payload = {
+                "username": user_name,
+                "embed": record_webhook_embed.to_dict(),
+                "avatar_url": ctx.author.display_avatar.url,
+                "thread_id": record.channel.id if isinstance(record.channel, discord.Thread) else None,
+            }
+
+            await send_or_retry_later(
+                record, webhook_key, functools.partial(webhook.send, **kwargs), payload, webhook.fetch
+            )
+            return True
+
+        with trace.span("fan_out"):
+            results = await self.fan_out.run(routes, deliver)
+        self.bot.metrics.record_relay(global_chat.chat_type.name, results)
+        return results
+
+    def _relayed_copy_send(
+        self, copy: RelayedCopy, route: GlobalChatRoute, action: Literal["edit", "delete"], embeds: Tuple = ()
+    ) -> Optional[Tuple[Tuple[str, int], functools.partial]]:
+        """The scheduler key and request that edit or delete a relayed copy. ``None`` if it can't be reached."""
+        thread = route.channel if isinstance(route.channel, discord.Thread) else discord.utils.MISSING
+        kwargs = {"embed": embeds[1]} if action == "edit" else {}
+
+        if copy.webhook_id is not None:
+            webhook = route.webhook
+            key = ("webhook", copy.webhook_id)
+            if webhook is None or webhook.id != copy.webhook_id or not self.breakers.allow(key):
+                return None
+
+            method = webhook.edit_message if action == "edit" else webhook.delete_message
+            return key, functools.partial(method, copy.message_id, thread=thread, **kwargs)
+
+        key = ("channel", copy.channel_id)
+        if route.channel is None or not self.breakers.allow(key):
+            return None
+
+        partial_message = route.channel.get_partial_message(copy.message_id)  # type: ignore # text channel or thread
+        if action == "edit":
+            return key, functools.partial(partial_message.edit, embed=embeds[0])
+        return key, functools.partial(partial_message.delete)
+
+    async def _update_relayed_copies(
+        self,
+        copies: List[RelayedCopy],
+        chat_type: ChatType,
+        action: Literal["edit", "delete"],
+        get_embeds: Optional[Callable[[discord.Color], Tuple[discord.Embed, discord.Embed]]] = None,
+    ) -> List[DeliveryResult[RelayedCopy]]:
+        routes = {route.channel_id: route for route in self.bot.db.get_routes(chat_type)}
+
+        async def update(copy: RelayedCopy) -> bool:
+            # the global chat was unlinked since.
+            route = routes.get(copy.channel_id)
+            if route is None:
+                return False
+
+            request = self._relayed_copy_send(copy, route, action, get_embeds(route.color) if get_embeds else ())
+            if request is None:
+                return False
+
+            await self.bot.scheduler.submit(*request)  # type: ignore # the key is a DestinationKey
+            return True
+
+        return await self.fan_out.run(copies, update)
+
+    # the guild names the blacklist and unblacklist commands autocomplete.
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        self.bot.db.guild_pickers.guild_available(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        self.bot.db.guild_pickers.guild_available(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild) -> None:
+        if before.name != after.name:
+            self.bot.db.guild_pickers.guild_available(after)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.bot.db.guild_pickers.guild_removed(guild.id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        global_chat = self.bot.db.get_global_chat(payload.channel_id)
+        if not global_chat or "content" not in payload.data:
+            return
 
-                if not self.mod_webhook:
-                    return print("Failed to send message to mod channel and did not have a mod channel to send to.")
+        message = payload.message
+        if message.author.bot or (payload.cached_message and payload.cached_message.content == message.content):
+            # only embeds were added or removed.
+            return
 
-                await self.mod_webhook.send(embed=error_mbed)
+        copies = await self.bot.relays.get(message.id)
+        if not copies:
+            return
 
-                print(record.channel_id)
-                print(record.webhook_url)
+        ctx = await self.bot.get_context(message)
+        content = await commands.clean_content().convert(ctx, message.content)
+        get_embeds = self.relay_embeds(message, await self.bot.censor_executor.censor(content))
 
-                traceback.print_exception(type(err), err, err.__traceback__)
-                # handle in here.
+        await self._update_relayed_copies(copies, global_chat.chat_type, "edit", get_embeds)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        global_chat = self.bot.db.get_global_chat(payload.channel_id)
+        if not global_chat:
+            return
+
+        copies = await self.bot.relays.pop(payload.message_id)
+        if copies:
+            await self._update_relayed_copies(copies, global_chat.chat_type, "delete")
 
 
 async def setup(bot: Sincroni):
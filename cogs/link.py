@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import functools
+import time
 import traceback
 from typing import TYPE_CHECKING
 
@@ -7,10 +9,11 @@ import discord
 from better_profanity import profanity
 from discord.ext import commands
 
-import utils
+from utils.delivery import DeliveryResult
 
 if TYPE_CHECKING:
     from main import Sincroni
+    from utils.dispatch import PreparedMessage
 
 
 class Link(commands.Cog):
@@ -21,31 +24,20 @@ class Link(commands.Cog):
 
     async def cog_load(self):
         profanity.add_censor_words(["balls", "ballss", "ʙᴀʟʟꜱ", "kys"])
+        self.bot.dispatcher.add_consumer(self.linked_channel_handler)
 
         # load censor words plus add a custom way to load them, and check the issue below:
         # https://github.com/JDJG-Holding-Team/Sincroni/issues/16#issue-2069012832
 
     async def cog_unload(self):
+        self.bot.dispatcher.remove_consumer(self.linked_channel_handler)
         print("cog unloaded")
 
         # a few extra stuff
 
-    @commands.Cog.listener("on_message")
-    async def linked_channel_handler(self, message: discord.Message):
-        supported_message_types = (
-            discord.MessageType.default,
-            discord.MessageType.reply,
-        )
-        if (
-            not message.guild
-            or not message.content
-            or message.author.bot
-            or message.type not in supported_message_types
-        ):
-            return
-
-        ctx = await self.bot.get_context(message)
-        if ctx.valid:
+    async def linked_channel_handler(self, prepared: PreparedMessage):
+        message, ctx, trace = prepared.message, prepared.context, prepared.trace
+        if not message.guild:
             return
 
         linked_channel = self.bot.db.get_linked_channel(ctx.channel.id)
@@ -56,28 +48,35 @@ class Link(commands.Cog):
         # i don't know yet.
 
         guild_icon = message.guild.icon.url if message.guild.icon else "https://i.imgur.com/3ZUrjUP.png"
-        message_content = await commands.clean_content().convert(ctx, message.content)
-        message_content = profanity.censor(message_content, censor_char="#")
-        message_content = utils.censor_link(message_content)
-        message_content = utils.censor_invite(message_content)
+        with trace.span("censor"):
+            message_content = await prepared.censored_content()
 
-        embed = discord.Embed(
-            description=str(message_content),
-            color=0xEB6D15,
-            timestamp=message.created_at,
-        )
+        with trace.span("embeds"):
+            embed = discord.Embed(
+                description=str(message_content),
+                color=0xEB6D15,
+                timestamp=message.created_at,
+            )
 
-        embed.set_author(name=message.author, icon_url=ctx.author.display_avatar.url)
-        embed.set_footer(text=ctx.guild)
-        embed.set_thumbnail(url=guild_icon)
+            embed.set_author(name=message.author, icon_url=ctx.author.display_avatar.url)
+            embed.set_footer(text=ctx.guild)
+            embed.set_thumbnail(url=guild_icon)
 
         if not linked_channel.destination_channel:
             return print(f"missing destination channel : {linked_channel.destination_channel_id}")
 
+        result = DeliveryResult(linked_channel)
+        start = time.perf_counter()
         try:
-            await linked_channel.destination_channel.send(embed=embed)
+            with trace.span("fan_out"):
+                await self.bot.scheduler.submit(
+                    ("channel", linked_channel.destination_channel_id),
+                    functools.partial(linked_channel.destination_channel.send, embed=embed),
+                )
+            result.delivered = True
 
         except (discord.HTTPException, discord.Forbidden) as err:
+            result.error = err
             print("problematic linked channels")
             print(linked_channel.origin_channel_id)
             print(linked_channel.destination_channel_id)
@@ -85,6 +84,9 @@ class Link(commands.Cog):
 
             # handle error for non working linked channel.
 
+        result.latency = time.perf_counter() - start
+        self.bot.metrics.record_relay("linked", [result])
+
         # maybe make a way for there to be a webhooks on the linked chat too.
 
     @commands.hybrid_command(name="source")
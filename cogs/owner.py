@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import discord
+from discord.ext import commands
+
+if TYPE_CHECKING:
+    from main import Sincroni
+
+
+class Owner(commands.Cog):
+    "Diagnostics for the bot's owner"
+
+    def __init__(self, bot: Sincroni):
+        self.bot: Sincroni = bot
+
+    async def cog_check(self, ctx: commands.Context) -> bool:
+        if not await self.bot.is_owner(ctx.author):
+            raise commands.NotOwner("You do not own this bot.")
+        return True
+
+    @commands.command(name="queries", hidden=True)
+    async def queries(self, ctx: commands.Context, limit: int = 10, reset: bool = False):
+        """Shows the queries that took the most time together, needs DB_QUERY_STATS.
+
+        Parameters
+        ----------
+        limit : int
+            How many queries to show, up to 10. Defaults to 10.
+
+        reset: bool
+            Whatever or not to start counting again afterwards. Defaults to False.
+        """
+
+        instrumentation = self.bot.db.queries
+        if not instrumentation.enabled:
+            return await ctx.send("Query statistics are off, set DB_QUERY_STATS to turn them on.")
+
+        # an embed holds 6000 characters, about 10 queries.
+        top = instrumentation.top(max(1, min(limit, 10)))
+        if not top:
+            return await ctx.send("No queries were run yet.")
+
+        embed = discord.Embed(title="Queries by total time", color=discord.Color.blurple())
+        for stats in top:
+            embed.add_field(
+                name=f"{stats.total * 1000:.0f}ms in {stats.calls} calls",
+                value=(
+                    f"```sql\n{stats.query[:350]}\n```"
+                    f"run p50 {stats.execute.quantile(0.5) * 1000:.1f}ms, "
+                    f"p99 {stats.execute.quantile(0.99) * 1000:.1f}ms, max {stats.execute.max * 1000:.1f}ms\n"
+                    f"pool wait p99 {stats.acquire.quantile(0.99) * 1000:.1f}ms, "
+                    f"{stats.rows} rows, {stats.errors} errors, {stats.slow} slow"
+                ),
+                inline=False,
+            )
+
+        if reset:
+            instrumentation.reset()
+
+        await ctx.send(embed=embed)
+
+    @queries.error
+    async def queries_error(self, ctx: commands.Context, error):
+        await ctx.send(error)
+
+    @commands.command(name="pool", hidden=True)
+    async def pool(self, ctx: commands.Context):
+        """Shows how many database connections are open and in use."""
+
+        stats = self.bot.db.pool_stats
+        await ctx.send(
+            f"{stats['in_use']} of {stats['size']} connections in use, {stats['idle']} idle "
+            f"(between {stats['min_size']} and {stats['max_size']} connections)."
+        )
+
+    @pool.error
+    async def pool_error(self, ctx: commands.Context, error):
+        await ctx.send(error)
+
+    @commands.command(name="traces", hidden=True)
+    async def traces(self, ctx: commands.Context, limit: int = 5):
+        """Shows the slowest recently traced messages by stage, needs TRACE_SAMPLE_RATE.
+
+        Parameters
+        ----------
+        limit : int
+            How many messages to show, up to 10. Defaults to 5.
+        """
+
+        tracer = self.bot.tracer
+        if not tracer.enabled:
+            return await ctx.send("Tracing is off, set TRACE_SAMPLE_RATE to turn it on.")
+
+        slowest = tracer.slowest(max(1, min(limit, 10)))
+        if not slowest:
+            return await ctx.send("No messages were traced yet.")
+
+        embed = discord.Embed(
+            title="Slowest traced messages",
+            description=f"{len(tracer.traces)} traced, {tracer.sample_rate:.2%} of messages sampled.",
+            color=discord.Color.blurple(),
+        )
+        for trace in slowest:
+            # nested stages are indented under the handler they ran in.
+            stages = "\n".join(
+                f"{'  ' * span.depth}{span.name:<{24 - 2 * span.depth}} {span.duration / 1e6:>9.2f}ms"
+                + (f" {span.error}" if span.error else "")
+                for span in trace.walk()[:25]
+            )
+            embed.add_field(
+                name=f"{trace.duration / 1e6:.1f}ms, message {trace.attributes.get('message_id')}",
+                value=f"```\n{stages[:1000]}\n```",
+                inline=False,
+            )
+
+        await ctx.send(embed=embed)
+
+    @traces.error
+    async def traces_error(self, ctx: commands.Context, error):
+        await ctx.send(error)
+
+
+async def setup(bot: Sincroni):
+    await bot.add_cog(Owner(bot))
@@ -10,24 +10,81 @@ from typing import Any, Optional, Union
 
 import discord
 from aiohttp import ClientSession
+from better_profanity import profanity
 from discord.ext import commands
 
 from cogs import EXTENSIONS
+from utils.censor import DEFAULT_EXECUTOR_THRESHOLD, CensorEngine, CensorExecutor
 from utils.database.connection import DatabaseConnection
+from utils.database.migrations import MigrationError
+from utils.database.snapshot import CacheSnapshot
+from utils.delivery import DEFAULT_CONCURRENCY
+from utils.dispatch import DEFAULT_MAX_WAITING, DEFAULT_WARM_UP_TIMEOUT, MessageDispatcher
+from utils.metrics import Metrics, MetricsServer
+from utils.outbox import DeliveryOutbox
+from utils.recorder import TrafficRecorder
+from utils.relays import DEFAULT_MAX_MESSAGES, DEFAULT_TTL, RelayStore
+from utils.scheduler import DeliveryScheduler
+from utils.tracing import DEFAULT_BUFFER_SIZE, DEFAULT_EXPORT_INTERVAL, Tracer
 
 
 class Sincroni(commands.Bot):
     session: ClientSession
     db: DatabaseConnection
+    scheduler: DeliveryScheduler
+    censor: CensorEngine
+    censor_executor: CensorExecutor
+    dispatcher: MessageDispatcher
+    outbox: DeliveryOutbox
+    relays: RelayStore
+    metrics: Metrics
+    metrics_server: Optional[MetricsServer]
+    tracer: Tracer
+    recorder: Optional[TrafficRecorder]
+    _warm_up_task: Optional[asyncio.Task]
 
     def __init__(self, *, command_prefix: Any, intents: discord.Intents, **kwargs: Any):
         super().__init__(command_prefix=command_prefix, intents=intents, **kwargs)
         self.db = DatabaseConnection(self, os.getenv("DB_key"))  # type: ignore # this is fine
+        self.censor = CensorEngine(profanity)
+        self.censor_executor = CensorExecutor(
+            self.censor,
+            os.getenv("CENSOR_EXECUTOR") or None,  # type: ignore # validated by CensorExecutor
+            threshold=int(os.getenv("CENSOR_EXECUTOR_THRESHOLD", DEFAULT_EXECUTOR_THRESHOLD)),
+            workers=int(workers) if (workers := os.getenv("CENSOR_EXECUTOR_WORKERS")) else None,
+        )
+        self.dispatcher = MessageDispatcher(
+            self,
+            warm_up_timeout=float(os.getenv("WARM_UP_TIMEOUT", DEFAULT_WARM_UP_TIMEOUT)),
+            max_waiting=int(os.getenv("WARM_UP_MAX_WAITING", DEFAULT_MAX_WAITING)),
+        )
+        self.add_listener(self.dispatcher.dispatch, "on_message")
+        self.outbox = DeliveryOutbox(self)
+        self.metrics = Metrics(self)
+        self.metrics_server = None
+        self.tracer = Tracer(
+            sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 0)),
+            buffer_size=int(os.getenv("TRACE_BUFFER_SIZE", DEFAULT_BUFFER_SIZE)),
+            export_path=os.getenv("TRACE_EXPORT_PATH") or None,
+            export_interval=float(os.getenv("TRACE_EXPORT_INTERVAL", DEFAULT_EXPORT_INTERVAL)),
+        )
+        # opt in, records the shape of the global chat traffic without its content for load tests.
+        self.recorder = TrafficRecorder(self, path) if (path := os.getenv("TRAFFIC_RECORD_PATH")) else None
+        if self.recorder is not None:
+            self.dispatcher.add_consumer(self.recorder.record)
+        self.snapshot_path: Optional[str] = os.getenv("CACHE_SNAPSHOT")
+        # set by setup_hook, which may never run if logging in fails.
+        self._warm_up_task = None
+        self.relays = RelayStore(
+            self,
+            max_messages=int(os.getenv("RELAY_STORE_SIZE", DEFAULT_MAX_MESSAGES)),
+            ttl=float(os.getenv("RELAY_STORE_TTL", DEFAULT_TTL)),
+            persist=os.getenv("RELAY_STORE_PERSIST", "").lower() in ("1", "true", "yes"),
+        )
 
     async def setup_hook(self) -> None:
-        await self.db.create_connection()
-        self.pool = self.db._pool
-        self.session = ClientSession()
+        self.scheduler = DeliveryScheduler(int(os.getenv("GLOBAL_CHAT_CONCURRENCY", DEFAULT_CONCURRENCY)))
+        self.session = ClientSession(trace_configs=[self.scheduler.trace_config])
 
         cogs = await asyncio.gather(
             *[self.load_extension(f"{cog}") for cog in EXTENSIONS],
@@ -39,20 +96,93 @@ class Sincroni(commands.Bot):
             if isinstance(c, commands.errors.ExtensionError)
         ]
 
-        await bot.db.fetch_global_chats()
-        await bot.db.fetch_blacklists()
-        await bot.db.fetch_linked_channels()
-        await bot.db.fetch_embed_colors()
-        await bot.db.fetch_whitelists()
+        # the snapshot lets messages be relayed before the database answers, or while it is down.
+        snapshot = CacheSnapshot.read(self.snapshot_path) if self.snapshot_path else None
+        if snapshot is not None:
+            self.db.restore_snapshot(snapshot)
+
+        # loads the stored lists into cache while connecting to discord, messages wait for it.
+        self._warm_up_task = asyncio.create_task(self.warm_up_caches(snapshot))
 
-        # loads the stored lists into cache.
+        # after the cogs were loaded, as they add the extra censor words.
+        self.censor_executor.start()
+        self.outbox.start()
+        self.relays.start()
+        self.tracer.start()
+        if self.recorder is not None:
+            self.recorder.start()
+
+        if port := os.getenv("METRICS_PORT"):
+            self.metrics_server = MetricsServer(self.metrics, os.getenv("METRICS_HOST", "127.0.0.1"), int(port))
+            await self.metrics_server.start()
+
+    async def warm_up_caches(self, snapshot: Optional[CacheSnapshot] = None) -> None:
+        while True:
+            try:
+                if not self.db.connected:
+                    await self.db.create_connection()
+                    self.pool = self.db._pool
+
+                if os.getenv("DB_MIGRATE", "true").lower() in ("1", "true", "yes"):
+                    try:
+                        await self.db.migrate()
+                    except MigrationError as err:
+                        # the caches work on the schema as it is, the migration waits for an admin.
+                        print(f"{err}, continuing without it.")
+
+                if os.getenv("DB_LISTEN", "").lower() in ("1", "true", "yes"):
+                    await self.db.listen()
+
+                await self.db.warm_up(snapshot.watermarks if snapshot else None)
+                break
+            except Exception as err:
+                traceback.print_exception(type(err), err, err.__traceback__)
+                print("Failed to load the caches, trying again in 5 seconds.")
+                await asyncio.sleep(5)
+
+        if not self.snapshot_path:
+            return
+
+        interval = float(os.getenv("CACHE_SNAPSHOT_INTERVAL", 300))
+        while True:
+            await self.write_snapshot()
+            await asyncio.sleep(interval)
+
+    async def write_snapshot(self) -> None:
+        if not self.snapshot_path or not self.db.warmed_up.is_set():
+            return
+
+        # taken in the event loop so the caches don't change halfway, compressed and written in a thread.
+        snapshot = self.db.take_snapshot()
+        try:
+            await asyncio.to_thread(snapshot.write, self.snapshot_path)
+        except OSError as err:
+            traceback.print_exception(type(err), err, err.__traceback__)
 
     async def close(self) -> None:
-        await self.session.close()
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+        self.censor_executor.shutdown()
+        # like the warm up, the scheduler and session only exist once setup_hook ran.
+        if hasattr(self, "scheduler"):
+            await self.scheduler.close()
+        # let the cancelled deliveries reach the outbox before it is flushed.
+        await asyncio.sleep(0)
+        await self.outbox.close()
+        await self.relays.close()
+        await self.write_snapshot()
+        await self.tracer.close()
+        if self.recorder is not None:
+            await self.recorder.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        if hasattr(self, "session"):
+            await self.session.close()
         await self.db.close()
         await super().close()
 
     async def on_error(self, event, *args: Any, **kwargs: Any) -> None:
+        self.metrics.errors.inc(event)
         more_information = sys.exc_info()
         error_wanted = traceback.format_exc()
         traceback.print_exc()
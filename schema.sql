@@ -23,6 +23,21 @@ SET row_security = off;
 -- *not* creating schema, since initdb creates it
 
 
+--
+-- Name: sincroni_bump_version(); Type: FUNCTION; Schema: public; Owner: -
+--
+
+CREATE FUNCTION public.sincroni_bump_version() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        INSERT INTO SINCRONI_TABLE_VERSIONS (table_name, version) VALUES (upper(TG_TABLE_NAME), 1)
+        ON CONFLICT (table_name) DO UPDATE SET version = SINCRONI_TABLE_VERSIONS.version + 1;
+        RETURN NULL;
+    END;
+    $$;
+
+
 SET default_tablespace = '';
 
 SET default_table_access_method = heap;
@@ -134,6 +149,75 @@ CREATE SEQUENCE public.sincroni_linked_channels_id_seq
 ALTER SEQUENCE public.sincroni_linked_channels_id_seq OWNED BY public.sincroni_linked_channels.id;
 
 
+--
+-- Name: sincroni_outbox; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.sincroni_outbox (
+    id bigint NOT NULL,
+    channel_id bigint NOT NULL,
+    webhook_url text,
+    payload jsonb NOT NULL,
+    attempts smallint DEFAULT 0 NOT NULL,
+    next_attempt_at timestamp with time zone DEFAULT now() NOT NULL,
+    last_error text,
+    created_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+--
+-- Name: sincroni_outbox_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+CREATE SEQUENCE public.sincroni_outbox_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+--
+-- Name: sincroni_outbox_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: -
+--
+
+ALTER SEQUENCE public.sincroni_outbox_id_seq OWNED BY public.sincroni_outbox.id;
+
+
+--
+-- Name: sincroni_relayed_messages; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.sincroni_relayed_messages (
+    origin_message_id bigint NOT NULL,
+    channel_id bigint NOT NULL,
+    message_id bigint NOT NULL,
+    webhook_id bigint,
+    created_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+--
+-- Name: sincroni_schema_migrations; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.sincroni_schema_migrations (
+    version integer NOT NULL,
+    description text NOT NULL,
+    applied_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+--
+-- Name: sincroni_table_versions; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.sincroni_table_versions (
+    table_name text NOT NULL,
+    version bigint DEFAULT 0 NOT NULL
+);
+
+
 --
 -- Name: sincroni_whitelist; Type: TABLE; Schema: public; Owner: -
 --
@@ -180,6 +264,13 @@ ALTER TABLE ONLY public.sincroni_blacklist ALTER COLUMN id SET DEFAULT nextval('
 ALTER TABLE ONLY public.sincroni_linked_channels ALTER COLUMN id SET DEFAULT nextval('public.sincroni_linked_channels_id_seq'::regclass);
 
 
+--
+-- Name: sincroni_outbox id; Type: DEFAULT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.sincroni_outbox ALTER COLUMN id SET DEFAULT nextval('public.sincroni_outbox_id_seq'::regclass);
+
+
 --
 -- Name: sincroni_whitelist id; Type: DEFAULT; Schema: public; Owner: -
 --
@@ -187,6 +278,14 @@ ALTER TABLE ONLY public.sincroni_linked_channels ALTER COLUMN id SET DEFAULT nex
 ALTER TABLE ONLY public.sincroni_whitelist ALTER COLUMN id SET DEFAULT nextval('public.sincroni_whitelist_id_seq'::regclass);
 
 
+--
+-- Name: sincroni_blacklist sincroni_blacklist_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.sincroni_blacklist
+    ADD CONSTRAINT sincroni_blacklist_pkey PRIMARY KEY (id);
+
+
 --
 -- Name: sincroni_global_chat sicroni_global_chat_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
@@ -219,6 +318,137 @@ ALTER TABLE ONLY public.sincroni_embed_color
     ADD CONSTRAINT sincroni_embed_color_server_id_chat_type_key UNIQUE (server_id, chat_type);
 
 
+--
+-- Name: sincroni_linked_channels sincroni_linked_channels_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.sincroni_linked_channels
+    ADD CONSTRAINT sincroni_linked_channels_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: sincroni_outbox sincroni_outbox_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.sincroni_outbox
+    ADD CONSTRAINT sincroni_outbox_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: sincroni_schema_migrations sincroni_schema_migrations_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.sincroni_schema_migrations
+    ADD CONSTRAINT sincroni_schema_migrations_pkey PRIMARY KEY (version);
+
+
+--
+-- Name: sincroni_table_versions sincroni_table_versions_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.sincroni_table_versions
+    ADD CONSTRAINT sincroni_table_versions_pkey PRIMARY KEY (table_name);
+
+
+--
+-- Name: sincroni_whitelist sincroni_whitelist_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.sincroni_whitelist
+    ADD CONSTRAINT sincroni_whitelist_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: sincroni_blacklist_server_entity; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE UNIQUE INDEX sincroni_blacklist_server_entity ON public.sincroni_blacklist USING btree (server_id, entity_id);
+
+
+--
+-- Name: sincroni_global_chat_channel; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX sincroni_global_chat_channel ON public.sincroni_global_chat USING btree (channel_id);
+
+
+--
+-- Name: sincroni_linked_channels_origin; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX sincroni_linked_channels_origin ON public.sincroni_linked_channels USING btree (origin_channel_id);
+
+
+--
+-- Name: sincroni_outbox_next_attempt; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX sincroni_outbox_next_attempt ON public.sincroni_outbox USING btree (next_attempt_at);
+
+
+--
+-- Name: sincroni_relayed_messages_created; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX sincroni_relayed_messages_created ON public.sincroni_relayed_messages USING btree (created_at);
+
+
+--
+-- Name: sincroni_relayed_messages_origin; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX sincroni_relayed_messages_origin ON public.sincroni_relayed_messages USING btree (origin_message_id);
+
+
+--
+-- Name: sincroni_whitelist_entity; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE UNIQUE INDEX sincroni_whitelist_entity ON public.sincroni_whitelist USING btree (entity_id);
+
+
+--
+-- Name: sincroni_blacklist sincroni_blacklist_version; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER sincroni_blacklist_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.sincroni_blacklist FOR EACH STATEMENT EXECUTE FUNCTION public.sincroni_bump_version();
+
+
+--
+-- Name: sincroni_config sincroni_config_version; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER sincroni_config_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.sincroni_config FOR EACH STATEMENT EXECUTE FUNCTION public.sincroni_bump_version();
+
+
+--
+-- Name: sincroni_embed_color sincroni_embed_color_version; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER sincroni_embed_color_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.sincroni_embed_color FOR EACH STATEMENT EXECUTE FUNCTION public.sincroni_bump_version();
+
+
+--
+-- Name: sincroni_global_chat sincroni_global_chat_version; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER sincroni_global_chat_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.sincroni_global_chat FOR EACH STATEMENT EXECUTE FUNCTION public.sincroni_bump_version();
+
+
+--
+-- Name: sincroni_linked_channels sincroni_linked_channels_version; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER sincroni_linked_channels_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.sincroni_linked_channels FOR EACH STATEMENT EXECUTE FUNCTION public.sincroni_bump_version();
+
+
+--
+-- Name: sincroni_whitelist sincroni_whitelist_version; Type: TRIGGER; Schema: public; Owner: -
+--
+
+CREATE TRIGGER sincroni_whitelist_version AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON public.sincroni_whitelist FOR EACH STATEMENT EXECUTE FUNCTION public.sincroni_bump_version();
+
+
 --
 -- Name: SCHEMA public; Type: ACL; Schema: -; Owner: -
 --
@@ -15,15 +15,19 @@ CREATE TABLE IF NOT EXISTS SINCRONI_BLACKLIST(
    dev BOOLEAN DEFAULT FALSE,
    private BOOLEAN DEFAULT FALSE,
    blacklist_type SMALLINT DEFAULT 0,
-   reason TEXT DEFAULT "No reason provided"
+   reason TEXT DEFAULT 'No reason provided',
    repeat BOOLEAN DEFAULT FALSE,
+   PRIMARY KEY (id),
+   UNIQUE (server_id, entity_id)
 )
 
 CREATE TABLE IF NOT EXISTS SINCRONI_WHITELIST(
   id SERIAL NOT NULL,
   entity_id BIGINT NOT NULL,
   whitelist_type smallint DEFAULT 0,
-  reason TEXT DEFAULT "No reason provided"
+  reason TEXT DEFAULT 'No reason provided',
+  PRIMARY KEY (id),
+  UNIQUE (entity_id)
 )
 
 
@@ -32,7 +36,8 @@ CREATE TABLE IF NOT EXISTS SINCRONI_LINKED_CHANNELS(
   origin_channel_id BIGINT NOT NULL,
   origin_webhook_url TEXT,
   destination_channel_id BIGINT NOT NULL,
-  destination_webhook_url TEXT
+  destination_webhook_url TEXT,
+  PRIMARY KEY (id)
 )
 
 CREATE TABLE IF NOT EXISTS SINCRONI_EMBED_COLOR(
@@ -51,3 +56,111 @@ censor_invites BOOLEAN DEFAULT FALSE,
 chat_type smallint DEFAULT 0,
 UNIQUE (server_id, chat_type)
 )
+
+CREATE TABLE IF NOT EXISTS SINCRONI_OUTBOX(
+id BIGSERIAL PRIMARY KEY,
+channel_id BIGINT NOT NULL,
+webhook_url TEXT,
+payload JSONB NOT NULL,
+attempts SMALLINT DEFAULT 0 NOT NULL,
+next_attempt_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+last_error TEXT,
+created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+)
+
+CREATE TABLE IF NOT EXISTS SINCRONI_RELAYED_MESSAGES(
+origin_message_id BIGINT NOT NULL,
+channel_id BIGINT NOT NULL,
+message_id BIGINT NOT NULL,
+webhook_id BIGINT,
+created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+)
+
+CREATE INDEX IF NOT EXISTS sincroni_relayed_messages_origin ON SINCRONI_RELAYED_MESSAGES (origin_message_id)
+
+CREATE INDEX IF NOT EXISTS sincroni_relayed_messages_created ON SINCRONI_RELAYED_MESSAGES (created_at)
+
+CREATE INDEX IF NOT EXISTS sincroni_outbox_next_attempt ON SINCRONI_OUTBOX (next_attempt_at)
+
+CREATE INDEX IF NOT EXISTS sincroni_linked_channels_origin ON SINCRONI_LINKED_CHANNELS (origin_channel_id)
+
+CREATE INDEX IF NOT EXISTS sincroni_global_chat_channel ON SINCRONI_GLOBAL_CHAT (channel_id)
+
+CREATE TABLE IF NOT EXISTS SINCRONI_TABLE_VERSIONS(
+table_name TEXT PRIMARY KEY,
+version BIGINT DEFAULT 0 NOT NULL
+)
+
+CREATE OR REPLACE FUNCTION sincroni_bump_version() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO SINCRONI_TABLE_VERSIONS (table_name, version) VALUES (upper(TG_TABLE_NAME), 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = SINCRONI_TABLE_VERSIONS.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+
+DROP TRIGGER IF EXISTS sincroni_global_chat_version ON SINCRONI_GLOBAL_CHAT
+CREATE TRIGGER sincroni_global_chat_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SINCRONI_GLOBAL_CHAT FOR EACH STATEMENT EXECUTE FUNCTION sincroni_bump_version()
+DROP TRIGGER IF EXISTS sincroni_blacklist_version ON SINCRONI_BLACKLIST
+CREATE TRIGGER sincroni_blacklist_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SINCRONI_BLACKLIST FOR EACH STATEMENT EXECUTE FUNCTION sincroni_bump_version()
+DROP TRIGGER IF EXISTS sincroni_whitelist_version ON SINCRONI_WHITELIST
+CREATE TRIGGER sincroni_whitelist_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SINCRONI_WHITELIST FOR EACH STATEMENT EXECUTE FUNCTION sincroni_bump_version()
+DROP TRIGGER IF EXISTS sincroni_linked_channels_version ON SINCRONI_LINKED_CHANNELS
+CREATE TRIGGER sincroni_linked_channels_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SINCRONI_LINKED_CHANNELS FOR EACH STATEMENT EXECUTE FUNCTION sincroni_bump_version()
+DROP TRIGGER IF EXISTS sincroni_embed_color_version ON SINCRONI_EMBED_COLOR
+CREATE TRIGGER sincroni_embed_color_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SINCRONI_EMBED_COLOR FOR EACH STATEMENT EXECUTE FUNCTION sincroni_bump_version()
+DROP TRIGGER IF EXISTS sincroni_config_version ON SINCRONI_CONFIG
+CREATE TRIGGER sincroni_config_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SINCRONI_CONFIG FOR EACH STATEMENT EXECUTE FUNCTION sincroni_bump_version()
+
+-- Only needed with DB_LISTEN, which installs the function and triggers below itself.
+-- Every write to the cached tables pays for the notification.
+
+CREATE OR REPLACE FUNCTION sincroni_notify_change() RETURNS TRIGGER AS $$
+DECLARE
+    payload TEXT;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        payload := json_build_object('table', upper(TG_TABLE_NAME))::TEXT;
+    ELSE
+        payload := json_build_object(
+            'table', upper(TG_TABLE_NAME),
+            'old', CASE WHEN TG_OP <> 'INSERT' THEN row_to_json(OLD) END,
+            'new', CASE WHEN TG_OP <> 'DELETE' THEN row_to_json(NEW) END
+        )::TEXT;
+
+        -- payloads have to be shorter than 8000 bytes, the listener reloads the table instead.
+        IF octet_length(payload) >= 8000 THEN
+            payload := json_build_object('table', upper(TG_TABLE_NAME))::TEXT;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('sincroni_changes', payload);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+
+DROP TRIGGER IF EXISTS sincroni_global_chat_notify ON SINCRONI_GLOBAL_CHAT
+CREATE TRIGGER sincroni_global_chat_notify AFTER INSERT OR UPDATE OR DELETE ON SINCRONI_GLOBAL_CHAT FOR EACH ROW EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_blacklist_notify ON SINCRONI_BLACKLIST
+CREATE TRIGGER sincroni_blacklist_notify AFTER INSERT OR UPDATE OR DELETE ON SINCRONI_BLACKLIST FOR EACH ROW EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_whitelist_notify ON SINCRONI_WHITELIST
+CREATE TRIGGER sincroni_whitelist_notify AFTER INSERT OR UPDATE OR DELETE ON SINCRONI_WHITELIST FOR EACH ROW EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_linked_channels_notify ON SINCRONI_LINKED_CHANNELS
+CREATE TRIGGER sincroni_linked_channels_notify AFTER INSERT OR UPDATE OR DELETE ON SINCRONI_LINKED_CHANNELS FOR EACH ROW EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_embed_color_notify ON SINCRONI_EMBED_COLOR
+CREATE TRIGGER sincroni_embed_color_notify AFTER INSERT OR UPDATE OR DELETE ON SINCRONI_EMBED_COLOR FOR EACH ROW EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_config_notify ON SINCRONI_CONFIG
+CREATE TRIGGER sincroni_config_notify AFTER INSERT OR UPDATE OR DELETE ON SINCRONI_CONFIG FOR EACH ROW EXECUTE FUNCTION sincroni_notify_change()
+
+DROP TRIGGER IF EXISTS sincroni_global_chat_truncate ON SINCRONI_GLOBAL_CHAT
+CREATE TRIGGER sincroni_global_chat_truncate AFTER TRUNCATE ON SINCRONI_GLOBAL_CHAT FOR EACH STATEMENT EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_blacklist_truncate ON SINCRONI_BLACKLIST
+CREATE TRIGGER sincroni_blacklist_truncate AFTER TRUNCATE ON SINCRONI_BLACKLIST FOR EACH STATEMENT EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_whitelist_truncate ON SINCRONI_WHITELIST
+CREATE TRIGGER sincroni_whitelist_truncate AFTER TRUNCATE ON SINCRONI_WHITELIST FOR EACH STATEMENT EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_linked_channels_truncate ON SINCRONI_LINKED_CHANNELS
+CREATE TRIGGER sincroni_linked_channels_truncate AFTER TRUNCATE ON SINCRONI_LINKED_CHANNELS FOR EACH STATEMENT EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_embed_color_truncate ON SINCRONI_EMBED_COLOR
+CREATE TRIGGER sincroni_embed_color_truncate AFTER TRUNCATE ON SINCRONI_EMBED_COLOR FOR EACH STATEMENT EXECUTE FUNCTION sincroni_notify_change()
+DROP TRIGGER IF EXISTS sincroni_config_truncate ON SINCRONI_CONFIG
+CREATE TRIGGER sincroni_config_truncate AFTER TRUNCATE ON SINCRONI_CONFIG FOR EACH STATEMENT EXECUTE FUNCTION sincroni_notify_change()
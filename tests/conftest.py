@@ -0,0 +1,50 @@
+"""The tests that need Postgres read it from ``DATABASE_URL``, or the bot's ``DB_key``, and are
+skipped without either.
+
+Each test module gets a schema of its own that is dropped afterwards, so any database the URL
+points at is left as it was. Don't point it at the database of a running bot though: the
+notifications of the cache sync test go to every listener of the database, whatever the schema.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from typing import Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import asyncpg
+import pytest
+
+
+@pytest.fixture(scope="session")
+def database_url() -> str:
+    url = os.getenv("DATABASE_URL") or os.getenv("DB_key")
+    if not url:
+        pytest.skip("neither DATABASE_URL nor DB_key is set")
+
+    return url
+
+
+async def _execute(url: str, statement: str) -> None:
+    connection = await asyncpg.connect(url)
+    try:
+        await connection.execute(statement)
+    finally:
+        await connection.close()
+
+
+@pytest.fixture(scope="module")
+def scratch_dsn(database_url: str) -> Iterator[str]:
+    """The database URL with a new, empty schema first in the ``search_path``."""
+    schema = f"sincroni_test_{uuid.uuid4().hex[:12]}"
+    asyncio.run(_execute(database_url, f"CREATE SCHEMA {schema}"))
+
+    # asyncpg sends the query parameters it doesn't know as server settings.
+    parts = urlsplit(database_url)
+    query = urlencode([*parse_qsl(parts.query), ("search_path", schema)])
+    try:
+        yield urlunsplit(parts._replace(query=query))
+    finally:
+        asyncio.run(_execute(database_url, f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
@@ -0,0 +1,106 @@
+"""Writes made by one process reach the caches of another through LISTEN/NOTIFY."""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+from typing import Any, Callable, Dict
+
+from utils.database.connection import DatabaseConnection
+
+# seconds the follower waits for a change to arrive.
+TIMEOUT = 10.0
+BULK = 100
+
+# what the follower waits to see after each step of the writer.
+CONDITIONS: Dict[str, Callable[[DatabaseConnection], bool]] = {
+    "added": lambda db: db.get_blacklist(1, 2) is not None and db.get_blacklist(1, 2).reason == "added",
+    "updated": lambda db: db.get_blacklist(1, 2) is not None and db.get_blacklist(1, 2).reason == "updated",
+    "removed": lambda db: db.get_blacklist(1, 2) is None,
+    "bulk": lambda db: len(db.blacklists) == BULK and db.get_whitelist(3) is not None,
+    "bulk_removed": lambda db: len(db.blacklists) == BULK // 2 and db.get_blacklist(1, 10) is None,
+    "truncated": lambda db: not db.blacklists,
+}
+
+
+async def follow(dsn: str, steps: Any, seen: Any) -> None:
+    db = DatabaseConnection(None, dsn)  # type: ignore # models don't need the bot here
+    await db.create_connection()
+    try:
+        await db.listen()
+        await db.warm_up()
+        seen.put("ready")
+
+        while (step := await asyncio.to_thread(steps.get)) is not None:
+            deadline = time.monotonic() + TIMEOUT
+            while not CONDITIONS[step](db) and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            seen.put(step if CONDITIONS[step](db) else f"timed out waiting for {step}")
+    finally:
+        await db.close()
+
+
+def follower(dsn: str, steps: Any, seen: Any) -> None:
+    asyncio.run(follow(dsn, steps, seen))
+
+
+async def migrate(dsn: str) -> None:
+    db = DatabaseConnection(None, dsn)  # type: ignore
+    await db.create_connection()
+    try:
+        await db.migrate()
+    finally:
+        await db.close()
+
+
+async def write(dsn: str, steps: Any, seen: Any) -> None:
+    db = DatabaseConnection(None, dsn)  # type: ignore
+    await db.create_connection()
+
+    async def step(name: str) -> str:
+        steps.put(name)
+        return await asyncio.to_thread(seen.get, True, TIMEOUT * 2)
+
+    try:
+        await db.add_blacklist(1, 2, pub=True, reason="added")
+        assert await step("added") == "added"
+
+        await db.add_blacklists([{"server_id": 1, "entity_id": 2, "pub": True, "reason": "updated"}])
+        assert await step("updated") == "updated"
+
+        await db.remove_blacklist(1, 2)
+        assert await step("removed") == "removed"
+
+        await db.add_blacklists({"server_id": 1, "entity_id": entity_id} for entity_id in range(10, 10 + BULK))
+        await db.add_whitelists([{"entity_id": 3}])
+        assert await step("bulk") == "bulk"
+
+        removed = await db.remove_blacklists((1, entity_id) for entity_id in range(10, 10 + BULK // 2))
+        assert sorted(blacklist.entity_id for blacklist in removed) == list(range(10, 10 + BULK // 2))
+        assert len(db.blacklists) == BULK // 2 and db.get_blacklist(1, 10) is None
+        assert await step("bulk_removed") == "bulk_removed"
+
+        await db.execute("TRUNCATE SINCRONI_BLACKLIST")
+        assert await step("truncated") == "truncated"
+    finally:
+        await db.close()
+
+
+def test_another_process_sees_the_writes(scratch_dsn: str) -> None:
+    asyncio.run(migrate(scratch_dsn))
+
+    context = multiprocessing.get_context("spawn")
+    steps, seen = context.Queue(), context.Queue()
+    process = context.Process(target=follower, args=(scratch_dsn, steps, seen), daemon=True)
+    process.start()
+    try:
+        assert seen.get(timeout=TIMEOUT * 3) == "ready"
+        asyncio.run(write(scratch_dsn, steps, seen))
+    finally:
+        steps.put(None)
+        process.join(TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+
+    assert process.exitcode == 0
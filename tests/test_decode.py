@@ -0,0 +1,77 @@
+"""Decoding a whole table of records into models, by column name against by position.
+
+The records are built like the pool returns them for ``SELECT * FROM SINCRONI_BLACKLIST`` and
+for the explicit column list the cache loaders use. The snapshot cases restore the rows of a
+cache snapshot, which used to go through a dict each. Compare them with
+``python -m pytest tests/test_decode.py``, or skip the timing with ``--benchmark-disable``.
+"""
+
+from __future__ import annotations
+
+import gc
+import tracemalloc
+from typing import Any, Callable, List
+
+import pytest
+
+# private, but the only way to make records without a database.
+from asyncpg.protocol.protocol import _create_record
+
+from benchmarks.models import make_rows
+from utils.database.models import Blacklist
+
+pytest.importorskip("pytest_benchmark")
+
+ROWS = 10_000
+
+
+def make_records(count: int) -> List[Any]:
+    # a different column order than COLUMNS, like SELECT * on a table whose columns were added later.
+    columns = ("repeat", *Blacklist.COLUMNS[:-1])
+    by_name = {column: index for index, column in enumerate(columns)}
+    return [_create_record(by_name, tuple(row[column] for column in columns)) for row in make_rows(count)]
+
+
+def make_positional_records(count: int) -> List[Any]:
+    by_position = {column: index for index, column in enumerate(Blacklist.COLUMNS)}
+    return [_create_record(by_position, tuple(row[column] for column in Blacklist.COLUMNS)) for row in make_rows(count)]
+
+
+def make_snapshot_rows(count: int) -> List[Any]:
+    return [list(record) for record in make_positional_records(count)]
+
+
+CASES = [
+    pytest.param(make_records, lambda record: Blacklist(None, record), id="records-by-name"),  # type: ignore
+    pytest.param(make_positional_records, lambda record: Blacklist.from_row(None, record), id="records-from_row"),  # type: ignore
+    pytest.param(
+        make_snapshot_rows, lambda row: Blacklist(None, dict(zip(Blacklist.COLUMNS, row))), id="snapshot-dict"  # type: ignore
+    ),
+    pytest.param(make_snapshot_rows, lambda row: Blacklist.from_row(None, row), id="snapshot-from_row"),  # type: ignore
+]
+
+
+@pytest.mark.parametrize(("make", "decode"), CASES)
+def test_decode(benchmark: Any, make: Callable[[int], List[Any]], decode: Callable[[Any], Blacklist]) -> None:
+    records = make(ROWS)
+    benchmark.group = "snapshot" if make is make_snapshot_rows else "records"
+
+    gc.collect()
+    tracemalloc.start()
+    models = [decode(record) for record in records]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    benchmark.extra_info["bytes_per_row"] = round(allocated / ROWS)
+
+    # every way decodes the same values, whatever the column order.
+    for model, row in zip(models, make_rows(ROWS)):
+        assert (model.id, model.server_id, model.entity_id, model.raw_blacklist_type, model.reason) == (
+            row["id"],
+            row["server_id"],
+            row["entity_id"],
+            row["blacklist_type"],
+            row["reason"],
+        )
+    del models
+
+    benchmark(lambda: [decode(record) for record in records])
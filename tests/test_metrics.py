@@ -0,0 +1,80 @@
+"""The metrics server answers a Prometheus scrape with every metric in the text format."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+from typing import List, Tuple
+
+from aiohttp import ClientSession
+
+from utils.database.connection import DatabaseConnection
+from utils.delivery import DeliveryResult
+from utils.metrics import CONTENT_TYPE, Metrics, MetricsServer
+
+# a sample line: a name, optional labels and a value.
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*",?)*\})? -?[0-9.e+Inf]+$')
+
+
+def results(delivered: int, failed: int, skipped: int) -> List[DeliveryResult]:
+    made: List[DeliveryResult] = []
+    for index in range(delivered + failed + skipped):
+        result = DeliveryResult(index)
+        result.latency = 0.01 * (index + 1)
+        if index < delivered:
+            result.delivered = True
+        elif index < delivered + failed:
+            result.error = TimeoutError()
+        made.append(result)
+    return made
+
+
+async def scrape() -> Tuple[MetricsServer, int, str, str]:
+    bot = SimpleNamespace(db=DatabaseConnection(None, ""))  # type: ignore # no pool, the pool gauges are 0
+    metrics = Metrics(bot)  # type: ignore
+    metrics.record_relay("public", results(20, 2, 1))
+    metrics.record_relay("developer", results(3, 0, 0))
+    metrics.errors.inc("on_message")
+
+    server = MetricsServer(metrics, port=0, lag_interval=0.05)
+    await server.start()
+    try:
+        # block the loop once, so lag is measured.
+        await asyncio.sleep(0.06)
+        time.sleep(0.05)
+        await asyncio.sleep(0.1)
+
+        async with ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{server.port}/metrics") as response:
+                return server, response.status, response.headers["Content-Type"], await response.text()
+    finally:
+        await server.close()
+
+
+def test_scrape() -> None:
+    server, status, content_type, text = asyncio.run(scrape())
+
+    assert server.port != 0
+    assert status == 200
+    assert content_type == CONTENT_TYPE
+
+    invalid = [line for line in text.splitlines() if line and not line.startswith("#") and not SAMPLE.match(line)]
+    assert not invalid
+
+    for expected in (
+        'sincroni_relays_total{chat_type="public"} 1',
+        'sincroni_relays_total{chat_type="developer"} 1',
+        'sincroni_fan_out_destinations_count{chat_type="public"} 1',
+        'sincroni_delivery_seconds_count{chat_type="public"} 20',
+        'sincroni_delivery_failures_total{chat_type="public",error="TimeoutError"} 2',
+        'sincroni_delivery_skipped_total{chat_type="public"} 1',
+        'sincroni_event_errors_total{event="on_message"} 1',
+        'sincroni_cache_entries{cache="blacklists"} 0',
+        'sincroni_db_pool_connections{state="in_use"} 0',
+    ):
+        assert expected in text.splitlines()
+
+    lag = re.search(r"^sincroni_event_loop_lag_seconds_count (\d+)$", text, re.MULTILINE)
+    assert lag is not None and int(lag.group(1)) > 0
@@ -0,0 +1,140 @@
+"""The lookups of ``DatabaseConnection`` use an index at realistic table sizes."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+import asyncpg
+import pytest
+
+from utils.database.migrations import migrate
+
+# how many blacklists, the other tables scale with it.
+ROWS = 100_000
+
+# every lookup that runs per message or per command, with the table it reads.
+QUERIES = [
+    pytest.param(
+        "sincroni_blacklist",
+        "SELECT * FROM SINCRONI_BLACKLIST WHERE server_id = $1 AND entity_id = $2",
+        (42, 1_000_042),
+        id="fetch_blacklist",
+    ),
+    pytest.param(
+        "sincroni_blacklist",
+        "DELETE FROM SINCRONI_BLACKLIST WHERE server_id = $1 AND entity_id = $2",
+        (42, 1_000_042),
+        id="remove_blacklist",
+    ),
+    pytest.param(
+        "sincroni_whitelist",
+        "SELECT * FROM SINCRONI_WHITELIST WHERE entity_id = $1",
+        (2_000_042,),
+        id="fetch_whitelist",
+    ),
+    pytest.param(
+        "sincroni_whitelist",
+        "DELETE FROM SINCRONI_WHITELIST WHERE entity_id = $1",
+        (2_000_042,),
+        id="remove_whitelist",
+    ),
+    pytest.param(
+        "sincroni_linked_channels",
+        "SELECT * FROM SINCRONI_LINKED_CHANNELS WHERE origin_channel_id = $1",
+        (3_000_042,),
+        id="fetch_linked_channel",
+    ),
+    pytest.param(
+        "sincroni_global_chat",
+        "SELECT * FROM SINCRONI_GLOBAL_CHAT WHERE channel_id = $1",
+        (4_000_042,),
+        id="fetch_global_chat",
+    ),
+    pytest.param(
+        "sincroni_relayed_messages",
+        "SELECT channel_id, message_id, webhook_id FROM SINCRONI_RELAYED_MESSAGES "
+        "WHERE origin_message_id = $1 AND created_at > NOW() - make_interval(secs => $2)",
+        (5_000_042, 86400.0),
+        id="fetch_relayed_messages",
+    ),
+]
+
+
+def scans(plan: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    """Every ``(node type, relation)`` of a plan that reads a table."""
+    if "Relation Name" in plan:
+        yield plan["Node Type"], plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+async def fill(connection: asyncpg.Connection, rows: int) -> None:
+    await connection.execute(
+        """
+        INSERT INTO SINCRONI_BLACKLIST (server_id, entity_id, blacklist_type)
+        SELECT index % 5000, 1000000 + index, index % 2 FROM generate_series(1, $1) AS index
+        """,
+        rows,
+    )
+    await connection.execute(
+        "INSERT INTO SINCRONI_WHITELIST (entity_id) SELECT 2000000 + index FROM generate_series(1, $1) AS index",
+        rows // 10,
+    )
+    await connection.execute(
+        """
+        INSERT INTO SINCRONI_LINKED_CHANNELS (origin_channel_id, destination_channel_id)
+        SELECT 3000000 + index, 3500000 + index FROM generate_series(1, $1) AS index
+        """,
+        rows // 10,
+    )
+    await connection.execute(
+        """
+        INSERT INTO SINCRONI_GLOBAL_CHAT (server_id, channel_id, chat_type)
+        SELECT index, 4000000 + index, index % 4 FROM generate_series(1, $1) AS index
+        """,
+        rows // 10,
+    )
+    await connection.execute(
+        """
+        INSERT INTO SINCRONI_RELAYED_MESSAGES (origin_message_id, channel_id, message_id)
+        SELECT 5000000 + index / 20, index, index FROM generate_series(1, $1) AS index
+        """,
+        rows * 2,
+    )
+    await connection.execute("ANALYZE")
+
+
+@pytest.fixture(scope="module")
+def filled_dsn(scratch_dsn: str) -> str:
+    async def prepare() -> None:
+        connection = await asyncpg.connect(scratch_dsn)
+        try:
+            await migrate(connection)
+            await fill(connection, ROWS)
+        finally:
+            await connection.close()
+
+    asyncio.run(prepare())
+    return scratch_dsn
+
+
+async def plan_nodes(dsn: str, table: str, query: str, arguments: Tuple[Any, ...]) -> List[str]:
+    connection = await asyncpg.connect(dsn)
+    try:
+        # EXPLAIN doesn't run it, so DELETEs leave the rows alone.
+        result = await connection.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *arguments)
+    finally:
+        await connection.close()
+
+    plan = json.loads(result)[0]["Plan"]
+    return [node for node, relation in scans(plan) if relation == table]
+
+
+@pytest.mark.parametrize(("table", "query", "arguments"), QUERIES)
+def test_lookup_uses_an_index(filled_dsn: str, table: str, query: str, arguments: Tuple[Any, ...]) -> None:
+    nodes = asyncio.run(plan_nodes(filled_dsn, table, query, arguments))
+
+    assert nodes, f"the plan doesn't read {table}"
+    assert "Seq Scan" not in nodes, f"{table} is scanned: {', '.join(nodes)}"
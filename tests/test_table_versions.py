@@ -0,0 +1,40 @@
+"""The table versions a cache snapshot is compared against change with every committed write."""
+
+from __future__ import annotations
+
+import asyncio
+
+import asyncpg
+
+from utils.database.migrations import migrate
+
+
+async def version(connection: asyncpg.Connection, table: str) -> int:
+    return await connection.fetchval("SELECT version FROM SINCRONI_TABLE_VERSIONS WHERE table_name = $1", table)
+
+
+def test_writes_bump_the_version(scratch_dsn: str) -> None:
+    async def run() -> None:
+        connection = await asyncpg.connect(scratch_dsn)
+        try:
+            await migrate(connection)
+            start = await version(connection, "SINCRONI_BLACKLIST")
+
+            await connection.execute("INSERT INTO SINCRONI_BLACKLIST (server_id, entity_id) VALUES (1, 2)")
+            assert await version(connection, "SINCRONI_BLACKLIST") == start + 1
+
+            await connection.execute("TRUNCATE SINCRONI_BLACKLIST")
+            assert await version(connection, "SINCRONI_BLACKLIST") == start + 2
+
+            # a write that is rolled back leaves the version as it was.
+            transaction = connection.transaction()
+            await transaction.start()
+            await connection.execute("INSERT INTO SINCRONI_BLACKLIST (server_id, entity_id) VALUES (1, 2)")
+            await transaction.rollback()
+            assert await version(connection, "SINCRONI_BLACKLIST") == start + 2
+
+            assert await version(connection, "SINCRONI_WHITELIST") == 0
+        finally:
+            await connection.close()
+
+    asyncio.run(run())
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import Container, Dict, List, Optional, Tuple
+
+# discord shows at most 25 autocomplete choices.
+MAX_CHOICES = 25
+
+
+class NameIndex:
+    """IDs sorted by their case-insensitive name, for answering autocomplete without a scan.
+
+    A prefix query is a binary search followed by reading the matches in order, so it costs
+    the same with ten names or ten thousand. Names that only contain the query somewhere else
+    are found with a scan, which only runs when there are fewer prefix matches than asked for.
+
+    Attributes
+    ----------
+    names : Dict[int, str]
+        The name of every ID, as it is shown.
+    """
+
+    __slots__ = ("names", "_keys", "_haystack", "_offsets")
+
+    def __init__(self) -> None:
+        self.names: Dict[int, str] = {}
+        # (casefolded name, id), sorted.
+        self._keys: List[Tuple[str, int]] = []
+        # every casefolded name joined together and where each starts, so substrings are found by
+        # str.find instead of a loop. Made again on the first search after a change.
+        self._haystack: Optional[str] = None
+        self._offsets: List[int] = []
+
+    def __repr__(self) -> str:
+        return f"<NameIndex names={len(self.names)}>"
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, id: object) -> bool:
+        return id in self.names
+
+    def add(self, id: int, name: str, /) -> None:
+        """Add an ID or rename it."""
+        if self.names.get(id) == name:
+            return
+
+        self.remove(id)
+        self.names[id] = name
+        insort(self._keys, (name.casefold(), id))
+        self._haystack = None
+
+    def remove(self, id: int, /) -> None:
+        name = self.names.pop(id, None)
+        if name is None:
+            return
+
+        key = (name.casefold(), id)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+        self._haystack = None
+
+    def clear(self) -> None:
+        self.names.clear()
+        self._keys.clear()
+        self._haystack = None
+
+    def _build_haystack(self) -> str:
+        offsets, position = [], 0
+        for key, _ in self._keys:
+            offsets.append(position)
+            position += len(key) + 1
+
+        self._offsets = offsets
+        # names can't have a NUL, so a match never spans two of them.
+        self._haystack = "\0".join(key for key, _ in self._keys)
+        return self._haystack
+
+    def search(
+        self, query: str, /, limit: int = MAX_CHOICES, *, exclude: Optional[Container[int]] = None
+    ) -> List[Tuple[int, str]]:
+        """The ``(id, name)`` pairs whose name starts with ``query`` in name order, ignoring case.
+
+        If there are less than ``limit`` of them, they are followed by the names that contain ``query``,
+        those containing it at the start of a word first, then by how early they contain it.
+        An empty query gives the first names in order.
+        """
+        exclude = exclude or ()
+        query = query.strip().casefold()
+        results: List[Tuple[int, str]] = []
+
+        index = bisect_left(self._keys, (query,))
+        while index < len(self._keys) and len(results) < limit:
+            key, id = self._keys[index]
+            if not key.startswith(query):
+                break
+            if id not in exclude:
+                results.append((id, self.names[id]))
+            index += 1
+
+        if len(results) >= limit or not query:
+            return results
+
+        haystack = self._haystack if self._haystack is not None else self._build_haystack()
+        offsets = self._offsets
+        ranked: List[Tuple[int, int, str, int]] = []
+
+        found = haystack.find(query)
+        while found != -1:
+            index = bisect_right(offsets, found) - 1
+            key, id = self._keys[index]
+            position = found - offsets[index]
+            # prefix matches were already added.
+            if position and id not in exclude:
+                word_start = 0 if not key[position - 1].isalnum() else 1
+                ranked.append((word_start, position, key, id))
+
+            # the earliest match of a name is the one it is ranked by.
+            found = haystack.find(query, offsets[index + 1]) if index + 1 < len(offsets) else -1
+
+        results.extend((id, self.names[id]) for *_, id in heapq.nsmallest(limit - len(results), ranked))
+        return results
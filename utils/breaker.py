@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import traceback
+from enum import Enum
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+# a destination is skipped after this many failures in a row.
+DEFAULT_THRESHOLD = 5
+# seconds before a skipped destination is probed, doubled after every failed probe.
+DEFAULT_COOLDOWN = 300.0
+MAX_COOLDOWN = 6 * 60 * 60
+
+Probe = Callable[[], Awaitable[object]]
+
+
+class BreakerState(Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """The failures of one destination.
+
+    Attributes
+    ----------
+    key : Hashable
+        The destination, like the keys of :class:`utils.scheduler.DeliveryScheduler`.
+    state : BreakerState
+        ``closed`` while it is sent to, ``open`` while it is skipped and ``half_open`` while it is probed.
+    failures : int
+        Failures in a row.
+    last_error : Optional[BaseException]
+        The most recent failure.
+    fields : Dict[str, str]
+        Shown in the error reports, e.g. the channel ID and webhook URL.
+    """
+
+    def __init__(self, key: Hashable, cooldown: float) -> None:
+        self.key: Hashable = key
+        self.state: BreakerState = BreakerState.closed
+        self.failures: int = 0
+        self.last_error: Optional[BaseException] = None
+        self.fields: Dict[str, str] = {}
+
+        self.cooldown: float = cooldown
+        self.opened_at: float = 0.0
+        self.probe: Optional[Probe] = None
+
+    def __repr__(self) -> str:
+        return f"<CircuitBreaker key={self.key} state={self.state.value} failures={self.failures}>"
+
+    @property
+    def probe_due(self) -> bool:
+        return self.state is BreakerState.open and time.monotonic() >= self.opened_at + self.cooldown
+
+
+class CircuitBreakers:
+    """Skips destinations that keep failing until a background probe finds them working again.
+
+    ``on_state_change`` is called once when a destination is skipped and once when it recovers,
+    instead of reporting every failed message.
+
+    Parameters
+    ----------
+    threshold : int
+        Failures in a row before a destination is skipped.
+    cooldown : float
+        Seconds before the first probe of a skipped destination.
+    on_state_change : Optional[Callable[[CircuitBreaker], object]]
+        Called with the breaker after it opened or closed.
+    interval : float
+        How often skipped destinations are checked for a due probe.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: int = DEFAULT_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+        on_state_change: Optional[Callable[[CircuitBreaker], object]] = None,
+        interval: float = 5.0,
+    ) -> None:
+        self.threshold: int = threshold
+        self.cooldown: float = cooldown
+        self.on_state_change: Optional[Callable[[CircuitBreaker], object]] = on_state_change
+        self.interval: float = interval
+
+        # only destinations that failed since their last success are kept.
+        self._breakers: Dict[Hashable, CircuitBreaker] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"<CircuitBreakers tracked={len(self._breakers)} open={len(self.open_breakers())}>"
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get(self, key: Hashable, /) -> Optional[CircuitBreaker]:
+        return self._breakers.get(key)
+
+    def allow(self, key: Hashable, /) -> bool:
+        """Whether the destination should be sent to."""
+        breaker = self._breakers.get(key)
+        return breaker is None or breaker.state is BreakerState.closed
+
+    def open_breakers(self) -> List[CircuitBreaker]:
+        return [breaker for breaker in self._breakers.values() if breaker.state is not BreakerState.closed]
+
+    def record_success(self, key: Hashable, /) -> None:
+        breaker = self._breakers.pop(key, None)
+        if breaker is not None and breaker.state is not BreakerState.closed:
+            breaker.state = BreakerState.closed
+            breaker.failures = 0
+            self._state_changed(breaker)
+
+    def record_failure(
+        self,
+        key: Hashable,
+        error: BaseException,
+        /,
+        *,
+        probe: Optional[Probe] = None,
+        fields: Optional[Dict[str, str]] = None,
+    ) -> bool:
+        """Count a failure of a destination.
+
+        Parameters
+        ----------
+        key : Hashable
+            The destination.
+        error : BaseException
+            Why it failed.
+        probe : Optional[Probe]
+            Raises if the destination still doesn't work. Without one, the destination is
+            sent to again after the cooldown.
+        fields : Optional[Dict[str, str]]
+            Shown in the error report.
+
+        Returns
+        -------
+        bool
+            Whether the destination is skipped from now on.
+        """
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(key, self.cooldown)
+
+        breaker.failures += 1
+        breaker.last_error = error
+        breaker.probe = probe or breaker.probe
+        if fields:
+            breaker.fields = fields
+
+        if breaker.state is BreakerState.closed and breaker.failures >= self.threshold:
+            breaker.state = BreakerState.open
+            breaker.opened_at = time.monotonic()
+            self._state_changed(breaker)
+            return True
+
+        return False
+
+    def _state_changed(self, breaker: CircuitBreaker) -> None:
+        if self.on_state_change is None:
+            return
+
+        try:
+            self.on_state_change(breaker)
+        except Exception as err:
+            traceback.print_exception(type(err), err, err.__traceback__)
+
+    async def _probe(self, breaker: CircuitBreaker) -> None:
+        breaker.state = BreakerState.half_open
+        try:
+            if breaker.probe is not None:
+                await breaker.probe()
+        except Exception as err:
+            breaker.last_error = err
+            breaker.state = BreakerState.open
+            breaker.opened_at = time.monotonic()
+            breaker.cooldown = min(breaker.cooldown * 2, MAX_COOLDOWN)
+            return
+
+        if breaker.probe is None:
+            # nothing to check with, let the next message decide.
+            breaker.state = BreakerState.closed
+            breaker.failures = self.threshold - 1
+            return
+
+        self.record_success(breaker.key)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            due = [breaker for breaker in self._breakers.values() if breaker.probe_due]
+            if due:
+                await asyncio.gather(*[self._probe(breaker) for breaker in due])
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Literal, Optional, Tuple
+
+from .extra import censor_invite, censor_link
+
+if TYPE_CHECKING:
+    from better_profanity import Profanity
+
+ExecutorMode = Literal["thread", "process"]
+
+DEFAULT_EXECUTOR_THRESHOLD = 500
+
+# (word, index of the character after it), twice per word: without and with the separators before it.
+NextWords = List[Tuple[str, int]]
+
+
+class _Automaton:
+    """The censor words of one :meth:`CensorEngine.compile`, state 0 never matches and state 1 is the start.
+
+    Compiling makes a new one that replaces the old one whole, so a thread that is still
+    censoring with the old one never mixes its states with the new one's.
+    """
+
+    def __init__(self, profanity: Profanity, lock: threading.Lock) -> None:
+        # states are added lazily, this keeps that safe when used from a thread pool.
+        self.lock: threading.Lock = lock
+        self.compiled_for: Tuple[int, int] = (len(profanity.CENSOR_WORDSET), profanity.MAX_NUMBER_COMBINATIONS)
+        self.max_combinations: int = profanity.MAX_NUMBER_COMBINATIONS
+
+        allowed = "".join(re.escape(char) for char in sorted(profanity.ALLOWED_CHARACTERS))
+        self.word_regex: re.Pattern = re.compile(f"[{allowed}]+")
+        self.separator_regex: re.Pattern = re.compile(f"[^{allowed}]+")
+
+        char_map = profanity.CHARS_MAPPING
+        self.edges: List[Dict[str, List[int]]] = [{}]
+        self.terminal: List[bool] = [False]
+        children: List[Dict[str, int]] = [{}]
+
+        for word in profanity.CENSOR_WORDSET:
+            node = 0
+            for char in str(word):
+                if char not in children[node]:
+                    children.append({})
+                    self.edges.append({})
+                    self.terminal.append(False)
+                    children[node][char] = len(children) - 1
+
+                child = children[node][char]
+                for variant in char_map.get(char, (char,)):
+                    targets = self.edges[node].setdefault(variant, [])
+                    if child not in targets:
+                        targets.append(child)
+
+                node = child
+
+            self.terminal[node] = True
+
+        self.states: List[FrozenSet[int]] = []
+        self.state_ids: Dict[FrozenSet[int], int] = {}
+        self.transitions: List[Dict[str, int]] = []
+        self.accepting: List[bool] = []
+        self.add_state(frozenset())
+        self.add_state(frozenset((0,)))
+
+    def __repr__(self) -> str:
+        return f"<_Automaton states={len(self.states)}>"
+
+    def add_state(self, nodes: FrozenSet[int], /) -> int:
+        self.state_ids[nodes] = len(self.states)
+        self.states.append(nodes)
+        self.transitions.append({})
+        self.accepting.append(any(self.terminal[node] for node in nodes))
+        return len(self.states) - 1
+
+    def step(self, state: int, text: str, /) -> int:
+        for char in text:
+            if not state:
+                return 0
+
+            transitions = self.transitions[state]
+            if char not in transitions:
+                with self.lock:
+                    nodes = frozenset(
+                        target for node in self.states[state] for target in self.edges[node].get(char, ())
+                    )
+                    transitions[char] = self.state_ids[nodes] if nodes in self.state_ids else self.add_state(nodes)
+
+            state = transitions[char]
+
+        return state
+
+
+class CensorEngine:
+    """A compiled version of ``profanity.censor`` plus the link and invite redaction.
+
+    better_profanity compares every word against every censor word and their variants one by one.
+    This compiles the censor words into an automaton once, so checking a word is a single walk over
+    its characters that usually stops after the first one or two. The word splitting is the same as
+    better_profanity's, so the output is identical.
+
+    The automaton is rebuilt whenever words are added to ``profanity``.
+
+    Parameters
+    ----------
+    profanity : Profanity
+        The better_profanity instance with the censor words.
+    censor_char : str
+        The character swear words are replaced with. Defaults to ``#``.
+    """
+
+    def __init__(self, profanity: Profanity, censor_char: str = "#") -> None:
+        self.profanity: Profanity = profanity
+        self.censor_char: str = censor_char
+
+        self._lock: threading.Lock = threading.Lock()
+        self._automaton: Optional[_Automaton] = None
+
+    def __repr__(self) -> str:
+        states = len(self._automaton.states) if self._automaton else 0
+        return f"<CensorEngine words={len(self.profanity.CENSOR_WORDSET)} states={states}>"
+
+    def compile(self) -> None:
+        """Build the automaton from the profanity's current censor words."""
+        self._automaton = _Automaton(self.profanity, self._lock)
+
+    def _ensure_compiled(self) -> _Automaton:
+        # every call works with the automaton returned here, even if it is replaced meanwhile.
+        compiled_for = (len(self.profanity.CENSOR_WORDSET), self.profanity.MAX_NUMBER_COMBINATIONS)
+        automaton = self._automaton
+        if automaton is None or automaton.compiled_for != compiled_for:
+            with self._lock:
+                self.compile()
+            automaton = self._automaton
+
+        return automaton  # type: ignore # set by compile
+
+    def is_swear_word(self, word: str, /) -> bool:
+        """Whether or not an already lowercased word is a censor word or one of its variants."""
+        automaton = self._ensure_compiled()
+        return automaton.accepting[automaton.step(1, word)]
+
+    @staticmethod
+    def _next_words(automaton: _Automaton, text: str, start: int, amount: int, /) -> NextWords:
+        words: NextWords = []
+        for _ in range(amount):
+            match = automaton.word_regex.search(text, start)
+            word_start = match.start() if match else len(text)
+            if match is None or word_start >= len(text) - 1:
+                words += [("", word_start), ("", word_start)]
+                break
+
+            end = match.end() if match.end() < len(text) else len(text) - 1
+            words += [(match.group(), end), (text[start : match.end()], end)]
+            start = end
+
+        return words
+
+    def _update_next_words(self, automaton: _Automaton, text: str, next_words: NextWords, start: int, /) -> NextWords:
+        if not next_words:
+            return self._next_words(automaton, text, start, automaton.max_combinations)
+
+        del next_words[:2]
+        if next_words and next_words[-1][0] != "":
+            next_words += self._next_words(automaton, text, next_words[-1][1], 1)
+
+        return next_words
+
+    @staticmethod
+    def _forms_swear_word(automaton: _Automaton, word: str, next_words: NextWords, /) -> int:
+        # returns the end of the swear word formed with the next words, -1 if there is none.
+        state = automaton.step(1, word.lower())
+        if not state:
+            return -1
+
+        joined, joined_with_separators = state, state
+        for index in range(0, len(next_words), 2):
+            next_word, end = next_words[index]
+            if next_word == "":
+                continue
+
+            joined = automaton.step(joined, next_word.lower())
+            joined_with_separators = automaton.step(joined_with_separators, next_words[index + 1][0].lower())
+            if automaton.accepting[joined] or automaton.accepting[joined_with_separators]:
+                return end
+
+            if not joined and not joined_with_separators:
+                return -1
+
+        return -1
+
+    def censor_profanity(self, text: str, /) -> str:
+        """The same as ``profanity.censor(text, censor_char=self.censor_char)``."""
+        automaton = self._ensure_compiled()
+
+        length = len(text)
+        first_word = automaton.word_regex.search(text)
+        start = first_word.start() if first_word else length
+        if start >= length - 1:
+            return text
+
+        replacement = self.censor_char * 4
+        censored: List[str] = [text[:start]]
+        current_word = ""
+        skip_to = -1
+        next_words: NextWords = []
+
+        index = start
+        while index < length:
+            if index < skip_to:
+                index = skip_to
+                continue
+
+            if word := automaton.word_regex.match(text, index):
+                current_word += word.group()
+                index = word.end()
+                continue
+
+            if current_word.strip() == "":
+                separator = automaton.separator_regex.match(text, index)
+                censored.append(separator.group())  # type: ignore # text[index] is a separator
+                current_word = ""
+                index = separator.end()  # type: ignore
+                continue
+
+            char = text[index]
+            next_words = self._update_next_words(automaton, text, next_words, index)
+            end = self._forms_swear_word(automaton, current_word, next_words)
+            if end != -1:
+                current_word = replacement
+                skip_to = end
+                char = ""
+                next_words = []
+
+            if automaton.accepting[automaton.step(1, current_word.lower())]:
+                current_word = replacement
+
+            censored.append(current_word + char)
+            current_word = ""
+            index += 1
+
+        if current_word != "" and skip_to < length - 1:
+            if automaton.accepting[automaton.step(1, current_word.lower())]:
+                current_word = replacement
+            censored.append(current_word)
+
+        return "".join(censored)
+
+    @staticmethod
+    def redact(text: str, /) -> str:
+        """Redact discord invites and links, the same as ``censor_invite(censor_link(text))``.
+
+        These stay two regex passes, an invite inside a link would be redacted differently
+        by a single combined pattern.
+        """
+        return censor_invite(censor_link(text))
+
+    def censor(self, text: str, /) -> str:
+        """Censor swear words and redact invites and links from a relayed message."""
+        return self.redact(self.censor_profanity(text))
+
+
+# the engine of a process pool worker, set up by _initialize_worker.
+_worker_engine: Optional[CensorEngine] = None
+
+
+def _initialize_worker(words: List[str], max_combinations: int, censor_char: str) -> None:
+    global _worker_engine
+    from better_profanity import Profanity
+
+    worker_profanity = Profanity(words)
+    worker_profanity.MAX_NUMBER_COMBINATIONS = max_combinations
+    _worker_engine = CensorEngine(worker_profanity, censor_char)
+
+
+def _censor_in_worker(text: str) -> str:
+    return _worker_engine.censor(text)  # type: ignore # set by _initialize_worker
+
+
+class CensorExecutor:
+    """Runs :meth:`CensorEngine.censor` in a thread or process pool for long messages.
+
+    Short messages are censored right away, handing them to a pool costs more than it saves.
+
+    Parameters
+    ----------
+    engine : CensorEngine
+        The engine used inline and in thread pools. Process pools get a copy of its censor words.
+    mode : Optional[ExecutorMode]
+        ``"thread"``, ``"process"`` or ``None`` to always censor on the event loop.
+    threshold : int
+        Messages at least this long are sent to the pool.
+    workers : Optional[int]
+        The size of the pool, ``None`` for the executor's default.
+    """
+
+    def __init__(
+        self,
+        engine: CensorEngine,
+        mode: Optional[ExecutorMode] = None,
+        *,
+        threshold: int = DEFAULT_EXECUTOR_THRESHOLD,
+        workers: Optional[int] = None,
+    ) -> None:
+        if mode not in (None, "thread", "process"):
+            raise ValueError(f"Unknown censor executor mode: {mode!r}")
+
+        self.engine: CensorEngine = engine
+        self.mode: Optional[ExecutorMode] = mode
+        self.threshold: int = threshold
+        self.workers: Optional[int] = workers
+        self._pool: Optional[concurrent.futures.Executor] = None
+
+    def __repr__(self) -> str:
+        return f"<CensorExecutor mode={self.mode} threshold={self.threshold} running={self._pool is not None}>"
+
+    def start(self) -> None:
+        """Create the pool. Call this after every censor word was added."""
+        if self.mode == "thread":
+            self._pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="censor")
+        elif self.mode == "process":
+            profanity = self.engine.profanity
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers,
+                initializer=_initialize_worker,
+                initargs=(
+                    [str(word) for word in profanity.CENSOR_WORDSET],
+                    profanity.MAX_NUMBER_COMBINATIONS,
+                    self.engine.censor_char,
+                ),
+            )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    async def censor(self, text: str, /) -> str:
+        """The same as :meth:`CensorEngine.censor`, off the event loop when ``text`` is long enough."""
+        if self._pool is None or len(text) < self.threshold:
+            return self.engine.censor(text)
+
+        function = self.engine.censor if self.mode == "thread" else _censor_in_worker
+        return await asyncio.get_running_loop().run_in_executor(self._pool, function, text)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Set, Tuple
+
+from utils.extra import ChatType, FilterType
+
+if TYPE_CHECKING:
+    from .models import Blacklist
+
+
+class BlacklistIndex:
+    """Set based lookups over every blacklist, kept up to date by :class:`DatabaseConnection`.
+
+    Attributes
+    ----------
+    outgoing : Dict[Tuple[int, int], Set[int]]
+        ``(server_id, chat_type): {entity_id, ...}``, the servers a server blacklisted in a chat type.
+    blocked_by : Dict[int, Set[int]]
+        ``entity_id: {server_id, ...}``, the servers that blacklisted a user or server.
+        ``0`` is in the set when the entity is blacklisted globally.
+    """
+
+    def __init__(self) -> None:
+        self.outgoing: Dict[Tuple[int, int], Set[int]] = {}
+        self.blocked_by: Dict[int, Set[int]] = {}
+
+    def __repr__(self) -> str:
+        return f"<BlacklistIndex entities={len(self.blocked_by)}>"
+
+    @staticmethod
+    def _chat_types(blacklist: Blacklist, /) -> Tuple[ChatType, ...]:
+        flags = (
+            (blacklist.pub, ChatType.public),
+            (blacklist.dev, ChatType.developer),
+            (blacklist.private, ChatType.private),
+            (blacklist.repeat, ChatType.repeat),
+        )
+        return tuple(chat_type for enabled, chat_type in flags if enabled)
+
+    def add(self, blacklist: Blacklist, /) -> None:
+        self.blocked_by.setdefault(blacklist.entity_id, set()).add(blacklist.server_id)
+
+        if not blacklist.server_id or blacklist.raw_blacklist_type != FilterType.server:
+            return
+
+        for chat_type in self._chat_types(blacklist):
+            self.outgoing.setdefault((blacklist.server_id, chat_type), set()).add(blacklist.entity_id)
+
+    def remove(self, blacklist: Blacklist, /) -> None:
+        servers = self.blocked_by.get(blacklist.entity_id)
+        if servers is not None:
+            servers.discard(blacklist.server_id)
+            if not servers:
+                del self.blocked_by[blacklist.entity_id]
+
+        for chat_type in ChatType:
+            entities = self.outgoing.get((blacklist.server_id, chat_type))
+            if entities is None:
+                continue
+
+            entities.discard(blacklist.entity_id)
+            if not entities:
+                del self.outgoing[(blacklist.server_id, chat_type)]
+
+    def clear(self) -> None:
+        self.outgoing.clear()
+        self.blocked_by.clear()
+
+    def blacklisted_servers(self, server_id: int, chat_type: ChatType, /) -> Set[int]:
+        """The servers ``server_id`` does not send messages to in ``chat_type``."""
+        return self.outgoing.get((server_id, chat_type), set())
+
+    def is_blacklisted(self, server_id: int, user_id: int, /) -> bool:
+        """Whether or not a user's messages from a server are not relayed at all.
+
+        This is the case when the user or the server are blacklisted globally, or the
+        server blacklisted the user.
+        """
+        user_blocked_by = self.blocked_by.get(user_id, ())
+        return 0 in user_blocked_by or server_id in user_blocked_by or 0 in self.blocked_by.get(server_id, ())
+
+    def excluded_servers(self, server_id: int, user_id: int, chat_type: ChatType, /) -> Set[int]:
+        """The servers that may not receive a message a user sent from a server.
+
+        Parameters
+        ----------
+        server_id : int
+            The ID of the server the message was sent in.
+        user_id : int
+            The ID of the author of the message.
+        chat_type : ChatType
+            The chat type the message was sent in.
+
+        Returns
+        -------
+        Set[int]
+            The IDs of the servers that blacklisted the user or the server, and the servers
+            the origin server blacklisted in this chat type.
+        """
+        return (
+            self.blacklisted_servers(server_id, chat_type)
+            | self.blocked_by.get(user_id, set())
+            | self.blocked_by.get(server_id, set())
+        )
@@ -1,27 +1,69 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import asyncio
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import asyncpg
 
 from utils.extra import ChatType, FilterType
 
-from .models import Blacklist, EmbedColor, GlobalChat, GlobalChatConfig, LinkedChannel, Whitelist
+from .blacklist import BlacklistIndex
+from .listener import ChangeListener, RowChanges
+from .migrations import Migration, install_notify_triggers, migrate
+from .models import (
+    Blacklist,
+    EmbedColor,
+    GlobalChat,
+    GlobalChatConfig,
+    GlobalChatRoute,
+    LinkedChannel,
+    OutboxEntry,
+    Whitelist,
+)
+from .pickers import GuildPickers
+from .pool import (
+    FETCH_BLACKLIST,
+    FETCH_EMBED_COLOR,
+    FETCH_GLOBAL_CHAT,
+    FETCH_GLOBAL_CHAT_CONFIG,
+    FETCH_LINKED_CHANNEL,
+    FETCH_WHITELIST,
+    SincroniConnection,
+    init_connection,
+    pool_options,
+    pool_stats,
+)
+from .queries import DEFAULT_SLOW_QUERY, QueryInstrumentation, row_count
+from .snapshot import COLUMNS, CacheSnapshot
 
 if TYPE_CHECKING:
     from main import Sincroni
 
-    from .types import GlobalChat as GlobalChatPayload
+
+_log = logging.getLogger(__name__)
+
+# the defaults of add_blacklist and add_whitelist, for the columns a bulk entry leaves out.
+_BLACKLIST_DEFAULTS: Dict[str, Any] = {
+    "pub": False,
+    "dev": False,
+    "private": False,
+    "blacklist_type": FilterType.user,
+    "reason": None,
+    "repeat": False,
+}
+_WHITELIST_DEFAULTS: Dict[str, Any] = {"whitelist_type": FilterType.user, "reason": None}
 
 
 class CustomRecordClass(asyncpg.Record):
     def __getattr__(self, name: str) -> Any:
-        if name in self.keys():
+        # only called for names that aren't attributes, the record's own lookup is a dict.
+        try:
             return self[name]
-        return super().__getattr__(name)
-
-    def __dict__(self) -> dict[str, Any]:
-        return dict(self)
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}") from None
 
 
 class DatabaseConnection:
@@ -30,11 +72,15 @@ class DatabaseConnection:
     def __init__(self, bot: Sincroni, dsn: str) -> None:
         self.bot: Sincroni = bot
         self.__dsn: str = dsn
+        self._pool = None  # type: ignore # set by create_connection
 
         # channel_id: GlobalChat
         self._global_chats: Dict[int, GlobalChat] = {}
         # (server_id, entity_id): Blacklist
         self._blacklists: Dict[tuple, Blacklist] = {}
+        self.blacklist_index: BlacklistIndex = BlacklistIndex()
+        # the guilds the blacklist commands autocomplete, by name.
+        self.guild_pickers: GuildPickers = GuildPickers(bot)
         # entity_id: Whitelist
         self._whitelists: Dict[int, Whitelist] = {}
         # origin_channel_id: LinkedChannels
@@ -45,15 +91,91 @@ class DatabaseConnection:
         # (server_id, chat_type) GlobalChatConfig
         self._global_chat_configs: Dict[tuple, GlobalChatConfig] = {}
 
+        # chat_type: {channel_id: GlobalChatRoute}
+        self._routes: Dict[int, Dict[int, GlobalChatRoute]] = {}
+
+        # set once every cache was loaded, by warm_up or restore_snapshot.
+        self.warmed_up: asyncio.Event = asyncio.Event()
+        # table: its version in SINCRONI_TABLE_VERSIONS when it was last loaded.
+        self._watermarks: Dict[str, int] = {}
+        # held while tables are loaded, changes from the listener are applied after.
+        self._load_lock: asyncio.Lock = asyncio.Lock()
+        self.listener: Optional[ChangeListener] = None
+        self.queries: QueryInstrumentation = QueryInstrumentation(
+            enabled=os.getenv("DB_QUERY_STATS", "").lower() in ("1", "true", "yes"),
+            slow_query=float(os.getenv("DB_SLOW_QUERY", DEFAULT_SLOW_QUERY)),
+        )
+
     async def create_connection(self) -> None:
-        self._pool = await asyncpg.create_pool(self.__dsn, record_class=CustomRecordClass)  # type: ignore
+        self._pool = await asyncpg.create_pool(
+            self.__dsn,
+            record_class=CustomRecordClass,
+            connection_class=SincroniConnection,
+            init=init_connection,
+            **pool_options(),
+        )  # type: ignore
+
+    @property
+    def pool_stats(self) -> Dict[str, int]:
+        """The size of the pool and how much of it is in use, see :func:`pool_stats`."""
+        return pool_stats(self._pool)
+
+    @property
+    def connected(self) -> bool:
+        return self._pool is not None
+
+    async def migrate(self) -> List[Migration]:
+        """Apply the schema migrations that weren't yet, see :mod:`utils.database.migrations`."""
+        applied = await migrate(self._pool)
+        if applied:
+            # connect again as they are released, to prepare the lookups on the new schema.
+            await self._pool.expire_connections()
+
+        return applied
+
+    async def listen(self) -> None:
+        """Apply the changes other processes make to the cached tables, see :class:`ChangeListener`.
+
+        Installs the triggers that notify the changes, if they weren't yet. Call it before
+        :meth:`warm_up`, so changes made while loading are not missed.
+        """
+        if self.listener is None:
+            async with self._pool.acquire() as connection:
+                await install_notify_triggers(connection)
+
+            listener = ChangeListener(self, self.__dsn)
+            await listener.start()
+            self.listener = listener
 
     async def close(self) -> None:
+        if self.listener is not None:
+            await self.listener.close()
+            self.listener = None
+
         if self._pool:
             await self._pool.close()
         self._pool = None  # type: ignore
 
+    async def _instrumented(self, method: str, query: str, args: Tuple[Any, ...], /) -> Any:
+        start = time.perf_counter()
+        con = await self._pool.acquire()
+        acquired = time.perf_counter()
+        try:
+            result = await getattr(con, method)(query, *args)
+            finished = time.perf_counter()
+        except BaseException:
+            self.queries.record(query, acquired - start, time.perf_counter() - acquired, error=True)
+            raise
+        finally:
+            await self._pool.release(con)
+
+        self.queries.record(query, acquired - start, finished - acquired, row_count(method, result))
+        return result
+
     async def fetch(self, query: str, *args: Any) -> list[CustomRecordClass]:
+        if self.queries.enabled:
+            return await self._instrumented("fetch", query, args)
+
         con = await self._pool.acquire()
         try:
             return await con.fetch(query, *args)
@@ -61,6 +183,9 @@ class DatabaseConnection:
             await self._pool.release(con)
 
     async def fetchrow(self, query: str, *args: Any) -> Optional[CustomRecordClass]:
+        if self.queries.enabled:
+            return await self._instrumented("fetchrow", query, args)
+
         con = await self._pool.acquire()
         try:
             return await con.fetchrow(query, *args)
@@ -68,6 +193,9 @@ class DatabaseConnection:
             await self._pool.release(con)
 
     async def fetchval(self, query: str, *args: Any) -> Any:
+        if self.queries.enabled:
+            return await self._instrumented("fetchval", query, args)
+
         con = await self._pool.acquire()
         try:
             return await con.fetchval(query, *args)
@@ -75,6 +203,9 @@ class DatabaseConnection:
             await self._pool.release(con)
 
     async def execute(self, query: str, *args: Any) -> None:
+        if self.queries.enabled:
+            return await self._instrumented("execute", query, args)
+
         con = await self._pool.acquire()
         try:
             return await con.execute(query, *args)
@@ -82,12 +213,226 @@ class DatabaseConnection:
             await self._pool.release(con)
 
     async def executemany(self, query: str, *args: Any) -> None:
+        if self.queries.enabled:
+            return await self._instrumented("executemany", query, args)
+
         con = await self._pool.acquire()
         try:
             return await con.executemany(query, *args)
         finally:
             await self._pool.release(con)
 
+    async def fetch_watermarks(self) -> Dict[str, int]:
+        """The version of each cached table, bumped by every statement that changes it, see migration 3.
+
+        A table with the same version as when it was loaded has not changed since. Without the
+        versions, before migration 3, this is empty so every table is loaded.
+        """
+        query = "SELECT table_name, version FROM SINCRONI_TABLE_VERSIONS WHERE table_name = ANY($1::TEXT[])"
+
+        try:
+            rows = await self.fetch(query, list(COLUMNS))
+        except asyncpg.UndefinedTableError:
+            return {}
+
+        return {row["table_name"]: row["version"] for row in rows}
+
+    async def _fetch_table(self, table: str, /) -> List[asyncpg.Record]:
+        # the columns in the order of the models' from_row, which read them by position.
+        query = f"SELECT {', '.join(COLUMNS[table])} FROM {table}"
+        return await self.fetch(query)
+
+    def _table_loaders(self) -> Dict[str, Callable[[], Awaitable[List[Any]]]]:
+        return {
+            "SINCRONI_GLOBAL_CHAT": self.fetch_global_chats,
+            "SINCRONI_BLACKLIST": self.fetch_blacklists,
+            "SINCRONI_WHITELIST": self.fetch_whitelists,
+            "SINCRONI_LINKED_CHANNELS": self.fetch_linked_channels,
+            "SINCRONI_EMBED_COLOR": self.fetch_embed_colors,
+            "SINCRONI_CONFIG": self.fetch_global_chat_configs,
+        }
+
+    async def warm_up(self, watermarks: Optional[Dict[str, int]] = None) -> Dict[str, float]:
+        """Load every cache at the same time, each table on its own pool connection.
+
+        Parameters
+        ----------
+        watermarks : Optional[Dict[str, int]]
+            The watermarks of the tables already cached, e.g. from a :class:`CacheSnapshot`.
+            Only the tables that changed since are loaded.
+
+        Returns
+        -------
+        Dict[str, float]
+            How many seconds each loaded table took, by table name.
+        """
+        async with self._load_lock:
+            loaders = self._table_loaders()
+
+            # read before loading, so a change made while loading shows up as a different watermark later.
+            current = await self.fetch_watermarks()
+            if watermarks is not None:
+                loaders = {
+                    table: loader
+                    for table, loader in loaders.items()
+                    if table not in current or watermarks.get(table) != current[table]
+                }
+                _log.info("%s of %s tables changed since they were cached", len(loaders), len(COLUMNS))
+
+            async def load(table: str, loader: Callable[[], Awaitable[List[Any]]]) -> float:
+                start = time.perf_counter()
+                rows = await loader()
+                elapsed = time.perf_counter() - start
+                _log.info("Loaded %s rows from %s in %.1fms", len(rows), table, elapsed * 1000)
+                return elapsed
+
+            start = time.perf_counter()
+            timings = await asyncio.gather(*[load(table, loader) for table, loader in loaders.items()])
+            _log.info("Warmed up the caches in %.1fms", (time.perf_counter() - start) * 1000)
+
+            self._watermarks.update(current)
+
+        self.warmed_up.set()
+        return dict(zip(loaders, timings))
+
+    async def catch_up(self) -> Dict[str, float]:
+        """Reload the tables that changed since they were loaded."""
+        return await self.warm_up(dict(self._watermarks))
+
+    async def apply_changes(self, changes: RowChanges, reload: Iterable[str] = (), /) -> None:
+        """Apply row changes made by any process.
+
+        Parameters
+        ----------
+        changes : RowChanges
+            The new row by ``(table, key)``, ``None`` if it was deleted. The keys are the columns of ``ROW_KEYS``.
+        reload : Iterable[str]
+            Tables to load again entirely, after the changes.
+        """
+        async with self._load_lock:
+            for (table, key), row in changes.items():
+                self._apply_row(table, key, row)
+
+            loaders = self._table_loaders()
+            await asyncio.gather(*[loaders[table]() for table in reload if table in loaders])
+
+        if changes or reload:
+            _log.debug("Applied %s row changes and reloaded %s tables", len(changes), len(set(reload)))
+
+    def _apply_row(self, table: str, key: Tuple[Any, ...], row: Optional[Dict[str, Any]], /) -> None:
+        if table == "SINCRONI_GLOBAL_CHAT":
+            if row is None:
+                self._forget_global_chat(key[0])
+            else:
+                self._store_global_chat(GlobalChat(self, row))  # type: ignore # same keys as the record
+        elif table == "SINCRONI_BLACKLIST":
+            if row is None:
+                self._forget_blacklist(key[0], key[1])
+            else:
+                self._store_blacklist(Blacklist(self, row))  # type: ignore
+        elif table == "SINCRONI_WHITELIST":
+            if row is None:
+                self._whitelists.pop(key[0], None)
+            else:
+                self._whitelists[key[0]] = Whitelist(self, row)  # type: ignore
+        elif table == "SINCRONI_LINKED_CHANNELS":
+            if row is None:
+                self._linked_channels.pop(key[0], None)
+            else:
+                self._linked_channels[key[0]] = LinkedChannel(self, row)  # type: ignore
+        elif table == "SINCRONI_EMBED_COLOR":
+            if row is None:
+                self._embed_colors.pop(key, None)
+            else:
+                self._embed_colors[key] = EmbedColor(self, row)  # type: ignore
+            self._recolor_routes(key[0], key[1])
+        elif table == "SINCRONI_CONFIG":
+            if row is None:
+                self._global_chat_configs.pop(key, None)
+            else:
+                self._global_chat_configs[key] = GlobalChatConfig(self, row)  # type: ignore
+
+    def take_snapshot(self) -> CacheSnapshot:
+        """The current caches, with the watermarks of when each table was loaded."""
+        tables = {
+            "SINCRONI_GLOBAL_CHAT": [
+                (chat.server_id, chat.channel_id, chat.webhook_url, chat.raw_chat_type)
+                for chat in self._global_chats.values()
+            ],
+            "SINCRONI_BLACKLIST": [
+                (
+                    blacklist.id,
+                    blacklist.server_id,
+                    blacklist.entity_id,
+                    blacklist.pub,
+                    blacklist.dev,
+                    blacklist.private,
+                    blacklist.raw_blacklist_type,
+                    blacklist.reason,
+                    blacklist.repeat,
+                )
+                for blacklist in self._blacklists.values()
+            ],
+            "SINCRONI_WHITELIST": [
+                (whitelist.id, whitelist.entity_id, whitelist.raw_whitelist_type, whitelist.reason)
+                for whitelist in self._whitelists.values()
+            ],
+            "SINCRONI_LINKED_CHANNELS": [
+                (
+                    linked.id,
+                    linked.origin_channel_id,
+                    linked.origin_webhook_url,
+                    linked.destination_channel_id,
+                    linked.destination_webhook_url,
+                )
+                for linked in self._linked_channels.values()
+            ],
+            "SINCRONI_EMBED_COLOR": [
+                (color.server_id, color.raw_chat_type, color.raw_custom_color) for color in self._embed_colors.values()
+            ],
+            "SINCRONI_CONFIG": [
+                (
+                    config.server_id,
+                    config.webhook_embed,
+                    config.censor_messages,
+                    config.censor_links,
+                    config.censor_invites,
+                    config.raw_chat_type,
+                )
+                for config in self._global_chat_configs.values()
+            ],
+        }
+        return CacheSnapshot(tables, dict(self._watermarks))  # type: ignore # tuples are sequences
+
+    def restore_snapshot(self, snapshot: CacheSnapshot, /) -> None:
+        """Fill the caches from a snapshot, call :meth:`warm_up` with it afterwards to catch up."""
+        self._load_embed_colors(snapshot.tables["SINCRONI_EMBED_COLOR"])
+        self._load_global_chats(snapshot.tables["SINCRONI_GLOBAL_CHAT"])
+        self._load_blacklists(snapshot.tables["SINCRONI_BLACKLIST"])
+        self._load_whitelists(snapshot.tables["SINCRONI_WHITELIST"])
+        self._load_linked_channels(snapshot.tables["SINCRONI_LINKED_CHANNELS"])
+        self._load_global_chat_configs(snapshot.tables["SINCRONI_CONFIG"])
+
+        self._watermarks = dict(snapshot.watermarks)
+        self.warmed_up.set()
+
+    @property
+    def cache_sizes(self) -> Dict[str, int]:
+        """How many entries each cache has, by cache name."""
+        return {
+            "global_chats": len(self._global_chats),
+            "routes": sum(len(routes) for routes in self._routes.values()),
+            "blacklists": len(self._blacklists),
+            "whitelists": len(self._whitelists),
+            "linked_channels": len(self._linked_channels),
+            "embed_colors": len(self._embed_colors),
+            "global_chat_configs": len(self._global_chat_configs),
+        }
+
+    def is_routed_channel(self, channel_id: int, /) -> bool:
+        """Whether or not messages in a channel are relayed, as a global chat or a linked channel's origin."""
+        return channel_id in self._global_chats or channel_id in self._linked_channels
+
     # Global Chat
 
     @property
@@ -95,28 +440,67 @@ class DatabaseConnection:
         return list(self._global_chats.values())
 
     async def fetch_global_chats(self) -> List[GlobalChat]:
-        entries = await self.fetch("SELECT * FROM SINCRONI_GLOBAL_CHAT")
+        entries = await self._fetch_table("SINCRONI_GLOBAL_CHAT")
+        self._load_global_chats(entries)
+        return self.global_chats
 
-        row: GlobalChatPayload
-        for row in entries:
-            self._global_chats[row["channel_id"]] = GlobalChat(self, row)
+    def _load_global_chats(self, entries: Iterable[Sequence[Any]], /) -> None:
+        # replaces the cache, rows that were deleted meanwhile are dropped.
+        self._global_chats.clear()
+        self._routes.clear()
+        self.guild_pickers.clear_global_chats()
 
-        return self.global_chats
+        for row in entries:
+            self._store_global_chat(GlobalChat.from_row(self, row))
 
     async def fetch_global_chat(self, channel_id: int) -> Optional[GlobalChat]:
-        res = await self.fetchrow("SELECT * FROM SINCRONI_GLOBAL_CHAT WHERE channel_id = $1", channel_id)
+        res = await self.fetchrow(FETCH_GLOBAL_CHAT, channel_id)
         if res is None:
             return None
 
-        self._global_chats[channel_id] = GlobalChat(self, res)
-        return self._global_chats[channel_id]
+        return self._store_global_chat(GlobalChat(self, res))
 
     def get_global_chat(self, channel_id: int) -> Optional[GlobalChat]:
         return self._global_chats.get(channel_id)
 
     async def remove_global_chat(self, channel_id: int) -> Optional[GlobalChat]:
         await self.execute("DELETE FROM SINCRONI_GLOBAL_CHAT WHERE channel_id = $1", channel_id)
-        return self._global_chats.pop(channel_id, None)
+
+        return self._forget_global_chat(channel_id)
+
+    def _forget_global_chat(self, channel_id: int, /) -> Optional[GlobalChat]:
+        global_chat = self._global_chats.pop(channel_id, None)
+        if global_chat:
+            self._routes.get(global_chat.raw_chat_type, {}).pop(channel_id, None)
+            self.guild_pickers.remove_global_chat(global_chat)
+
+        return global_chat
+
+    def _store_global_chat(self, global_chat: GlobalChat, /) -> GlobalChat:
+        if old := self._global_chats.get(global_chat.channel_id):
+            self._routes.get(old.raw_chat_type, {}).pop(old.channel_id, None)
+            self.guild_pickers.remove_global_chat(old)
+
+        self._global_chats[global_chat.channel_id] = global_chat
+        self.guild_pickers.add_global_chat(global_chat)
+        self._routes.setdefault(global_chat.raw_chat_type, {})[global_chat.channel_id] = GlobalChatRoute(
+            global_chat, self.get_embed_color(global_chat.server_id, global_chat.chat_type)
+        )
+        return global_chat
+
+    def get_routes(self, chat_type: ChatType) -> List[GlobalChatRoute]:
+        """Every destination of the given chat type.
+
+        This is kept up to date by the global chat and embed color methods,
+        so relaying a message does not have to filter every global chat.
+        """
+        return list(self._routes.get(chat_type, {}).values())
+
+    def _recolor_routes(self, server_id: int, chat_type: int, /) -> None:
+        embed_color = self.get_embed_color(server_id, chat_type)  # type: ignore # ChatType is an IntEnum
+        for route in self._routes.get(chat_type, {}).values():
+            if route.server_id == server_id:
+                route.set_color(embed_color)
 
     async def add_global_chat(
         self,
@@ -133,8 +517,7 @@ class DatabaseConnection:
             chat_type.value,
             webhook_url,
         )
-        self._global_chats[channel_id] = GlobalChat(self, res)
-        return self._global_chats[channel_id]
+        return self._store_global_chat(GlobalChat(self, res))
 
     # Blacklist
 
@@ -143,23 +526,24 @@ class DatabaseConnection:
         return list(self._blacklists.values())
 
     async def fetch_blacklists(self) -> List[Blacklist]:
-        entries = await self.fetch("SELECT * FROM SINCRONI_BLACKLIST")
+        entries = await self._fetch_table("SINCRONI_BLACKLIST")
+        self._load_blacklists(entries)
+        return self.blacklists
 
-        row: Blacklist
-        for row in entries:
-            self._blacklists[(row["server_id"], row["entity_id"])] = Blacklist(self, row)
+    def _load_blacklists(self, entries: Iterable[Sequence[Any]], /) -> None:
+        self._blacklists.clear()
+        self.blacklist_index.clear()
+        self.guild_pickers.clear_blacklists()
 
-        return self.blacklists
+        for row in entries:
+            self._store_blacklist(Blacklist.from_row(self, row))
 
     async def fetch_blacklist(self, server_id: int, entity_id: int, /) -> Optional[Blacklist]:
-        query = "SELECT * FROM SINCRONI_BLACKLIST WHERE server_id = $1 AND entity_id = $2"
-
-        res = await self.fetchrow(query, server_id, entity_id)
+        res = await self.fetchrow(FETCH_BLACKLIST, server_id, entity_id)
         if res is None:
             return None
 
-        self._blacklists[(server_id, entity_id)] = Blacklist(self, res)
-        return self._blacklists[(server_id, entity_id)]
+        return self._store_blacklist(Blacklist(self, res))
 
     def get_blacklist(self, server_id: int, entity_id: int) -> Optional[Blacklist]:
         return self._blacklists.get((server_id, entity_id))
@@ -168,8 +552,26 @@ class DatabaseConnection:
         query = "DELETE FROM SINCRONI_BLACKLIST WHERE server_id = $1 AND entity_id = $2"
 
         await self.execute(query, server_id, entity_id)
+        return self._forget_blacklist(server_id, entity_id)
 
-        return self._blacklists.pop((server_id, entity_id), None)
+    def _forget_blacklist(self, server_id: int, entity_id: int, /) -> Optional[Blacklist]:
+        blacklist = self._blacklists.pop((server_id, entity_id), None)
+        if blacklist:
+            self.blacklist_index.remove(blacklist)
+            self.guild_pickers.remove_blacklist(blacklist)
+
+        return blacklist
+
+    def _store_blacklist(self, blacklist: Blacklist, /) -> Blacklist:
+        key = (blacklist.server_id, blacklist.entity_id)
+        if old := self._blacklists.get(key):
+            self.blacklist_index.remove(old)
+            self.guild_pickers.remove_blacklist(old)
+
+        self._blacklists[key] = blacklist
+        self.blacklist_index.add(blacklist)
+        self.guild_pickers.add_blacklist(blacklist)
+        return blacklist
 
     async def add_blacklist(
         self,
@@ -199,8 +601,87 @@ class DatabaseConnection:
 
         res = await self.fetchrow(query, server_id, entity_id, pub, dev, private, blacklist_type, reason, repeat)
 
-        self._blacklists[(server_id, entity_id)] = Blacklist(self, res)
-        return self._blacklists[(server_id, entity_id)]
+        return self._store_blacklist(Blacklist(self, res))
+
+    async def add_blacklists(self, entries: Iterable[Dict[str, Any]], /) -> List[Blacklist]:
+        """Add or update many blacklists in one statement.
+
+        The rows are sent as arrays and upserted with ``INSERT ... SELECT FROM UNNEST`` on the unique
+        ``(server_id, entity_id)`` index of migration 2, so concurrent imports of the same blacklist
+        update it instead of failing. The cache is updated once it was committed.
+
+        Parameters
+        ----------
+        entries : Iterable[Dict[str, Any]]
+            The ``server_id`` and ``entity_id`` of each blacklist and any of the other arguments of
+            :meth:`add_blacklist`, which default to the same. A later entry for the same entity replaces
+            an earlier one.
+
+        Returns
+        -------
+        List[Blacklist]
+            The added and updated blacklists.
+        """
+        columns = Blacklist.COLUMNS[1:]
+        rows: Dict[Tuple[int, int], Tuple[Any, ...]] = {}
+        for entry in entries:
+            values = {**_BLACKLIST_DEFAULTS, **entry}
+            rows[(values["server_id"], values["entity_id"])] = tuple(values[column] for column in columns)
+
+        if not rows:
+            return []
+
+        query = f"""
+            INSERT INTO SINCRONI_BLACKLIST (server_id, entity_id, pub, dev, private, blacklist_type, reason, repeat)
+            SELECT * FROM UNNEST(
+                $1::BIGINT[], $2::BIGINT[], $3::BOOLEAN[], $4::BOOLEAN[], $5::BOOLEAN[], $6::SMALLINT[], $7::TEXT[], $8::BOOLEAN[]
+            )
+            ON CONFLICT (server_id, entity_id) DO UPDATE
+            SET pub = EXCLUDED.pub,
+                dev = EXCLUDED.dev,
+                private = EXCLUDED.private,
+                blacklist_type = EXCLUDED.blacklist_type,
+                reason = EXCLUDED.reason,
+                repeat = EXCLUDED.repeat
+            RETURNING {', '.join(Blacklist.COLUMNS)}
+            """
+
+        records = await self.fetch(query, *[list(values) for values in zip(*rows.values())])
+        return [self._store_blacklist(Blacklist.from_row(self, row)) for row in records]
+
+    async def remove_blacklists(self, keys: Iterable[Tuple[int, int]], /) -> List[Blacklist]:
+        """Remove many blacklists in one statement.
+
+        The keys are sent as arrays and deleted with ``DELETE ... USING UNNEST``, a single
+        transaction. Once it was committed, the cache, the blacklist index and the guild pickers
+        forget every key in one pass.
+
+        Parameters
+        ----------
+        keys : Iterable[Tuple[int, int]]
+            The ``(server_id, entity_id)`` of each blacklist.
+
+        Returns
+        -------
+        List[Blacklist]
+            The removed blacklists, as they were in the database.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return []
+
+        query = """
+            DELETE FROM SINCRONI_BLACKLIST AS blacklist
+            USING UNNEST($1::BIGINT[], $2::BIGINT[]) AS removed(server_id, entity_id)
+            WHERE blacklist.server_id = removed.server_id AND blacklist.entity_id = removed.entity_id
+            RETURNING blacklist.*
+            """
+
+        records = await self.fetch(query, [key[0] for key in keys], [key[1] for key in keys])
+        for key in keys:
+            self._forget_blacklist(*key)
+
+        return [Blacklist(self, row) for row in records]
 
     # Whitelist
 
@@ -209,18 +690,19 @@ class DatabaseConnection:
         return list(self._whitelists.values())
 
     async def fetch_whitelists(self) -> List[Whitelist]:
-        entries = await self.fetch("SELECT * FROM SINCRONI_WHITELIST")
+        entries = await self._fetch_table("SINCRONI_WHITELIST")
+        self._load_whitelists(entries)
+        return self.whitelists
 
-        row: Whitelist
-        for row in entries:
-            self._whitelists[row["entity_id"]] = Whitelist(self, row)
+    def _load_whitelists(self, entries: Iterable[Sequence[Any]], /) -> None:
+        self._whitelists.clear()
 
-        return self.whitelists
+        for row in entries:
+            whitelist = Whitelist.from_row(self, row)
+            self._whitelists[whitelist.entity_id] = whitelist
 
     async def fetch_whitelist(self, entity_id: int, /) -> Optional[Whitelist]:
-        query = "SELECT * FROM SINCRONI_WHITELIST WHERE entity_id = $1"
-
-        res = await self.fetchrow(query, entity_id)
+        res = await self.fetchrow(FETCH_WHITELIST, entity_id)
         if res is None:
             return None
 
@@ -262,6 +744,43 @@ class DatabaseConnection:
         self._whitelists[entity_id] = Whitelist(self, res)
         return self._whitelists[entity_id]
 
+    async def add_whitelists(self, entries: Iterable[Dict[str, Any]], /) -> List[Whitelist]:
+        """Add or update many whitelists in one statement, like :meth:`add_blacklists`.
+
+        Parameters
+        ----------
+        entries : Iterable[Dict[str, Any]]
+            The ``entity_id`` of each whitelist and any of the other arguments of :meth:`add_whitelist`,
+            which default to the same.
+
+        Returns
+        -------
+        List[Whitelist]
+            The added and updated whitelists.
+        """
+        columns = Whitelist.COLUMNS[1:]
+        rows: Dict[int, Tuple[Any, ...]] = {}
+        for entry in entries:
+            values = {**_WHITELIST_DEFAULTS, **entry}
+            rows[values["entity_id"]] = tuple(values[column] for column in columns)
+
+        if not rows:
+            return []
+
+        query = f"""
+            INSERT INTO SINCRONI_WHITELIST (entity_id, whitelist_type, reason)
+            SELECT * FROM UNNEST($1::BIGINT[], $2::SMALLINT[], $3::TEXT[])
+            ON CONFLICT (entity_id) DO UPDATE
+            SET whitelist_type = EXCLUDED.whitelist_type,
+                reason = EXCLUDED.reason
+            RETURNING {', '.join(Whitelist.COLUMNS)}
+            """
+
+        records = await self.fetch(query, *[list(values) for values in zip(*rows.values())])
+        whitelists = [Whitelist.from_row(self, row) for row in records]
+        self._whitelists.update((whitelist.entity_id, whitelist) for whitelist in whitelists)
+        return whitelists
+
     # Linked Channels
 
     @property
@@ -269,18 +788,19 @@ class DatabaseConnection:
         return list(self._linked_channels.values())
 
     async def fetch_linked_channels(self) -> List[LinkedChannel]:
-        entries = await self.fetch("SELECT * FROM SINCRONI_LINKED_CHANNELS")
+        entries = await self._fetch_table("SINCRONI_LINKED_CHANNELS")
+        self._load_linked_channels(entries)
+        return self.linked_channels
 
-        row: LinkedChannel
-        for row in entries:
-            self._linked_channels[row["origin_channel_id"]] = LinkedChannel(self, row)
+    def _load_linked_channels(self, entries: Iterable[Sequence[Any]], /) -> None:
+        self._linked_channels.clear()
 
-        return self.linked_channels
+        for row in entries:
+            linked_channel = LinkedChannel.from_row(self, row)
+            self._linked_channels[linked_channel.origin_channel_id] = linked_channel
 
     async def fetch_linked_channel(self, origin_channel_id, /) -> Optional[LinkedChannel]:
-        query = "SELECT * FROM SINCRONI_LINKED_CHANNELS WHERE origin_channel_id = $1"
-
-        res = await self.fetchrow(query, origin_channel_id)
+        res = await self.fetchrow(FETCH_LINKED_CHANNEL, origin_channel_id)
         if res is None:
             return None
 
@@ -332,22 +852,28 @@ class DatabaseConnection:
         return list(self._embed_colors.values())
 
     async def fetch_embed_colors(self) -> List[EmbedColor]:
-        entries = await self.fetch("SELECT * FROM SINCRONI_EMBED_COLOR")
+        entries = await self._fetch_table("SINCRONI_EMBED_COLOR")
+        self._load_embed_colors(entries)
+        return self.embed_colors
+
+    def _load_embed_colors(self, entries: Iterable[Sequence[Any]], /) -> None:
+        self._embed_colors.clear()
 
-        row: EmbedColor
         for row in entries:
-            self._embed_colors[(row["server_id"], row["chat_type"])] = EmbedColor(self, row)
+            embed_color = EmbedColor.from_row(self, row)
+            self._embed_colors[(embed_color.server_id, embed_color.raw_chat_type)] = embed_color
 
-        return self.embed_colors
+        for chat_type, routes in self._routes.items():
+            for route in routes.values():
+                route.set_color(self.get_embed_color(route.server_id, chat_type))  # type: ignore # ChatType is an IntEnum
 
     async def fetch_embed_color(self, server_id: int, chat_type: ChatType = ChatType.public, /) -> Optional[EmbedColor]:
-        query = "SELECT * FROM SINCRONI_EMBED_COLOR WHERE server_id = $1 AND chat_type = $2"
-
-        res = await self.fetchrow(query, server_id, chat_type)
+        res = await self.fetchrow(FETCH_EMBED_COLOR, server_id, chat_type)
         if res is None:
             return None
 
         self._embed_colors[(server_id, chat_type)] = EmbedColor(self, res)
+        self._recolor_routes(server_id, chat_type)
         return self._embed_colors[(server_id, chat_type)]
 
     def get_embed_color(self, server_id: int, chat_type: ChatType = ChatType.public) -> Optional[EmbedColor]:
@@ -358,7 +884,9 @@ class DatabaseConnection:
 
         await self.execute(query, server_id, chat_type)
 
-        return self._embed_colors.pop((server_id, chat_type), None)
+        embed_color = self._embed_colors.pop((server_id, chat_type), None)
+        self._recolor_routes(server_id, chat_type)
+        return embed_color
 
     async def add_embed_color(
         self,
@@ -379,6 +907,7 @@ class DatabaseConnection:
         res = await self.fetchrow(query, server_id, chat_type, custom_color)
 
         self._embed_colors[(server_id, chat_type)] = EmbedColor(self, res)
+        self._recolor_routes(server_id, chat_type)
         return self._embed_colors[(server_id, chat_type)]
 
     @property
@@ -386,20 +915,21 @@ class DatabaseConnection:
         return list(self._global_chat_configs.values())
 
     async def fetch_global_chat_configs(self) -> List[GlobalChatConfig]:
-        entries = await self.fetch("SELECT * FROM SINCRONI_CONFIG")
+        entries = await self._fetch_table("SINCRONI_CONFIG")
+        self._load_global_chat_configs(entries)
+        return self.global_chat_configs
 
-        row: GlobalChatConfig
-        for row in entries:
-            self._global_chat_configs[(row["server_id"], row["chat_type"])] = EmbedColor(self, row)
+    def _load_global_chat_configs(self, entries: Iterable[Sequence[Any]], /) -> None:
+        self._global_chat_configs.clear()
 
-        return self.global_chat_configs
+        for row in entries:
+            config = GlobalChatConfig.from_row(self, row)
+            self._global_chat_configs[(config.server_id, config.raw_chat_type)] = config
 
     async def fetch_global_chat_config(
         self, server_id: int, chat_type: ChatType = ChatType.public, /
     ) -> Optional[GlobalChatConfig]:
-        query = "SELECT * FROM SINCRONI_CONFIG WHERE server_id = $1 AND chat_type = $2"
-
-        res = await self.fetchrow(query, server_id, chat_type)
+        res = await self.fetchrow(FETCH_GLOBAL_CHAT_CONFIG, server_id, chat_type)
         if res is None:
             return None
 
@@ -448,3 +978,88 @@ class DatabaseConnection:
 
         self._global_chat_configs[(server_id, chat_type)] = GlobalChatConfig(self, res)
         return self._global_chat_configs[(server_id, chat_type)]
+
+    # Outbox
+
+    async def add_outbox_entries(
+        self, entries: Sequence[Tuple[int, Optional[str], Dict[str, Any], Optional[str]]]
+    ) -> None:
+        """Insert ``(channel_id, webhook_url, payload, last_error)`` rows in one statement."""
+        if not entries:
+            return
+
+        query = """
+            INSERT INTO SINCRONI_OUTBOX (channel_id, webhook_url, payload, last_error)
+            SELECT * FROM UNNEST($1::BIGINT[], $2::TEXT[], $3::JSONB[], $4::TEXT[])
+            """
+
+        channel_ids, webhook_urls, payloads, errors = zip(*entries)
+        await self.execute(query, list(channel_ids), list(webhook_urls), list(payloads), list(errors))
+
+    async def claim_outbox_entries(self, limit: int, lease: float) -> List[OutboxEntry]:
+        """Take up to ``limit`` due entries, hiding them from other claims for ``lease`` seconds."""
+        query = """
+            UPDATE SINCRONI_OUTBOX
+            SET next_attempt_at = NOW() + make_interval(secs => $2)
+            WHERE id IN (
+                SELECT id FROM SINCRONI_OUTBOX
+                WHERE next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *
+            """
+
+        entries = await self.fetch(query, limit, lease)
+        return [OutboxEntry(self, row) for row in entries]
+
+    async def remove_outbox_entries(self, ids: Sequence[int]) -> None:
+        if ids:
+            await self.execute("DELETE FROM SINCRONI_OUTBOX WHERE id = ANY($1::BIGINT[])", list(ids))
+
+    async def reschedule_outbox_entries(self, entries: Sequence[Tuple[int, float, Optional[str]]]) -> None:
+        """Update ``(id, delay, last_error)`` rows in one statement, counting an attempt for each."""
+        if not entries:
+            return
+
+        query = """
+            UPDATE SINCRONI_OUTBOX AS outbox
+            SET attempts = outbox.attempts + 1,
+                next_attempt_at = NOW() + make_interval(secs => retry.delay),
+                last_error = retry.last_error
+            FROM UNNEST($1::BIGINT[], $2::FLOAT8[], $3::TEXT[]) AS retry(id, delay, last_error)
+            WHERE outbox.id = retry.id
+            """
+
+        ids, delays, errors = zip(*entries)
+        await self.execute(query, list(ids), list(delays), list(errors))
+
+    # Relayed messages
+
+    async def add_relayed_messages(self, rows: Sequence[Tuple[int, int, int, Optional[int]]]) -> None:
+        """Insert ``(origin_message_id, channel_id, message_id, webhook_id)`` rows in one statement."""
+        if not rows:
+            return
+
+        query = """
+            INSERT INTO SINCRONI_RELAYED_MESSAGES (origin_message_id, channel_id, message_id, webhook_id)
+            SELECT * FROM UNNEST($1::BIGINT[], $2::BIGINT[], $3::BIGINT[], $4::BIGINT[])
+            """
+
+        origin_ids, channel_ids, message_ids, webhook_ids = zip(*rows)
+        await self.execute(query, list(origin_ids), list(channel_ids), list(message_ids), list(webhook_ids))
+
+    async def fetch_relayed_messages(self, origin_message_id: int, max_age: float) -> List[CustomRecordClass]:
+        query = """
+            SELECT channel_id, message_id, webhook_id FROM SINCRONI_RELAYED_MESSAGES
+            WHERE origin_message_id = $1 AND created_at > NOW() - make_interval(secs => $2)
+            """
+        return await self.fetch(query, origin_message_id, max_age)
+
+    async def remove_relayed_messages(self, origin_message_id: int) -> None:
+        await self.execute("DELETE FROM SINCRONI_RELAYED_MESSAGES WHERE origin_message_id = $1", origin_message_id)
+
+    async def purge_relayed_messages(self, max_age: float) -> None:
+        query = "DELETE FROM SINCRONI_RELAYED_MESSAGES WHERE created_at < NOW() - make_interval(secs => $1)"
+        await self.execute(query, max_age)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import traceback
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Set, Tuple
+
+import asyncpg
+
+if TYPE_CHECKING:
+    from .connection import DatabaseConnection
+
+# the channel the sincroni_notify_change trigger notifies, see utils/database/migrations.py.
+CHANNEL = "sincroni_changes"
+
+# the columns that identify a row in each cache.
+ROW_KEYS: Dict[str, Sequence[str]] = {
+    "SINCRONI_GLOBAL_CHAT": ("channel_id",),
+    "SINCRONI_BLACKLIST": ("server_id", "entity_id"),
+    "SINCRONI_WHITELIST": ("entity_id",),
+    "SINCRONI_LINKED_CHANNELS": ("origin_channel_id",),
+    "SINCRONI_EMBED_COLOR": ("server_id", "chat_type"),
+    "SINCRONI_CONFIG": ("server_id", "chat_type"),
+}
+
+RowChanges = Dict[Tuple[str, Tuple[Any, ...]], Optional[Dict[str, Any]]]
+
+
+class ChangeListener:
+    """Keeps the caches in sync with changes made by other processes, using LISTEN/NOTIFY.
+
+    Every change is sent by the ``sincroni_notify_change`` trigger with the old and new row.
+    Changes that arrive within ``delay`` seconds of each other are applied together, and only
+    the last state of every row is applied. Rows too large to notify reload their whole table.
+
+    After the LISTEN connection is lost, it reconnects and reloads the tables that changed
+    meanwhile.
+
+    Parameters
+    ----------
+    connection : DatabaseConnection
+        The caches to keep in sync.
+    dsn : str
+        Where to connect to, the listening connection is not part of the pool.
+    delay : float
+        How long to wait for more changes before applying them.
+    """
+
+    def __init__(self, connection: DatabaseConnection, dsn: str, *, delay: float = 0.05) -> None:
+        self.connection: DatabaseConnection = connection
+        self.delay: float = delay
+        self.__dsn: str = dsn
+
+        self._listener: Optional[asyncpg.Connection] = None
+        self._lost: asyncio.Event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+
+        self._changes: RowChanges = {}
+        self._reload: Set[str] = set()
+
+    def __repr__(self) -> str:
+        return f"<ChangeListener listening={self.listening} pending={len(self._changes) + len(self._reload)}>"
+
+    @property
+    def listening(self) -> bool:
+        return self._listener is not None and not self._listener.is_closed()
+
+    async def start(self) -> None:
+        """Start listening. Returns once LISTEN was issued, so nothing committed after is missed."""
+        await self._connect()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    async def _connect(self) -> None:
+        self._lost.clear()
+        self._listener = await asyncpg.connect(self.__dsn)
+        self._listener.add_termination_listener(lambda _: self._lost.set())
+        await self._listener.add_listener(CHANNEL, self._on_notification)
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            await self._lost.wait()
+            print("Lost the database change listener, reconnecting.")
+
+            try:
+                await self._connect()
+                # anything changed while disconnected was never notified.
+                await self.connection.catch_up()
+                delay = 1.0
+            except Exception as err:
+                traceback.print_exception(type(err), err, err.__traceback__)
+                self._lost.set()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+            table = change["table"]
+        except (ValueError, KeyError):
+            print(f"Ignoring an invalid change notification: {payload[:100]}")
+            return
+
+        keys = ROW_KEYS.get(table)
+        if keys is None:
+            return
+
+        if "new" not in change and "old" not in change:
+            # too large to notify, or a TRUNCATE.
+            self._reload.add(table)
+        else:
+            # the last change of a row wins, an update that changes the key deletes the old one.
+            if old := change.get("old"):
+                self._changes[(table, tuple(old[key] for key in keys))] = None
+            if new := change.get("new"):
+                self._changes[(table, tuple(new[key] for key in keys))] = new
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.delay, self._schedule_flush)
+
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.create_task(self._flush())
+        else:
+            # still applying the previous burst, try again after it.
+            self._flush_handle = asyncio.get_running_loop().call_later(self.delay, self._schedule_flush)
+
+    async def _flush(self) -> None:
+        changes, self._changes = self._changes, {}
+        reload, self._reload = self._reload, set()
+
+        try:
+            await self.connection.apply_changes(changes, reload)
+        except Exception as err:
+            traceback.print_exception(type(err), err, err.__traceback__)
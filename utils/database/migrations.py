@@ -0,0 +1,474 @@
+"""Versioned schema migrations.
+
+Every migration runs once, in its own transaction, in the order of its version. The applied
+versions are kept in ``SINCRONI_SCHEMA_MIGRATIONS``. A database made from an older ``table.sql``
+is brought in line by the same migrations, as the first one only creates what is missing.
+
+Nothing here deletes rows on its own: migration 2 refuses to run while there are duplicate
+blacklists or whitelists, which ``--remove-duplicates`` removes. The triggers that notify other
+processes of changes are not part of the migrations either, as every write pays for them. They
+are installed by :meth:`DatabaseConnection.listen` when ``DB_LISTEN`` is on.
+
+Run from the bot on start, or with ``python -m utils.database.migrations`` and ``DB_key`` set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Union
+
+import asyncpg
+
+_log = logging.getLogger(__name__)
+
+# held while migrating, so processes starting together don't migrate at the same time.
+LOCK_ID = 0x53494E43  # "SINC"
+
+
+class MigrationError(Exception):
+    """A migration failed and was rolled back, the ones before it stay applied.
+
+    Attributes
+    ----------
+    migration : Migration
+        The migration that failed.
+    """
+
+    def __init__(self, migration: Migration, error: Exception) -> None:
+        self.migration: Migration = migration
+        super().__init__(f"Migration {migration.version} ({migration.description}) failed: {error}")
+
+
+class Migration:
+    """A schema change.
+
+    Attributes
+    ----------
+    version : int
+        The order it runs in, never reused.
+    description : str
+        What it changes.
+    statements : Sequence[str]
+        The statements it runs, in order.
+    """
+
+    __slots__ = ("version", "description", "statements")
+
+    def __init__(self, version: int, description: str, statements: Sequence[str]) -> None:
+        self.version: int = version
+        self.description: str = description
+        self.statements: Sequence[str] = statements
+
+    def __repr__(self) -> str:
+        return f"<Migration version={self.version} description={self.description!r}>"
+
+
+_NOTIFY_FUNCTION = """
+    CREATE OR REPLACE FUNCTION sincroni_notify_change() RETURNS TRIGGER AS $$
+    DECLARE
+        payload TEXT;
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            payload := json_build_object('table', upper(TG_TABLE_NAME))::TEXT;
+        ELSE
+            payload := json_build_object(
+                'table', upper(TG_TABLE_NAME),
+                'old', CASE WHEN TG_OP <> 'INSERT' THEN row_to_json(OLD) END,
+                'new', CASE WHEN TG_OP <> 'DELETE' THEN row_to_json(NEW) END
+            )::TEXT;
+
+            -- payloads have to be shorter than 8000 bytes, the listener reloads the table instead.
+            IF octet_length(payload) >= 8000 THEN
+                payload := json_build_object('table', upper(TG_TABLE_NAME))::TEXT;
+            END IF;
+        END IF;
+
+        PERFORM pg_notify('sincroni_changes', payload);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """
+
+_CACHED_TABLES = (
+    "SINCRONI_GLOBAL_CHAT",
+    "SINCRONI_BLACKLIST",
+    "SINCRONI_WHITELIST",
+    "SINCRONI_LINKED_CHANNELS",
+    "SINCRONI_EMBED_COLOR",
+    "SINCRONI_CONFIG",
+)
+
+
+def _replace_trigger(name: str, table: str, definition: str) -> List[str]:
+    # CREATE OR REPLACE TRIGGER needs PostgreSQL 14.
+    return [f"DROP TRIGGER IF EXISTS {name} ON {table}", f"CREATE TRIGGER {name} {definition}"]
+
+
+NOTIFY_TRIGGERS: List[str] = [
+    _NOTIFY_FUNCTION,
+    *[
+        statement
+        for table in _CACHED_TABLES
+        for statement in _replace_trigger(
+            f"{table.lower()}_notify",
+            table,
+            f"AFTER INSERT OR UPDATE OR DELETE ON {table} FOR EACH ROW EXECUTE FUNCTION sincroni_notify_change()",
+        )
+    ],
+    *[
+        statement
+        for table in _CACHED_TABLES
+        for statement in _replace_trigger(
+            f"{table.lower()}_truncate",
+            table,
+            f"AFTER TRUNCATE ON {table} FOR EACH STATEMENT EXECUTE FUNCTION sincroni_notify_change()",
+        )
+    ],
+]
+
+_BUMP_VERSION_FUNCTION = """
+    CREATE OR REPLACE FUNCTION sincroni_bump_version() RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO SINCRONI_TABLE_VERSIONS (table_name, version) VALUES (upper(TG_TABLE_NAME), 1)
+        ON CONFLICT (table_name) DO UPDATE SET version = SINCRONI_TABLE_VERSIONS.version + 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """
+
+# the cache only ever kept the last row of each, these keep the newest and delete the rest.
+_REMOVE_DUPLICATES: Dict[str, str] = {
+    "SINCRONI_BLACKLIST": """
+        DELETE FROM SINCRONI_BLACKLIST AS older USING SINCRONI_BLACKLIST AS newer
+        WHERE older.server_id = newer.server_id AND older.entity_id = newer.entity_id AND older.id < newer.id
+        """,
+    "SINCRONI_WHITELIST": """
+        DELETE FROM SINCRONI_WHITELIST AS older USING SINCRONI_WHITELIST AS newer
+        WHERE older.entity_id = newer.entity_id AND older.id < newer.id
+        """,
+}
+
+_REFUSE_DUPLICATES = """
+    DO $$
+    DECLARE
+        blacklists BIGINT;
+        whitelists BIGINT;
+    BEGIN
+        SELECT count(*) - count(DISTINCT (server_id, entity_id)) INTO blacklists FROM SINCRONI_BLACKLIST;
+        SELECT count(*) - count(DISTINCT entity_id) INTO whitelists FROM SINCRONI_WHITELIST;
+
+        IF blacklists > 0 OR whitelists > 0 THEN
+            -- only the newest of each was ever used, --remove-duplicates deletes the others.
+            RAISE EXCEPTION '% duplicate blacklists and % duplicate whitelists, remove them with --remove-duplicates',
+                blacklists, whitelists;
+        END IF;
+    END
+    $$
+    """
+
+
+def _add_primary_key(table: str, columns: str) -> str:
+    # ADD PRIMARY KEY has no IF NOT EXISTS.
+    return f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conrelid = '{table}'::regclass AND contype = 'p'
+            ) THEN
+                ALTER TABLE {table} ADD PRIMARY KEY ({columns});
+            END IF;
+        END
+        $$
+        """
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "the tables of table.sql",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_GLOBAL_CHAT(
+                server_id BIGINT NOT NULL,
+                channel_id BIGINT NOT NULL,
+                webhook_url TEXT,
+                chat_type SMALLINT DEFAULT 0 NOT NULL,
+                UNIQUE (server_id, channel_id),
+                PRIMARY KEY (server_id, chat_type)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_BLACKLIST(
+                id SERIAL NOT NULL,
+                server_id BIGINT NOT NULL,
+                entity_id BIGINT NOT NULL,
+                pub BOOLEAN DEFAULT FALSE,
+                dev BOOLEAN DEFAULT FALSE,
+                private BOOLEAN DEFAULT FALSE,
+                blacklist_type SMALLINT DEFAULT 0,
+                reason TEXT DEFAULT 'No reason provided',
+                repeat BOOLEAN DEFAULT FALSE
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_WHITELIST(
+                id SERIAL NOT NULL,
+                entity_id BIGINT NOT NULL,
+                whitelist_type SMALLINT DEFAULT 0,
+                reason TEXT DEFAULT 'No reason provided'
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_LINKED_CHANNELS(
+                id SERIAL NOT NULL,
+                origin_channel_id BIGINT NOT NULL,
+                origin_webhook_url TEXT,
+                destination_channel_id BIGINT NOT NULL,
+                destination_webhook_url TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_EMBED_COLOR(
+                server_id BIGINT NOT NULL,
+                chat_type SMALLINT DEFAULT 0 NOT NULL,
+                custom_color INTEGER NOT NULL,
+                UNIQUE (server_id, chat_type)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_CONFIG(
+                server_id BIGINT NOT NULL,
+                webhook_embed BOOLEAN DEFAULT TRUE,
+                censor_messages BOOLEAN DEFAULT FALSE,
+                censor_links BOOLEAN DEFAULT FALSE,
+                censor_invites BOOLEAN DEFAULT FALSE,
+                chat_type SMALLINT DEFAULT 0,
+                UNIQUE (server_id, chat_type)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_OUTBOX(
+                id BIGSERIAL PRIMARY KEY,
+                channel_id BIGINT NOT NULL,
+                webhook_url TEXT,
+                payload JSONB NOT NULL,
+                attempts SMALLINT DEFAULT 0 NOT NULL,
+                next_attempt_at TIMESTAMPTZ DEFAULT NOW() NOT NULL,
+                last_error TEXT,
+                created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_RELAYED_MESSAGES(
+                origin_message_id BIGINT NOT NULL,
+                channel_id BIGINT NOT NULL,
+                message_id BIGINT NOT NULL,
+                webhook_id BIGINT,
+                created_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS sincroni_relayed_messages_origin ON SINCRONI_RELAYED_MESSAGES (origin_message_id)",
+        ],
+    ),
+    Migration(
+        2,
+        "primary keys, unique constraints and indexes for the lookups of DatabaseConnection",
+        [
+            # the unique indexes can't be made over duplicates, which are left for an admin to remove.
+            _REFUSE_DUPLICATES,
+            _add_primary_key("SINCRONI_BLACKLIST", "id"),
+            _add_primary_key("SINCRONI_WHITELIST", "id"),
+            _add_primary_key("SINCRONI_LINKED_CHANNELS", "id"),
+            # fetch_blacklist, remove_blacklist, get_blacklist and the bulk upsert.
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS sincroni_blacklist_server_entity
+            ON SINCRONI_BLACKLIST (server_id, entity_id)
+            """,
+            # fetch_whitelist and remove_whitelist.
+            "CREATE UNIQUE INDEX IF NOT EXISTS sincroni_whitelist_entity ON SINCRONI_WHITELIST (entity_id)",
+            # fetch_linked_channel and remove_linked_channel, an origin can be linked more than once.
+            """
+            CREATE INDEX IF NOT EXISTS sincroni_linked_channels_origin
+            ON SINCRONI_LINKED_CHANNELS (origin_channel_id)
+            """,
+            # fetch_global_chat and remove_global_chat, the unique constraint leads with server_id.
+            "CREATE INDEX IF NOT EXISTS sincroni_global_chat_channel ON SINCRONI_GLOBAL_CHAT (channel_id)",
+            # claim_outbox_entries and purge_relayed_messages.
+            "CREATE INDEX IF NOT EXISTS sincroni_outbox_next_attempt ON SINCRONI_OUTBOX (next_attempt_at)",
+            """
+            CREATE INDEX IF NOT EXISTS sincroni_relayed_messages_created
+            ON SINCRONI_RELAYED_MESSAGES (created_at)
+            """,
+        ],
+    ),
+    Migration(
+        3,
+        "a version of every cached table, bumped by each statement that changes it",
+        [
+            # what a cache snapshot is compared against. It is part of the writing transaction,
+            # unlike the statistics of pg_stat_user_tables, and TRUNCATE bumps it too.
+            """
+            CREATE TABLE IF NOT EXISTS SINCRONI_TABLE_VERSIONS(
+                table_name TEXT PRIMARY KEY,
+                version BIGINT DEFAULT 0 NOT NULL
+            )
+            """,
+            f"""
+            INSERT INTO SINCRONI_TABLE_VERSIONS (table_name)
+            VALUES {', '.join(f"('{table}')" for table in _CACHED_TABLES)}
+            ON CONFLICT (table_name) DO NOTHING
+            """,
+            _BUMP_VERSION_FUNCTION,
+            *[
+                statement
+                for table in _CACHED_TABLES
+                for statement in _replace_trigger(
+                    f"{table.lower()}_version",
+                    table,
+                    f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+                    "FOR EACH STATEMENT EXECUTE FUNCTION sincroni_bump_version()",
+                )
+            ],
+        ],
+    ),
+]
+
+
+async def applied_versions(connection: asyncpg.Connection, /) -> List[int]:
+    await connection.execute("""
+        CREATE TABLE IF NOT EXISTS SINCRONI_SCHEMA_MIGRATIONS(
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ DEFAULT NOW() NOT NULL
+        )
+        """)
+    return [row[0] for row in await connection.fetch("SELECT version FROM SINCRONI_SCHEMA_MIGRATIONS ORDER BY version")]
+
+
+async def migrate(
+    connection: Union[asyncpg.Connection, asyncpg.Pool],
+    /,
+    *,
+    target: Optional[int] = None,
+    migrations: Sequence[Migration] = MIGRATIONS,
+) -> List[Migration]:
+    """Apply the migrations that weren't yet.
+
+    Parameters
+    ----------
+    connection : Union[asyncpg.Connection, asyncpg.Pool]
+        Where to migrate, a pool lends a connection for it.
+    target : Optional[int]
+        The last version to apply. Defaults to all of them.
+
+    Returns
+    -------
+    List[Migration]
+        The migrations that were applied.
+    """
+    if isinstance(connection, asyncpg.Pool):
+        async with connection.acquire() as acquired:
+            return await migrate(acquired, target=target, migrations=migrations)
+
+    applied: List[Migration] = []
+    await connection.execute("SELECT pg_advisory_lock($1)", LOCK_ID)
+    try:
+        done = set(await applied_versions(connection))
+        for migration in sorted(migrations, key=lambda migration: migration.version):
+            if migration.version in done or (target is not None and migration.version > target):
+                continue
+
+            try:
+                async with connection.transaction():
+                    for statement in migration.statements:
+                        await connection.execute(statement)
+
+                    await connection.execute(
+                        "INSERT INTO SINCRONI_SCHEMA_MIGRATIONS (version, description) VALUES ($1, $2)",
+                        migration.version,
+                        migration.description,
+                    )
+            except asyncpg.PostgresError as err:
+                raise MigrationError(migration, err) from err
+
+            _log.info("Applied migration %s: %s", migration.version, migration.description)
+            applied.append(migration)
+    finally:
+        await connection.execute("SELECT pg_advisory_unlock($1)", LOCK_ID)
+
+    return applied
+
+
+async def _run_locked(connection: asyncpg.Connection, statements: Sequence[str], /) -> None:
+    # in one transaction, while no other process migrates or installs the triggers.
+    async with connection.transaction():
+        await connection.execute("SELECT pg_advisory_xact_lock($1)", LOCK_ID)
+        for statement in statements:
+            await connection.execute(statement)
+
+
+async def install_notify_triggers(connection: asyncpg.Connection, /) -> None:
+    """Make every write to a cached table notify the :class:`ChangeListener` of other processes."""
+    await _run_locked(connection, NOTIFY_TRIGGERS)
+
+
+async def remove_duplicates(connection: asyncpg.Connection, /) -> Dict[str, int]:
+    """Delete the older rows of duplicate blacklists and whitelists, so migration 2 can run.
+
+    Returns
+    -------
+    Dict[str, int]
+        How many rows were deleted, by table.
+    """
+    removed: Dict[str, int] = {}
+    async with connection.transaction():
+        await connection.execute("SELECT pg_advisory_xact_lock($1)", LOCK_ID)
+        for table, statement in _REMOVE_DUPLICATES.items():
+            status = await connection.execute(statement)
+            removed[table] = int(status.split()[-1])
+
+    return removed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", type=int, help="the last version to apply, defaults to all of them")
+    parser.add_argument("--list", action="store_true", help="show which migrations were applied and stop")
+    parser.add_argument(
+        "--remove-duplicates",
+        action="store_true",
+        help="delete all but the newest of duplicate blacklists and whitelists before migrating",
+    )
+    args = parser.parse_args()
+
+    connection = await asyncpg.connect(os.environ["DB_key"])
+    try:
+        if args.list:
+            done = set(await applied_versions(connection))
+            for migration in MIGRATIONS:
+                print(f"{'x' if migration.version in done else ' '} {migration.version}: {migration.description}")
+            return
+
+        if args.remove_duplicates:
+            for table, count in (await remove_duplicates(connection)).items():
+                print(f"Removed {count} duplicate rows from {table}.")
+
+        try:
+            applied = await migrate(connection, target=args.target)
+        except MigrationError as err:
+            raise SystemExit(str(err))
+
+        for migration in applied:
+            print(f"Applied {migration.version}: {migration.description}")
+        if not applied:
+            print("The schema is up to date.")
+    finally:
+        await connection.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-from functools import cached_property
-from typing import TYPE_CHECKING, Optional, Union
+import datetime
+import json
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, Optional, Sequence, Tuple, Union
 
 import discord
 from discord import Guild, TextChannel, Thread, Webhook
 from discord.abc import GuildChannel, PrivateChannel
+from discord.utils import MISSING
 
-from utils.extra import ChatType, FilterType
+from utils.extra import DEFAULT_EMBED_COLOR, ChatType, FilterType
 
 if TYPE_CHECKING:
     from aiohttp import ClientSession
@@ -20,8 +22,13 @@ if TYPE_CHECKING:
     from .types import GlobalChat as GlobalChatPayload
     from .types import GlobalChatConfig as GlobalChatConfigPayload
     from .types import LinkedChannels as LinkedChannelsPayload
+    from .types import OutboxEntry as OutboxEntryPayload
     from .types import Whitelist as WhitelistPayload
 
+# a dict lookup is several times cheaper than calling the enum, which adds up over whole tables.
+_CHAT_TYPES: Dict[int, ChatType] = {chat_type.value: chat_type for chat_type in ChatType}
+_FILTER_TYPES: Dict[int, FilterType] = {filter_type.value: filter_type for filter_type in FilterType}
+
 
 class GlobalChat:
     """Represents a global chat channel.
@@ -41,6 +48,8 @@ class GlobalChat:
         The ID of the channel.
     raw_chat_type : int
         The raw chat type.
+    chat_type : ChatType
+        The chat type.
     webhook_url : Optional[str]
         The webhook URL for the channel. ``None`` if there is no webhook.
 
@@ -50,15 +59,35 @@ class GlobalChat:
         The representation of the global chat.
     """
 
+    __slots__ = ("_connection", "server_id", "channel_id", "raw_chat_type", "chat_type", "webhook_url", "_webhook")
+
+    # the order of the values from_row takes, and of the cache snapshot.
+    COLUMNS: ClassVar[Tuple[str, ...]] = ("server_id", "channel_id", "webhook_url", "chat_type")
+
     def __init__(self, connection: DatabaseConnection, data: GlobalChatPayload, /) -> None:
         self._connection: DatabaseConnection = connection
 
         self.server_id: int = data["server_id"]
         self.channel_id: int = data["channel_id"]
         self.raw_chat_type: ChatTypePayload = data["chat_type"]
+        self.chat_type: ChatType = _CHAT_TYPES[self.raw_chat_type]
         self.webhook_url: Optional[str] = data["webhook_url"]
 
-        self._webhook: Optional[Webhook] = None
+        # resolved on first use, most global chats are only looked at when relaying.
+        self._webhook: Optional[Webhook] = MISSING
+
+    @classmethod
+    def from_row(cls, connection: DatabaseConnection, row: Sequence[Any], /) -> GlobalChat:
+        """Make a global chat from the values of :attr:`COLUMNS`, in order.
+
+        Skips looking every value up by its column name, for loading whole tables.
+        """
+        self = cls.__new__(cls)
+        self._connection = connection
+        self.server_id, self.channel_id, self.webhook_url, self.raw_chat_type = row
+        self.chat_type = _CHAT_TYPES[self.raw_chat_type]
+        self._webhook = MISSING
+        return self
 
     def __repr__(self) -> str:
         return f"<GlobalChat server_id={self.server_id} channel_id={self.channel_id} chat_type={self.chat_type.name}>"
@@ -67,16 +96,11 @@ class GlobalChat:
         return self.channel_id
 
     @property
-    def chat_type(self) -> ChatType:
-        return ChatType(self.raw_chat_type)
-
-    @cached_property
     def webhook(self) -> Optional[Webhook]:
-        if self.webhook_url is None:
-            return None
-
-        if not self._webhook:
-            self._webhook = self._connection.bot.get_webhook_from_url(self.webhook_url)
+        if self._webhook is MISSING:
+            self._webhook = (
+                self._connection.bot.get_webhook_from_url(self.webhook_url) if self.webhook_url is not None else None
+            )
 
         return self._webhook
 
@@ -92,7 +116,81 @@ class GlobalChat:
         return self._connection.bot.get_channel(self.channel_id)  # type: ignore
 
 
+class GlobalChatRoute:
+    """Represents a destination of a global chat with everything needed to relay to it.
+
+    Parameters
+    ----------
+    global_chat : GlobalChat
+        The global chat that is relayed to.
+    embed_color : Optional[EmbedColor]
+        The custom embed color of the destination. ``None`` to use the default color.
+
+    Attributes
+    ----------
+    global_chat : GlobalChat
+        The global chat that is relayed to.
+    server_id : int
+        The ID of the server the channel is in.
+    channel_id : int
+        The ID of the channel.
+    color : discord.Color
+        The color the relayed embeds have in this destination.
+    """
+
+    __slots__ = ("global_chat", "server_id", "channel_id", "color")
+
+    def __init__(self, global_chat: GlobalChat, embed_color: Optional[EmbedColor] = None, /) -> None:
+        self.global_chat: GlobalChat = global_chat
+        self.server_id: int = global_chat.server_id
+        self.channel_id: int = global_chat.channel_id
+        self.color: discord.Color = discord.Color(DEFAULT_EMBED_COLOR)
+
+        self.set_color(embed_color)
+
+    def __repr__(self) -> str:
+        return f"<GlobalChatRoute server_id={self.server_id} channel_id={self.channel_id} color={self.color}>"
+
+    def set_color(self, embed_color: Optional[EmbedColor], /) -> None:
+        self.color = embed_color.custom_color if embed_color else discord.Color(DEFAULT_EMBED_COLOR)
+
+    @property
+    def webhook(self) -> Optional[Webhook]:
+        return self.global_chat.webhook
+
+    @property
+    def channel(self) -> Optional[TextChannel | discord.DMChannel | Thread]:
+        return self.global_chat.channel
+
+
 class Blacklist:
+    __slots__ = (
+        "_connection",
+        "id",
+        "server_id",
+        "entity_id",
+        "pub",
+        "dev",
+        "private",
+        "raw_blacklist_type",
+        "blacklist_type",
+        "reason",
+        "repeat",
+    )
+
+    # the order of the values from_row takes, and of the cache snapshot.
+    COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "id",
+        "server_id",
+        "entity_id",
+        "pub",
+        "dev",
+        "private",
+        "blacklist_type",
+        "reason",
+        "repeat",
+    )
+
     def __init__(self, connection: DatabaseConnection, data: BlacklistPayload, /) -> None:
         self._connection: DatabaseConnection = connection
 
@@ -102,17 +200,25 @@ class Blacklist:
         self.pub: bool = data["pub"]
         self.dev: bool = data["dev"]
         self.private: bool = data["private"]
-        self.raw_blacklist_type: FilterTypePayload = data["blacklist_type"]
+        # the column is nullable, NULL is the column's default.
+        self.raw_blacklist_type: FilterTypePayload = data["blacklist_type"] or 0
+        self.blacklist_type: FilterType = _FILTER_TYPES[self.raw_blacklist_type]
         self.reason: str = data["reason"]
         self.repeat: bool = data["repeat"]
 
+    @classmethod
+    def from_row(cls, connection: DatabaseConnection, row: Sequence[Any], /) -> Blacklist:
+        """Make a blacklist from the values of :attr:`COLUMNS`, in order."""
+        self = cls.__new__(cls)
+        self._connection = connection
+        self.id, self.server_id, self.entity_id, self.pub, self.dev, self.private, raw, self.reason, self.repeat = row
+        self.raw_blacklist_type = raw or 0
+        self.blacklist_type = _FILTER_TYPES[self.raw_blacklist_type]
+        return self
+
     def __repr__(self) -> str:
         return f"<Blacklist id={self.id} server_id={self.server_id} entity_id={self.entity_id} blacklist_type={self.blacklist_type.name}>"
 
-    @property
-    def blacklist_type(self) -> FilterType:
-        return FilterType(self.raw_blacklist_type)
-
     @property
     def server(self) -> Optional[Guild]:
         """The server that is blacklisting the entity from discord.py cache."""
@@ -135,21 +241,34 @@ class Blacklist:
 
 
 class Whitelist:
+    __slots__ = ("_connection", "id", "entity_id", "raw_whitelist_type", "whitelist_type", "reason")
+
+    # the order of the values from_row takes, and of the cache snapshot.
+    COLUMNS: ClassVar[Tuple[str, ...]] = ("id", "entity_id", "whitelist_type", "reason")
+
     def __init__(self, connection: DatabaseConnection, data: WhitelistPayload, /) -> None:
         self._connection: DatabaseConnection = connection
 
         self.id: int = data["id"]
         self.entity_id: int = data["entity_id"]
-        self.raw_whitelist_type: FilterTypePayload = data["whitelist_type"]
+        # the column is nullable, NULL is the column's default.
+        self.raw_whitelist_type: FilterTypePayload = data["whitelist_type"] or 0
+        self.whitelist_type: FilterType = _FILTER_TYPES[self.raw_whitelist_type]
         self.reason: str = data["reason"]
 
+    @classmethod
+    def from_row(cls, connection: DatabaseConnection, row: Sequence[Any], /) -> Whitelist:
+        """Make a whitelist from the values of :attr:`COLUMNS`, in order."""
+        self = cls.__new__(cls)
+        self._connection = connection
+        self.id, self.entity_id, raw, self.reason = row
+        self.raw_whitelist_type = raw or 0
+        self.whitelist_type = _FILTER_TYPES[self.raw_whitelist_type]
+        return self
+
     def __repr__(self) -> str:
         return f"<Whitelist id={self.id} entity_id={self.entity_id} whitelist_type={self.whitelist_type.name}>"
 
-    @property
-    def whitelist_type(self) -> FilterType:
-        return FilterType(self.raw_whitelist_type)
-
     @property
     def entity(self) -> Optional[Union[Guild, discord.User]]:
         """The entity that is whitelisted from discord.py cache."""
@@ -160,6 +279,26 @@ class Whitelist:
 
 
 class LinkedChannel:
+    __slots__ = (
+        "_connection",
+        "id",
+        "origin_channel_id",
+        "origin_webhook_url",
+        "destination_channel_id",
+        "destination_webhook_url",
+        "_origin_webhook",
+        "_destination_webhook",
+    )
+
+    # the order of the values from_row takes, and of the cache snapshot.
+    COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "id",
+        "origin_channel_id",
+        "origin_webhook_url",
+        "destination_channel_id",
+        "destination_webhook_url",
+    )
+
     def __init__(self, connection: DatabaseConnection, data: LinkedChannelsPayload, /) -> None:
         self._connection: DatabaseConnection = connection
 
@@ -169,8 +308,24 @@ class LinkedChannel:
         self.destination_channel_id: int = data["destination_channel_id"]
         self.destination_webhook_url: Optional[str] = data["destination_webhook_url"]
 
-        self._origin_webhook: Optional[Webhook] = None
-        self._destination_webhook: Optional[Webhook] = None
+        self._origin_webhook: Optional[Webhook] = MISSING
+        self._destination_webhook: Optional[Webhook] = MISSING
+
+    @classmethod
+    def from_row(cls, connection: DatabaseConnection, row: Sequence[Any], /) -> LinkedChannel:
+        """Make a linked channel from the values of :attr:`COLUMNS`, in order."""
+        self = cls.__new__(cls)
+        self._connection = connection
+        (
+            self.id,
+            self.origin_channel_id,
+            self.origin_webhook_url,
+            self.destination_channel_id,
+            self.destination_webhook_url,
+        ) = row
+        self._origin_webhook = MISSING
+        self._destination_webhook = MISSING
+        return self
 
     def __repr__(self) -> str:
         return f"<LinkedChannel id={self.id} origin_channel_id={self.origin_channel_id} destination_channel_id={self.destination_channel_id}>"
@@ -183,34 +338,48 @@ class LinkedChannel:
     def destination_channel(self) -> Optional[TextChannel | discord.DMChannel | Thread]:
         return self._connection.bot.get_channel(self.destination_channel_id)  # type: ignore
 
-    @cached_property
-    def origin_webhook(self) -> Optional[Webhook]:
-        if self.origin_webhook_url is None:
-            return None
+    def _resolve_webhook(self, webhook_url: Optional[str]) -> Optional[Webhook]:
+        return self._connection.bot.get_webhook_from_url(webhook_url) if webhook_url is not None else None
 
-        if not self._origin_webhook:
-            self._origin_webhook = self._connection.bot.get_webhook_from_url(self.origin_webhook_url)
+    @property
+    def origin_webhook(self) -> Optional[Webhook]:
+        if self._origin_webhook is MISSING:
+            self._origin_webhook = self._resolve_webhook(self.origin_webhook_url)
 
         return self._origin_webhook
 
-    @cached_property
+    @property
     def destination_webhook(self) -> Optional[Webhook]:
-        if self.destination_webhook_url is None:
-            return None
-
-        if not self._destination_webhook:
-            self._destination_webhook = self._connection.bot.get_webhook_from_url(self.destination_webhook_url)
+        if self._destination_webhook is MISSING:
+            self._destination_webhook = self._resolve_webhook(self.destination_webhook_url)
 
         return self._destination_webhook
 
 
 class EmbedColor:
+    __slots__ = ("_connection", "server_id", "raw_chat_type", "chat_type", "raw_custom_color", "custom_color")
+
+    # the order of the values from_row takes, and of the cache snapshot.
+    COLUMNS: ClassVar[Tuple[str, ...]] = ("server_id", "chat_type", "custom_color")
+
     def __init__(self, connection: DatabaseConnection, data: EmbedColorsPayload, /) -> None:
         self._connection: DatabaseConnection = connection
 
         self.server_id: int = data["server_id"]
         self.raw_chat_type: ChatTypePayload = data["chat_type"]
+        self.chat_type: ChatType = _CHAT_TYPES[self.raw_chat_type]
         self.raw_custom_color: int = data["custom_color"]
+        self.custom_color: discord.Color = discord.Color(self.raw_custom_color)
+
+    @classmethod
+    def from_row(cls, connection: DatabaseConnection, row: Sequence[Any], /) -> EmbedColor:
+        """Make an embed color from the values of :attr:`COLUMNS`, in order."""
+        self = cls.__new__(cls)
+        self._connection = connection
+        self.server_id, self.raw_chat_type, self.raw_custom_color = row
+        self.chat_type = _CHAT_TYPES[self.raw_chat_type]
+        self.custom_color = discord.Color(self.raw_custom_color)
+        return self
 
     def __repr__(self) -> str:
         return (
@@ -222,25 +391,50 @@ class EmbedColor:
         """The server that is blacklisting the entity from discord.py cache."""
         return self._connection.bot.get_guild(self.server_id)
 
-    @property
-    def chat_type(self) -> ChatType:
-        return ChatType(self.raw_chat_type)
-
-    @property
-    def custom_color(self) -> discord.Color:
-        return discord.Color(self.raw_custom_color)
-
 
 class GlobalChatConfig:
+    __slots__ = (
+        "_connection",
+        "server_id",
+        "webhook_embed",
+        "censor_messages",
+        "censor_links",
+        "censor_invites",
+        "raw_chat_type",
+        "chat_type",
+    )
+
+    # the order of the values from_row takes, and of the cache snapshot.
+    COLUMNS: ClassVar[Tuple[str, ...]] = (
+        "server_id",
+        "webhook_embed",
+        "censor_messages",
+        "censor_links",
+        "censor_invites",
+        "chat_type",
+    )
+
     def __init__(self, connection: DatabaseConnection, data: GlobalChatConfigPayload, /) -> None:
         self._connection: DatabaseConnection = connection
 
         self.server_id: int = data["server_id"]
         self.webhook_embed: bool = data["webhook_embed"]
-        self.censor_messages: bool = data["censor_links"]
+        self.censor_messages: bool = data["censor_messages"]
         self.censor_links: bool = data["censor_links"]
         self.censor_invites: bool = data["censor_invites"]
-        self.raw_chat_type: ChatTypePayload = data["chat_type"]
+        # the column is nullable, NULL is the column's default.
+        self.raw_chat_type: ChatTypePayload = data["chat_type"] or 0
+        self.chat_type: ChatType = _CHAT_TYPES[self.raw_chat_type]
+
+    @classmethod
+    def from_row(cls, connection: DatabaseConnection, row: Sequence[Any], /) -> GlobalChatConfig:
+        """Make a config from the values of :attr:`COLUMNS`, in order."""
+        self = cls.__new__(cls)
+        self._connection = connection
+        self.server_id, self.webhook_embed, self.censor_messages, self.censor_links, self.censor_invites, raw = row
+        self.raw_chat_type = raw or 0
+        self.chat_type = _CHAT_TYPES[self.raw_chat_type]
+        return self
 
     def __repr__(self) -> str:
         return f"<GlobalChatConfig server_id={self.server_id} chat_type={self.raw_chat_type}>"
@@ -250,6 +444,61 @@ class GlobalChatConfig:
         """The server that is blacklisting the entity from discord.py cache."""
         return self._connection.bot.get_guild(self.server_id)
 
+
+class OutboxEntry:
+    """Represents a relayed message waiting to be sent again.
+
+    Attributes
+    ----------
+    id : int
+        The ID of the entry.
+    channel_id : int
+        The ID of the destination channel.
+    webhook_url : Optional[str]
+        The destination's webhook URL. ``None`` if it is sent to the channel directly.
+    payload : Dict[str, Any]
+        What was sent: ``embed``, the origin's ``message_id`` and, for webhooks, ``username``,
+        ``avatar_url`` and ``thread_id``.
+    attempts : int
+        How many times sending it was retried.
+    """
+
+    __slots__ = (
+        "_connection",
+        "id",
+        "channel_id",
+        "webhook_url",
+        "attempts",
+        "next_attempt_at",
+        "last_error",
+        "created_at",
+        "payload",
+    )
+
+    def __init__(self, connection: DatabaseConnection, data: OutboxEntryPayload, /) -> None:
+        self._connection: DatabaseConnection = connection
+
+        self.id: int = data["id"]
+        self.channel_id: int = data["channel_id"]
+        self.webhook_url: Optional[str] = data["webhook_url"]
+        self.attempts: int = data["attempts"]
+        self.next_attempt_at: datetime.datetime = data["next_attempt_at"]
+        self.last_error: Optional[str] = data["last_error"]
+        self.created_at: datetime.datetime = data["created_at"]
+
+        payload = data["payload"]
+        self.payload: Dict[str, Any] = json.loads(payload) if isinstance(payload, str) else payload
+
+    def __repr__(self) -> str:
+        return f"<OutboxEntry id={self.id} channel_id={self.channel_id} attempts={self.attempts}>"
+
+    @property
+    def webhook(self) -> Optional[Webhook]:
+        if self.webhook_url is None:
+            return None
+
+        return self._connection.bot.get_webhook_from_url(self.webhook_url)
+
     @property
-    def chat_type(self) -> ChatType:
-        return ChatType(self.raw_chat_type)
+    def channel(self) -> Optional[TextChannel | discord.DMChannel | Thread]:
+        return self._connection.bot.get_channel(self.channel_id)  # type: ignore
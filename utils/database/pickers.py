@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from utils.autocomplete import MAX_CHOICES, NameIndex
+from utils.extra import FilterType
+
+if TYPE_CHECKING:
+    import discord
+
+    from main import Sincroni
+
+    from .models import Blacklist, GlobalChat
+
+
+class GuildPickers:
+    """The guild names the blacklist and unblacklist commands autocomplete, kept up to date by
+    :class:`DatabaseConnection` for the rows and by the ``Global`` cog for the guilds.
+
+    Which guilds can be picked comes from the cached rows, their names from the bot's guild cache.
+    Guilds the bot is not in are remembered without a name, so they show up again when it joins.
+
+    Attributes
+    ----------
+    global_chats : NameIndex
+        The guilds with a global chat, for blacklisting.
+    blacklisted : Dict[int, NameIndex]
+        ``server_id: NameIndex``, the guilds a server blacklisted, for unblacklisting.
+    """
+
+    def __init__(self, bot: Sincroni) -> None:
+        self.bot: Sincroni = bot
+        self.global_chats: NameIndex = NameIndex()
+        self.blacklisted: Dict[int, NameIndex] = {}
+
+        # server_id: how many global chats it has.
+        self._global_chat_servers: Dict[int, int] = {}
+        # guild_id: {server_id, ...}, the servers that blacklisted a guild.
+        self._blacklisted_by: Dict[int, Set[int]] = {}
+
+    def __repr__(self) -> str:
+        return f"<GuildPickers global_chats={len(self.global_chats)} servers={len(self.blacklisted)}>"
+
+    def _name(self, guild_id: int, /) -> Optional[str]:
+        # scripts that only load the caches have no bot.
+        guild = self.bot.get_guild(guild_id) if self.bot is not None else None
+        return guild.name if guild is not None else None
+
+    # rows, from DatabaseConnection
+
+    def add_global_chat(self, global_chat: GlobalChat, /) -> None:
+        server_id = global_chat.server_id
+        self._global_chat_servers[server_id] = self._global_chat_servers.get(server_id, 0) + 1
+        if server_id not in self.global_chats and (name := self._name(server_id)) is not None:
+            self.global_chats.add(server_id, name)
+
+    def remove_global_chat(self, global_chat: GlobalChat, /) -> None:
+        server_id = global_chat.server_id
+        count = self._global_chat_servers.get(server_id, 0) - 1
+        if count > 0:
+            self._global_chat_servers[server_id] = count
+            return
+
+        self._global_chat_servers.pop(server_id, None)
+        self.global_chats.remove(server_id)
+
+    def clear_global_chats(self) -> None:
+        self._global_chat_servers.clear()
+        self.global_chats.clear()
+
+    def add_blacklist(self, blacklist: Blacklist, /) -> None:
+        if blacklist.raw_blacklist_type != FilterType.server:
+            return
+
+        self._blacklisted_by.setdefault(blacklist.entity_id, set()).add(blacklist.server_id)
+        if (name := self._name(blacklist.entity_id)) is not None:
+            self.blacklisted.setdefault(blacklist.server_id, NameIndex()).add(blacklist.entity_id, name)
+
+    def remove_blacklist(self, blacklist: Blacklist, /) -> None:
+        if blacklist.raw_blacklist_type != FilterType.server:
+            return
+
+        servers = self._blacklisted_by.get(blacklist.entity_id)
+        if servers is not None:
+            servers.discard(blacklist.server_id)
+            if not servers:
+                del self._blacklisted_by[blacklist.entity_id]
+
+        index = self.blacklisted.get(blacklist.server_id)
+        if index is not None:
+            index.remove(blacklist.entity_id)
+            if not index:
+                del self.blacklisted[blacklist.server_id]
+
+    def clear_blacklists(self) -> None:
+        self._blacklisted_by.clear()
+        self.blacklisted.clear()
+
+    # guilds, from the Global cog
+
+    def guild_available(self, guild: discord.Guild, /) -> None:
+        """Add or rename a guild wherever it can be picked, when it is joined, updated or becomes available."""
+        if guild.id in self._global_chat_servers:
+            self.global_chats.add(guild.id, guild.name)
+
+        for server_id in self._blacklisted_by.get(guild.id, ()):
+            self.blacklisted.setdefault(server_id, NameIndex()).add(guild.id, guild.name)
+
+    def guild_removed(self, guild_id: int, /) -> None:
+        """Stop showing a guild the bot left, its rows are kept for when it joins again."""
+        self.global_chats.remove(guild_id)
+
+        for server_id in self._blacklisted_by.get(guild_id, ()):
+            index = self.blacklisted.get(server_id)
+            if index is not None:
+                index.remove(guild_id)
+                if not index:
+                    del self.blacklisted[server_id]
+
+    def refresh(self) -> None:
+        """Look every name up again, once the guilds are cached after connecting."""
+        for guild_id in self._global_chat_servers:
+            if (name := self._name(guild_id)) is not None:
+                self.global_chats.add(guild_id, name)
+
+        for guild_id, servers in self._blacklisted_by.items():
+            if (name := self._name(guild_id)) is None:
+                continue
+            for server_id in servers:
+                self.blacklisted.setdefault(server_id, NameIndex()).add(guild_id, name)
+
+    # queries
+
+    def search_global_chats(
+        self, query: str, /, exclude: Optional[int] = None, limit: int = MAX_CHOICES
+    ) -> List[Tuple[int, str]]:
+        """The guilds with a global chat matching ``query``, except ``exclude``, see :meth:`NameIndex.search`."""
+        return self.global_chats.search(query, limit, exclude=(exclude,) if exclude is not None else None)
+
+    def search_blacklisted(self, server_id: int, query: str, /, limit: int = MAX_CHOICES) -> List[Tuple[int, str]]:
+        """The guilds ``server_id`` blacklisted matching ``query``, see :meth:`NameIndex.search`."""
+        index = self.blacklisted.get(server_id)
+        return index.search(query, limit) if index is not None else []
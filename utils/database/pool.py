@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+
+_log = logging.getLogger(__name__)
+
+# the lookups of DatabaseConnection, prepared on every pool connection when it connects.
+FETCH_GLOBAL_CHAT = "SELECT * FROM SINCRONI_GLOBAL_CHAT WHERE channel_id = $1"
+FETCH_BLACKLIST = "SELECT * FROM SINCRONI_BLACKLIST WHERE server_id = $1 AND entity_id = $2"
+FETCH_WHITELIST = "SELECT * FROM SINCRONI_WHITELIST WHERE entity_id = $1"
+FETCH_LINKED_CHANNEL = "SELECT * FROM SINCRONI_LINKED_CHANNELS WHERE origin_channel_id = $1"
+FETCH_EMBED_COLOR = "SELECT * FROM SINCRONI_EMBED_COLOR WHERE server_id = $1 AND chat_type = $2"
+FETCH_GLOBAL_CHAT_CONFIG = "SELECT * FROM SINCRONI_CONFIG WHERE server_id = $1 AND chat_type = $2"
+
+PREPARED_QUERIES = (
+    FETCH_GLOBAL_CHAT,
+    FETCH_BLACKLIST,
+    FETCH_WHITELIST,
+    FETCH_LINKED_CHANNEL,
+    FETCH_EMBED_COLOR,
+    FETCH_GLOBAL_CHAT_CONFIG,
+)
+
+
+def _env(name: str, convert: type, default: Any) -> Any:
+    value = os.getenv(name)
+    return convert(value) if value else default
+
+
+def pool_options() -> Dict[str, Any]:
+    """The options of ``asyncpg.create_pool`` set in the environment, asyncpg's defaults otherwise."""
+    return {
+        "min_size": _env("DB_POOL_MIN_SIZE", int, 10),
+        "max_size": _env("DB_POOL_MAX_SIZE", int, 10),
+        "statement_cache_size": _env("DB_STATEMENT_CACHE_SIZE", int, 100),
+        "max_inactive_connection_lifetime": _env("DB_MAX_INACTIVE_LIFETIME", float, 300.0),
+        "command_timeout": _env("DB_COMMAND_TIMEOUT", float, None),
+    }
+
+
+class SincroniConnection(asyncpg.Connection):
+    """A pool connection that runs the lookups of :data:`PREPARED_QUERIES` as prepared statements.
+
+    They are prepared by :func:`init_connection` when the pool connects, so the first command
+    after a restart doesn't wait for them to be planned.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared: Dict[str, PreparedStatement] = {}
+
+    async def fetchrow(self, query: str, *args: Any, **kwargs: Any) -> Optional[asyncpg.Record]:
+        statement = self.prepared.get(query)
+        if statement is None or kwargs:
+            return await super().fetchrow(query, *args, **kwargs)
+
+        try:
+            return await statement.fetchrow(*args)
+        except asyncpg.InvalidCachedStatementError:
+            # the table changed since it was prepared, the statement cache plans it again.
+            del self.prepared[query]
+            return await super().fetchrow(query, *args)
+
+
+async def init_connection(connection: SincroniConnection, /) -> None:
+    """Set up a new pool connection: decode JSONB to Python and prepare the lookups."""
+    await connection.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    for query in PREPARED_QUERIES:
+        try:
+            connection.prepared[query] = await connection.prepare(query)
+        except asyncpg.UndefinedTableError:
+            # the tables don't exist before the first migration, those lookups aren't prepared.
+            _log.debug("Not preparing %s, its table doesn't exist", query)
+
+
+def pool_stats(pool: Optional[asyncpg.Pool], /) -> Dict[str, int]:
+    """How many connections the pool has and how many of them are in use."""
+    if pool is None:
+        return {"size": 0, "idle": 0, "in_use": 0, "min_size": 0, "max_size": 0}
+
+    size, idle = pool.get_size(), pool.get_idle_size()
+    return {
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+    }
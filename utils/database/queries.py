@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from utils.histogram import Histogram
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY = 0.5
+# queries past this many distinct ones are counted together, f-strings could otherwise grow it forever.
+MAX_QUERIES = 500
+
+_WHITESPACE = re.compile(r"\s+")
+# not the digits of $1 or of names like INT4.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+\b")
+
+
+def normalize(query: str, /) -> str:
+    """The query on one line, with literal strings and numbers replaced by ``?``."""
+    return _LITERALS.sub("?", _WHITESPACE.sub(" ", query).strip())
+
+
+def row_count(method: str, result: Any, /) -> Optional[int]:
+    """How many rows a query returned or changed, from the result of a ``Connection`` method."""
+    if method == "fetch":
+        return len(result)
+    if method == "fetchrow":
+        return int(result is not None)
+    if method == "execute" and isinstance(result, str):
+        # the status, like "DELETE 3" or "INSERT 0 1".
+        count = result.rpartition(" ")[2]
+        return int(count) if count.isdigit() else None
+    return None
+
+
+class QueryStats:
+    """The timings of a normalised query.
+
+    Attributes
+    ----------
+    query : str
+        The normalised query.
+    acquire : Histogram
+        How long getting a pool connection took, in seconds.
+    execute : Histogram
+        How long the query took once it had a connection, in seconds.
+    rows : int
+        How many rows every call returned or changed, together.
+    errors : int
+        How many calls raised.
+    slow : int
+        How many calls took longer than the slow query threshold.
+    """
+
+    __slots__ = ("query", "acquire", "execute", "rows", "errors", "slow")
+
+    def __init__(self, query: str) -> None:
+        self.query: str = query
+        self.acquire: Histogram = Histogram()
+        self.execute: Histogram = Histogram()
+        self.rows: int = 0
+        self.errors: int = 0
+        self.slow: int = 0
+
+    def __repr__(self) -> str:
+        return f"<QueryStats calls={self.calls} total={self.total:.3f} query={self.query[:50]!r}>"
+
+    @property
+    def calls(self) -> int:
+        return self.execute.count
+
+    @property
+    def total(self) -> float:
+        """Seconds spent in the query, waiting for a connection included."""
+        return self.acquire.sum + self.execute.sum
+
+
+class QueryInstrumentation:
+    """Records the timings of every query ``DatabaseConnection`` runs, by normalised query.
+
+    When disabled, the only cost is checking :attr:`enabled` before every query.
+
+    Parameters
+    ----------
+    enabled : bool
+        Whether or not to record anything.
+    slow_query : float
+        Seconds after which a query is logged as slow.
+    """
+
+    def __init__(self, *, enabled: bool = False, slow_query: float = DEFAULT_SLOW_QUERY) -> None:
+        self.enabled: bool = enabled
+        self.slow_query: float = slow_query
+
+        self._stats: Dict[str, QueryStats] = {}
+        # the raw query strings are constants, normalising each once is enough.
+        self._normalized: Dict[str, str] = {}
+
+    def __repr__(self) -> str:
+        return f"<QueryInstrumentation enabled={self.enabled} queries={len(self._stats)}>"
+
+    def stats(self, query: str, /) -> QueryStats:
+        normalized = self._normalized.get(query)
+        if normalized is None:
+            normalized = normalize(query)
+            if len(self._normalized) < MAX_QUERIES:
+                self._normalized[query] = normalized
+
+        stats = self._stats.get(normalized)
+        if stats is None:
+            if len(self._stats) >= MAX_QUERIES:
+                normalized = "(other queries)"
+                stats = self._stats.get(normalized)
+            if stats is None:
+                stats = self._stats[normalized] = QueryStats(normalized)
+
+        return stats
+
+    def record(
+        self, query: str, acquire: float, execute: float, rows: Optional[int] = None, *, error: bool = False
+    ) -> None:
+        stats = self.stats(query)
+        stats.acquire.observe(acquire)
+        stats.execute.observe(execute)
+
+        if error:
+            stats.errors += 1
+        elif rows is not None:
+            stats.rows += rows
+
+        if acquire + execute >= self.slow_query:
+            stats.slow += 1
+            _log.warning(
+                "Slow query, %.1fms waiting for a connection and %.1fms running: %s",
+                acquire * 1000,
+                execute * 1000,
+                stats.query,
+            )
+
+    def top(self, limit: int = 10, /) -> List[QueryStats]:
+        """The queries that took the most time, together."""
+        return sorted(self._stats.values(), key=lambda stats: stats.total, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        self._stats.clear()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+from .models import Blacklist, EmbedColor, GlobalChat, GlobalChatConfig, LinkedChannel, Whitelist
+
+# bump whenever COLUMNS or the encoding changes, older snapshots are then ignored.
+SNAPSHOT_VERSION = 2
+MAGIC = b"SNCR"
+# magic, version, CRC32 of the body, length of the body.
+HEADER = struct.Struct("<4sHII")
+
+# the columns stored of every cached table, in the order the models' from_row takes them.
+COLUMNS: Dict[str, Sequence[str]] = {
+    "SINCRONI_GLOBAL_CHAT": GlobalChat.COLUMNS,
+    "SINCRONI_BLACKLIST": Blacklist.COLUMNS,
+    "SINCRONI_WHITELIST": Whitelist.COLUMNS,
+    "SINCRONI_LINKED_CHANNELS": LinkedChannel.COLUMNS,
+    "SINCRONI_EMBED_COLOR": EmbedColor.COLUMNS,
+    "SINCRONI_CONFIG": GlobalChatConfig.COLUMNS,
+}
+
+
+class SnapshotError(Exception):
+    """The snapshot file is corrupt, truncated or from another version."""
+
+
+class CacheSnapshot:
+    """The cached rows of every table, saved to disk so a restart doesn't wait for the database.
+
+    The file is a fixed header followed by the zlib compressed JSON of the rows, which are
+    stored as lists in the order of :data:`COLUMNS`.
+
+    Attributes
+    ----------
+    tables : Dict[str, List[Sequence[Any]]]
+        The rows of every table, by table name.
+    watermarks : Dict[str, int]
+        The version of each table in ``SINCRONI_TABLE_VERSIONS`` when it was loaded. A table
+        whose version is still the same has not changed since.
+    written_at : float
+        When the snapshot was taken, as a UNIX timestamp.
+    """
+
+    def __init__(
+        self,
+        tables: Dict[str, List[Sequence[Any]]],
+        watermarks: Dict[str, int],
+        written_at: Optional[float] = None,
+    ) -> None:
+        self.tables: Dict[str, List[Sequence[Any]]] = tables
+        self.watermarks: Dict[str, int] = watermarks
+        self.written_at: float = written_at if written_at is not None else time.time()
+
+    def __repr__(self) -> str:
+        rows = sum(len(rows) for rows in self.tables.values())
+        return f"<CacheSnapshot tables={len(self.tables)} rows={rows} written_at={self.written_at:.0f}>"
+
+    def dump(self) -> bytes:
+        body = zlib.compress(
+            json.dumps(
+                {"written_at": self.written_at, "watermarks": self.watermarks, "tables": self.tables},
+                separators=(",", ":"),
+            ).encode()
+        )
+        return HEADER.pack(MAGIC, SNAPSHOT_VERSION, zlib.crc32(body), len(body)) + body
+
+    @classmethod
+    def load(cls, data: bytes) -> CacheSnapshot:
+        if len(data) < HEADER.size:
+            raise SnapshotError("The snapshot is truncated.")
+
+        magic, version, checksum, length = HEADER.unpack_from(data)
+        body = data[HEADER.size :]
+        if magic != MAGIC:
+            raise SnapshotError("The file is not a cache snapshot.")
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotError(f"The snapshot is version {version}, expected {SNAPSHOT_VERSION}.")
+        if len(body) != length or zlib.crc32(body) != checksum:
+            raise SnapshotError("The snapshot is corrupt.")
+
+        payload = json.loads(zlib.decompress(body))
+        if set(payload["tables"]) != set(COLUMNS):
+            raise SnapshotError("The snapshot does not have every table.")
+
+        return cls(payload["tables"], payload["watermarks"], payload["written_at"])
+
+    def write(self, path: str) -> None:
+        """Write the snapshot, replacing the old one only once the new one is fully on disk."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(self.dump())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def read(cls, path: str) -> Optional[CacheSnapshot]:
+        """Read a snapshot. ``None`` if there is none or it can't be used."""
+        try:
+            with open(path, "rb") as file:
+                return cls.load(file.read())
+        except FileNotFoundError:
+            return None
+        except (SnapshotError, ValueError, KeyError, zlib.error) as err:
+            print(f"Ignoring the cache snapshot at {path}: {err}")
+            return None
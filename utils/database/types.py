@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Literal, Optional, TypedDict
+import datetime
+from typing import Any, Dict, Literal, Optional, TypedDict
 
 ChatType = Literal[0, 1, 2, 3]
 FilterType = Literal[0, 1]
@@ -53,3 +54,22 @@ class GlobalChatConfig(TypedDict):
     censor_links: bool  # BOOLEAN, DEFAULT FALSE
     censor_invites: bool  # BOOLEAN, DEFAULT FALSE
     chat_type: ChatType  # SMALLINT, DEFAULT 0, NOT NULL
+
+
+class OutboxEntry(TypedDict):
+    id: int  # BIGSERIAL, PRIMARY KEY
+    channel_id: int  # BIGINT, NOT NULL
+    webhook_url: Optional[str]  # TEXT, NULL
+    payload: Dict[str, Any]  # JSONB, NOT NULL
+    attempts: int  # SMALLINT, DEFAULT 0, NOT NULL
+    next_attempt_at: datetime.datetime  # TIMESTAMPTZ, DEFAULT NOW(), NOT NULL
+    last_error: Optional[str]  # TEXT, NULL
+    created_at: datetime.datetime  # TIMESTAMPTZ, DEFAULT NOW(), NOT NULL
+
+
+class RelayedMessage(TypedDict):
+    origin_message_id: int  # BIGINT, NOT NULL
+    channel_id: int  # BIGINT, NOT NULL
+    message_id: int  # BIGINT, NOT NULL
+    webhook_id: Optional[int]  # BIGINT, NULL
+    created_at: datetime.datetime  # TIMESTAMPTZ, DEFAULT NOW(), NOT NULL
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+import traceback
+from typing import Awaitable, Callable, Generic, Iterable, List, Optional, TypeVar
+
+import discord
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY = 25
+
+
+class DeliveryResult(Generic[T]):
+    """The outcome of relaying a message to a single destination.
+
+    Attributes
+    ----------
+    destination : T
+        The destination the message was relayed to.
+    delivered : bool
+        Whether or not the message was sent. ``False`` if it was skipped or failed.
+    error : Optional[Exception]
+        The exception raised while sending. ``None`` if there was no error.
+    latency : float
+        Seconds between the start of the fan-out and this destination finishing.
+    """
+
+    def __init__(self, destination: T, /) -> None:
+        self.destination: T = destination
+        self.delivered: bool = False
+        self.error: Optional[Exception] = None
+        self.latency: float = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<DeliveryResult destination={self.destination!r} delivered={self.delivered} latency={self.latency:.3f}>"
+        )
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+class FanOut:
+    """Delivers a relayed message to many destinations concurrently.
+
+    At most ``concurrency`` sends are in flight at once so a large global chat
+    doesn't open hundreds of requests in one go.
+
+    Parameters
+    ----------
+    concurrency : Optional[int]
+        The maximum amount of destinations being sent to at the same time.
+        ``None`` for no limit, for when the sends already go through a
+        :class:`~utils.scheduler.DeliveryScheduler` which limits them itself.
+    """
+
+    def __init__(self, concurrency: Optional[int] = DEFAULT_CONCURRENCY) -> None:
+        self.concurrency: Optional[int] = max(1, concurrency) if concurrency is not None else None
+
+    def __repr__(self) -> str:
+        return f"<FanOut concurrency={self.concurrency}>"
+
+    async def run(
+        self,
+        destinations: Iterable[T],
+        deliver: Callable[[T], Awaitable[bool]],
+    ) -> List[DeliveryResult[T]]:
+        """Run ``deliver`` for every destination.
+
+        ``deliver`` should return whether or not it sent the message and handle its own
+        errors. Whatever it raises is stored on the result instead of cancelling the other
+        destinations, errors that are not ``discord.HTTPException`` are printed as well.
+
+        Parameters
+        ----------
+        destinations : Iterable[T]
+            The destinations to deliver to.
+        deliver : Callable[[T], Awaitable[bool]]
+            The coroutine function that delivers to a single destination.
+
+        Returns
+        -------
+        List[DeliveryResult[T]]
+            One result per destination, in the same order as ``destinations``.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency) if self.concurrency else contextlib.nullcontext()
+        start = time.perf_counter()
+
+        async def worker(destination: T) -> DeliveryResult[T]:
+            result = DeliveryResult(destination)
+            async with semaphore:  # type: ignore # nullcontext supports async with
+                try:
+                    result.delivered = bool(await deliver(destination))
+                except Exception as err:
+                    result.error = err
+                    if not isinstance(err, discord.HTTPException):
+                        traceback.print_exception(type(err), err, err.__traceback__)
+
+            result.latency = time.perf_counter() - start
+            return result
+
+        return list(await asyncio.gather(*[worker(destination) for destination in destinations]))
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional, Union
+
+import discord
+from discord.ext import commands
+
+from .tracing import NULL_TRACE
+
+if TYPE_CHECKING:
+    from main import Sincroni
+
+    from .tracing import Trace, _NullTrace
+
+SUPPORTED_MESSAGE_TYPES = (
+    discord.MessageType.default,
+    discord.MessageType.reply,
+)
+
+# messages sent before the caches are loaded wait this many seconds for them at most, and only
+# this many at once, so a database that is down doesn't pile up tasks.
+DEFAULT_WARM_UP_TIMEOUT = 30.0
+DEFAULT_MAX_WAITING = 1000
+
+
+class PreparedMessage:
+    """A message in a routed channel, shared by every consumer of :class:`MessageDispatcher`.
+
+    The cleaned and censored content are worked out once, by whichever consumer asks first.
+
+    Attributes
+    ----------
+    message : discord.Message
+        The message that was sent.
+    context : commands.Context
+        The context of the message, it is never a valid command.
+    trace : Union[Trace, _NullTrace]
+        The stages of relaying it, consumers time theirs with ``with prepared.trace.span(...)``.
+    """
+
+    def __init__(
+        self,
+        bot: Sincroni,
+        message: discord.Message,
+        context: commands.Context,
+        /,
+        trace: Union[Trace, _NullTrace] = NULL_TRACE,
+    ) -> None:
+        self.bot: Sincroni = bot
+        self.message: discord.Message = message
+        self.context: commands.Context = context
+        self.trace: Union[Trace, _NullTrace] = trace
+
+        self._clean_content: Optional[asyncio.Task[str]] = None
+        self._censored_content: Optional[asyncio.Task[str]] = None
+
+    def __repr__(self) -> str:
+        return f"<PreparedMessage message_id={self.message.id} channel_id={self.message.channel.id}>"
+
+    async def _clean(self) -> str:
+        return await commands.clean_content().convert(self.context, self.message.content)
+
+    async def _censor(self) -> str:
+        return await self.bot.censor_executor.censor(await self.clean_content())
+
+    async def clean_content(self) -> str:
+        """The content with mentions escaped, see ``commands.clean_content``."""
+        if self._clean_content is None:
+            self._clean_content = asyncio.ensure_future(self._clean())
+        return await asyncio.shield(self._clean_content)
+
+    async def censored_content(self) -> str:
+        """The cleaned content with swear words censored and links and invites redacted."""
+        if self._censored_content is None:
+            self._censored_content = asyncio.ensure_future(self._censor())
+        return await asyncio.shield(self._censored_content)
+
+
+Consumer = Callable[[PreparedMessage], Awaitable[object]]
+
+
+class MessageDispatcher:
+    """The single ``on_message`` listener for relaying.
+
+    Messages in channels that are not a global chat or the origin of a linked channel are dropped
+    with one lookup. Otherwise the context is made once and the same :class:`PreparedMessage`
+    is given to every consumer.
+
+    Until the caches are loaded, messages wait for them for up to ``warm_up_timeout`` seconds.
+    Those that arrive while ``max_waiting`` already wait, or that wait longer, are dropped.
+    """
+
+    def __init__(
+        self,
+        bot: Sincroni,
+        *,
+        warm_up_timeout: float = DEFAULT_WARM_UP_TIMEOUT,
+        max_waiting: int = DEFAULT_MAX_WAITING,
+    ) -> None:
+        self.bot: Sincroni = bot
+        self.warm_up_timeout: float = warm_up_timeout
+        self.max_waiting: int = max_waiting
+        self.waiting: int = 0
+        self._consumers: List[Consumer] = []
+
+    def __repr__(self) -> str:
+        return f"<MessageDispatcher consumers={len(self._consumers)} waiting={self.waiting}>"
+
+    def add_consumer(self, consumer: Consumer, /) -> None:
+        if consumer not in self._consumers:
+            self._consumers.append(consumer)
+
+    def remove_consumer(self, consumer: Consumer, /) -> None:
+        if consumer in self._consumers:
+            self._consumers.remove(consumer)
+
+    @staticmethod
+    def can_relay(message: discord.Message, /) -> bool:
+        """Whether a message could be relayed at all, without the caches."""
+        return bool(
+            message.guild and message.content and not message.author.bot and message.type in SUPPORTED_MESSAGE_TYPES
+        )
+
+    async def prepare(self, message: discord.Message, /) -> Optional[PreparedMessage]:
+        """Make the :class:`PreparedMessage` of a message. ``None`` if it should not be relayed."""
+        if not self.bot.db.is_routed_channel(message.channel.id) or not self.can_relay(message):
+            return None
+
+        trace = self.bot.tracer.new_trace(
+            "relay message", message_id=message.id, channel_id=message.channel.id, guild_id=message.guild.id
+        )
+        with trace.span("get_context"):
+            ctx = await self.bot.get_context(message)
+        if ctx.valid:
+            return None
+
+        return PreparedMessage(self.bot, message, ctx, trace)
+
+    async def _run_consumer(self, consumer: Consumer, prepared: PreparedMessage) -> None:
+        try:
+            # gather runs every consumer in its own task, so their stages are nested in this span.
+            with prepared.trace.span(getattr(consumer, "__name__", "consumer")):
+                await consumer(prepared)
+        except Exception:
+            await self.bot.on_error("on_message", prepared.message)
+
+    async def _wait_for_caches(self) -> bool:
+        # the caches decide where a message goes, so wait until they are loaded.
+        if self.waiting >= self.max_waiting:
+            self.bot.metrics.dropped.inc("warm_up_backlog")
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.bot.db.warmed_up.wait(), self.warm_up_timeout)
+        except asyncio.TimeoutError:
+            self.bot.metrics.dropped.inc("warm_up_timeout")
+            return False
+        finally:
+            self.waiting -= 1
+
+        return True
+
+    async def dispatch(self, message: discord.Message) -> None:
+        if not self.bot.db.warmed_up.is_set():
+            # bots, DMs and the like would be dropped anyway, they don't wait or count as dropped.
+            if not self.can_relay(message) or not await self._wait_for_caches():
+                return
+
+        prepared = await self.prepare(message)
+        if prepared is None:
+            return
+
+        await asyncio.gather(*[self._run_consumer(consumer, prepared) for consumer in self._consumers])
+        self.bot.tracer.finish(prepared.trace)
@@ -25,6 +25,9 @@ class FilterType(enum.IntEnum):
     server = 1
 
 
+DEFAULT_EMBED_COLOR = 0xEB6D15
+
+
 rules = """
 1. No advertising is allowed in the global chat. 
 2. Please refrain from sharing NSFW content in the global chat.
@@ -164,22 +167,9 @@ def generate_color_block(color_int: int) -> discord.File:
     return discord.File(buffer, filename="color.png")
 
 
-def blacklist_lookup(bot: Sincroni, chat_type: ChatType, guild_id: int):
-    match chat_type:
-        case chat_type.public:
-            attribute = "pub"
-
-        case chat_type.developer:
-            attribute = "dev"
+def blacklist_lookup(bot: Sincroni, chat_type: ChatType, guild_id: int) -> list[int]:
+    """The servers a guild blacklisted in a chat type.
 
-        case _:
-            attribute = chat_type.name
-
-    return [
-        record.entity_id
-        for record in bot.db.blacklists
-        if not record._global
-        and record.blacklist_type.server
-        and record.server_id == guild_id
-        and getattr(record, attribute)
-    ]
+    Prefer ``bot.db.blacklist_index`` directly, this is kept for existing callers.
+    """
+    return list(bot.db.blacklist_index.blacklisted_servers(guild_id, chat_type))
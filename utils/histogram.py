@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import List, Sequence
+
+# upper bounds in seconds, from half a millisecond to ten seconds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Counts observations in fixed buckets, like a Prometheus histogram.
+
+    Recording an observation is a binary search and two additions, so it can stay on for
+    every query or message. Quantiles are estimated from the buckets.
+
+    Parameters
+    ----------
+    buckets : Sequence[float]
+        The upper bound of every bucket, in increasing order. Larger values go in an overflow bucket.
+
+    Attributes
+    ----------
+    counts : List[int]
+        How many observations fell in each bucket, the last one is the overflow bucket.
+    count : int
+        How many observations there were.
+    sum : float
+        The sum of every observation.
+    max : float
+        The largest observation.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets: Sequence[float] = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<Histogram count={self.count} mean={self.mean:.4f} max={self.max:.4f}>"
+
+    def observe(self, value: float, /) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, fraction: float, /) -> float:
+        """Estimate a quantile, interpolating linearly inside the bucket it falls in."""
+        if not self.count:
+            return 0.0
+
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+
+        return self.max
+
+    def cumulative(self) -> List[int]:
+        """The counts of the buckets summed up, as Prometheus expects them."""
+        total = 0
+        counts = []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from aiohttp import web
+
+from .histogram import DEFAULT_BUCKETS, Histogram
+
+if TYPE_CHECKING:
+    from main import Sincroni
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# how many destinations a message was relayed to.
+FAN_OUT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+# how late the event loop ran a callback, in seconds.
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """A value that only goes up, by label values.
+
+    Incrementing is a dict lookup and an addition, cheap enough for every relayed message.
+    """
+
+    __slots__ = ("name", "description", "label_names", "values")
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()) -> None:
+        self.name: str = name
+        self.description: str = description
+        self.label_names: Sequence[str] = label_names
+        self.values: Dict[Labels, float] = {}
+
+    def __repr__(self) -> str:
+        return f"<Counter name={self.name} series={len(self.values)}>"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class LabeledHistogram:
+    """A :class:`~utils.histogram.Histogram` for every combination of label values."""
+
+    __slots__ = ("name", "description", "label_names", "buckets", "histograms")
+
+    def __init__(
+        self, name: str, description: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> None:
+        self.name: str = name
+        self.description: str = description
+        self.label_names: Sequence[str] = label_names
+        self.buckets: Sequence[float] = buckets
+        self.histograms: Dict[Labels, Histogram] = {}
+
+    def __repr__(self) -> str:
+        return f"<LabeledHistogram name={self.name} series={len(self.histograms)}>"
+
+    def observe(self, value: float, *labels: str) -> None:
+        histogram = self.histograms.get(labels)
+        if histogram is None:
+            histogram = self.histograms[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, histogram in self.histograms.items():
+            bounds = [*histogram.buckets, float("inf")]
+            for bound, count in zip(bounds, histogram.cumulative()):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {count}")
+            suffix = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(histogram.sum)}")
+            lines.append(f"{self.name}_count{suffix} {histogram.count}")
+        return lines
+
+
+class Gauge:
+    """A value read when scraped, from a callback returning it by label values or on its own."""
+
+    __slots__ = ("name", "description", "label_names", "callback")
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        callback: Callable[[], Union[float, Dict[Labels, float]]],
+        label_names: Sequence[str] = (),
+    ) -> None:
+        self.name: str = name
+        self.description: str = description
+        self.label_names: Sequence[str] = label_names
+        self.callback: Callable[[], Union[float, Dict[Labels, float]]] = callback
+
+    def __repr__(self) -> str:
+        return f"<Gauge name={self.name}>"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge"]
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Metrics:
+    """The metrics of the relay pipeline, rendered in the Prometheus text format.
+
+    The counters and histograms are always recorded, serving them is up to :class:`MetricsServer`.
+
+    Parameters
+    ----------
+    bot : Sincroni
+        The bot, whose caches and pool are read when scraped.
+    """
+
+    def __init__(self, bot: Sincroni) -> None:
+        self.bot: Sincroni = bot
+
+        self.relays: Counter = Counter("sincroni_relays_total", "Messages relayed, by chat type.", ("chat_type",))
+        self.fan_out: LabeledHistogram = LabeledHistogram(
+            "sincroni_fan_out_destinations", "Destinations a message was relayed to.", ("chat_type",), FAN_OUT_BUCKETS
+        )
+        self.delivery_latency: LabeledHistogram = LabeledHistogram(
+            "sincroni_delivery_seconds", "Seconds until a destination was sent to, by chat type.", ("chat_type",)
+        )
+        self.delivery_failures: Counter = Counter(
+            "sincroni_delivery_failures_total",
+            "Destinations that failed, by chat type and error.",
+            ("chat_type", "error"),
+        )
+        self.delivery_skipped: Counter = Counter(
+            "sincroni_delivery_skipped_total", "Destinations skipped without an error, by chat type.", ("chat_type",)
+        )
+        self.dropped: Counter = Counter(
+            "sincroni_messages_dropped_total",
+            "Messages dropped before they were relayed, and relayed copies before they were stored, by reason.",
+            ("reason",),
+        )
+        self.errors: Counter = Counter(
+            "sincroni_event_errors_total", "Errors raised by event handlers, by event.", ("event",)
+        )
+        self.loop_lag: LabeledHistogram = LabeledHistogram(
+            "sincroni_event_loop_lag_seconds", "How late the event loop ran.", (), LOOP_LAG_BUCKETS
+        )
+
+        self._metrics: List[Union[Counter, LabeledHistogram, Gauge]] = [
+            self.relays,
+            self.fan_out,
+            self.delivery_latency,
+            self.delivery_failures,
+            self.delivery_skipped,
+            self.dropped,
+            self.errors,
+            self.loop_lag,
+            Gauge(
+                "sincroni_cache_entries",
+                "Entries of each DatabaseConnection cache.",
+                lambda: {(name,): size for name, size in self.bot.db.cache_sizes.items()},
+                ("cache",),
+            ),
+            Gauge(
+                "sincroni_db_pool_connections",
+                "Database pool connections, by state.",
+                lambda: {(state,): self.bot.db.pool_stats[state] for state in ("in_use", "idle")},
+                ("state",),
+            ),
+            Gauge("sincroni_db_pool_max_connections", "Most connections the pool opens.", self._pool_max_size),
+        ]
+
+    def __repr__(self) -> str:
+        return f"<Metrics metrics={len(self._metrics)}>"
+
+    def _pool_max_size(self) -> float:
+        return self.bot.db.pool_stats["max_size"]
+
+    def record_relay(self, chat_type: str, results: Sequence) -> None:
+        """Record a fan-out, ``results`` being its :class:`~utils.delivery.DeliveryResult` list."""
+        self.relays.inc(chat_type)
+        self.fan_out.observe(len(results), chat_type)
+        for result in results:
+            if result.failed:
+                self.delivery_failures.inc(chat_type, type(result.error).__name__)
+            elif result.delivered:
+                self.delivery_latency.observe(result.latency, chat_type)
+            else:
+                self.delivery_skipped.inc(chat_type)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves :class:`Metrics` at ``/metrics`` and measures how late the event loop runs.
+
+    Parameters
+    ----------
+    metrics : Metrics
+        What to serve.
+    host : str
+        Where to listen, only locally by default.
+    port : int
+        The port to listen on, ``0`` for any free one.
+    lag_interval : float
+        Seconds between event loop lag measurements.
+    """
+
+    def __init__(
+        self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9100, *, lag_interval: float = 0.5
+    ) -> None:
+        self.metrics: Metrics = metrics
+        self.host: str = host
+        self.port: int = port
+        self.lag_interval: float = lag_interval
+
+        self._runner: Optional[web.AppRunner] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"<MetricsServer host={self.host} port={self.port} running={self._runner is not None}>"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+        # the port that was picked when given 0.
+        if self.port == 0 and self._runner.addresses:
+            self.port = self._runner.addresses[0][1]
+
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            self.metrics.loop_lag.observe(max(0.0, time.perf_counter() - start - self.lag_interval))
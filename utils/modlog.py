@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import traceback
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterator, List, Optional
+
+import discord
+
+if TYPE_CHECKING:
+    from main import Sincroni
+
+# discord allows up to 10 embeds per message, with up to 6000 characters between them.
+MAX_EMBEDS = 10
+MAX_EMBED_CHARACTERS = 6000
+
+
+class ModLogEntry:
+    """An embed waiting to be sent to the mod log.
+
+    Attributes
+    ----------
+    embed : discord.Embed
+        The embed to send.
+    on_failure : Optional[Callable[[], Awaitable[object]]]
+        Called instead of the ``MOD_CHANNEL`` fallback if the mod webhook fails.
+    """
+
+    def __init__(self, embed: discord.Embed, on_failure: Optional[Callable[[], Awaitable[object]]] = None) -> None:
+        self.embed: discord.Embed = embed
+        self.on_failure: Optional[Callable[[], Awaitable[object]]] = on_failure
+
+
+def batches(entries: List[ModLogEntry]) -> Iterator[List[ModLogEntry]]:
+    """Split entries, in order, into batches that fit in one message."""
+    batch: List[ModLogEntry] = []
+    characters = 0
+    for entry in entries:
+        size = len(entry.embed)
+        if batch and (len(batch) == MAX_EMBEDS or characters + size > MAX_EMBED_CHARACTERS):
+            yield batch
+            batch, characters = [], 0
+
+        batch.append(entry)
+        characters += size
+
+    if batch:
+        yield batch
+
+
+class ModLog:
+    """Sends mod log embeds in the background, up to 10 per webhook message.
+
+    A batch is sent once it has 10 embeds or 6000 characters, or ``interval`` seconds after
+    its first embed, whichever comes first. If the webhook fails, the embeds are sent to ``MOD_CHANNEL`` instead.
+
+    Parameters
+    ----------
+    bot : Sincroni
+        The bot, used for the ``MOD_CHANNEL`` fallback.
+    webhook : Optional[discord.Webhook]
+        The mod webhook. ``None`` to drop every embed, like before there was a mod webhook.
+    interval : float
+        The longest an embed waits for others to be batched with.
+    """
+
+    def __init__(self, bot: Sincroni, webhook: Optional[discord.Webhook], *, interval: float = 2.0) -> None:
+        self.bot: Sincroni = bot
+        self.webhook: Optional[discord.Webhook] = webhook
+        self.interval: float = interval
+
+        self._queue: asyncio.Queue[ModLogEntry] = asyncio.Queue()
+        # taken off the queue but not sent yet, sent by close if the task is cancelled.
+        self._pending: List[ModLogEntry] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"<ModLog pending={self._queue.qsize() + len(self._pending)} interval={self.interval}>"
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the background task and send whatever is still waiting."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        entries, self._pending = self._pending, []
+        while not self._queue.empty():
+            entries.append(self._queue.get_nowait())
+
+        for batch in batches(entries):
+            await self.flush(batch)
+
+    def log(self, embed: discord.Embed, *, on_failure: Optional[Callable[[], Awaitable[object]]] = None) -> None:
+        """Queue an embed for the mod log without waiting for it to be sent."""
+        if self.webhook is None:
+            return
+
+        self._queue.put_nowait(ModLogEntry(embed, on_failure))
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._pending.append(await self._queue.get())
+            deadline = time.monotonic() + self.interval
+
+            while (
+                len(self._pending) < MAX_EMBEDS
+                and sum(len(entry.embed) for entry in self._pending) < MAX_EMBED_CHARACTERS
+            ):
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+
+            # whatever doesn't fit starts the next batch.
+            entries = next(batches(self._pending))
+            del self._pending[: len(entries)]
+
+            try:
+                await self.flush(entries)
+            except asyncio.CancelledError:
+                # sent again by close, a duplicate in the mod log is better than a lost one.
+                self._pending[:0] = entries
+                raise
+            except Exception as err:
+                # keep the pipeline running for the next batch.
+                traceback.print_exception(type(err), err, err.__traceback__)
+
+    async def flush(self, entries: List[ModLogEntry]) -> None:
+        if not entries or self.webhook is None:
+            return
+
+        try:
+            await self.webhook.send(
+                username="Sincroni Mod Log",
+                embeds=[entry.embed for entry in entries],
+                avatar_url=self.bot.user.display_avatar.url if self.bot.user else None,  # type: ignore
+            )
+            return
+        except (discord.HTTPException, discord.Forbidden):
+            # Handle invalid mod webhook
+            pass
+
+        for entry in entries:
+            if entry.on_failure:
+                try:
+                    await entry.on_failure()
+                except (discord.HTTPException, discord.Forbidden):
+                    pass
+
+        embeds = [entry.embed for entry in entries if not entry.on_failure]
+        if not embeds:
+            return
+
+        mod_channel = (
+            self.bot.get_channel(int(mod_channel_id)) if (mod_channel_id := os.getenv("MOD_CHANNEL")) else None
+        )
+        if not mod_channel:
+            return print("Failed to send message to mod channel and did not have a mod channel to send to.")
+
+        await mod_channel.send("Error: messages were sent but the mod webhook is invalid.", embeds=embeds)  # type: ignore
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+import traceback
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+import discord
+
+if TYPE_CHECKING:
+    from main import Sincroni
+    from utils.database.models import OutboxEntry
+
+# an entry is dropped after this many retries, about a day with the default delays.
+MAX_ATTEMPTS = 12
+BASE_DELAY = 5.0
+MAX_DELAY = 4 * 60 * 60
+# entries waiting in memory for the database, the oldest are dropped past it.
+DEFAULT_MAX_BUFFERED = 10_000
+
+# sends an entry like a first delivery, returns False if its destination is skipped for now.
+Resender = Callable[["OutboxEntry"], Awaitable[bool]]
+
+
+def backoff(attempts: int) -> float:
+    """Seconds to wait before the next retry, exponential with full jitter."""
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2**attempts))
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether sending again later could work. Missing channels and permissions won't fix themselves."""
+    if isinstance(error, (discord.NotFound, discord.Forbidden)):
+        return False
+
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, OSError))
+
+
+class DeliveryOutbox:
+    """Keeps relayed messages that could not be sent in ``SINCRONI_OUTBOX`` and retries them.
+
+    New entries are buffered and inserted together every ``flush_interval`` seconds. While the
+    database is down, at most ``max_buffered`` are kept and the oldest are dropped.
+    Due entries are claimed ``batch_size`` at a time, sent by the resender and then removed or
+    rescheduled with one query each. The global chat cog sets the resender, so retries go through
+    the same circuit breakers and relay store as first deliveries. Nothing is retried without one.
+
+    Parameters
+    ----------
+    bot : Sincroni
+        The bot, used for the database.
+    flush_interval : float
+        How often buffered entries are inserted.
+    poll_interval : float
+        How often due entries are looked for.
+    batch_size : int
+        The most entries retried at once.
+    max_buffered : int
+        The most entries kept in memory until they are inserted.
+    """
+
+    def __init__(
+        self,
+        bot: Sincroni,
+        *,
+        flush_interval: float = 1.0,
+        poll_interval: float = 5.0,
+        batch_size: int = 100,
+        max_buffered: int = DEFAULT_MAX_BUFFERED,
+    ) -> None:
+        self.bot: Sincroni = bot
+        self.flush_interval: float = flush_interval
+        self.poll_interval: float = poll_interval
+        self.batch_size: int = batch_size
+        self.max_buffered: int = max_buffered
+
+        self._buffer: List[Tuple[int, Optional[str], Dict[str, Any], Optional[str]]] = []
+        self._resender: Optional[Resender] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"<DeliveryOutbox buffered={len(self._buffer)} batch_size={self.batch_size}>"
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop retrying and insert whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if not self.bot.db.connected:
+            return
+
+        try:
+            await self.flush()
+        except Exception as err:
+            # the rest of the shutdown still has to run.
+            traceback.print_exception(type(err), err, err.__traceback__)
+            print(f"Dropping {len(self._buffer)} relayed messages, the database could not be reached.")
+
+    def set_resender(self, resender: Optional[Resender], /) -> None:
+        self._resender = resender
+
+    def add(
+        self,
+        channel_id: int,
+        webhook_url: Optional[str],
+        payload: Dict[str, Any],
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Buffer a message to be sent again later.
+
+        Parameters
+        ----------
+        channel_id : int
+            The ID of the destination channel.
+        webhook_url : Optional[str]
+            The destination's webhook URL. ``None`` to send to the channel directly.
+        payload : Dict[str, Any]
+            ``embed`` as a dict, the origin's ``message_id`` and, for webhooks, ``username``,
+            ``avatar_url`` and ``thread_id``.
+        error : Optional[BaseException]
+            Why it was not sent.
+        """
+        self._buffer.append((channel_id, webhook_url, payload, repr(error) if error else None))
+        self._trim()
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.bot.metrics.dropped.inc("outbox_overflow", amount=overflow)
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+
+        entries, self._buffer = self._buffer, []
+        try:
+            await self.bot.db.add_outbox_entries(entries)
+        except Exception:
+            # keep them for the next flush.
+            self._buffer[:0] = entries
+            self._trim()
+            raise
+
+    async def _run(self) -> None:
+        next_poll = 0.0
+        while True:
+            try:
+                if not self.bot.db.connected:
+                    # the database is still being connected to.
+                    await asyncio.sleep(self.flush_interval)
+                    continue
+
+                await self.flush()
+
+                # channels are looked up in the cache, which is empty until the bot is ready.
+                if self._resender is not None and self.bot.is_ready() and time.monotonic() >= next_poll:
+                    # a full batch means more are probably due, so don't wait for the next poll.
+                    if await self.retry_due() < self.batch_size:
+                        next_poll = time.monotonic() + self.poll_interval
+            except Exception as err:
+                traceback.print_exception(type(err), err, err.__traceback__)
+
+            await asyncio.sleep(self.flush_interval)
+
+    async def retry_due(self) -> int:
+        """Send the due entries once. Returns how many were claimed."""
+        resender = self._resender
+        if resender is None:
+            return 0
+
+        # long enough for the whole batch to go through rate limits before they are claimed again.
+        entries = await self.bot.db.claim_outbox_entries(self.batch_size, max(60.0, self.batch_size * 2.0))
+        if not entries:
+            return 0
+
+        results = await asyncio.gather(*[resender(entry) for entry in entries], return_exceptions=True)
+
+        done: List[int] = []
+        retry: List[Tuple[int, float, Optional[str]]] = []
+        for entry, result in zip(entries, results):
+            if result is True:
+                done.append(entry.id)
+            elif isinstance(result, asyncio.CancelledError):
+                # the bot is closing, its lease runs out and it is claimed again after the restart.
+                continue
+            elif (result is not False and not is_transient(result)) or entry.attempts + 1 >= MAX_ATTEMPTS:
+                print(f"Dropping relayed message for channel {entry.channel_id} after {entry.attempts + 1} tries.")
+                done.append(entry.id)
+            else:
+                # False while a circuit breaker skips the destination.
+                error = "destination skipped" if result is False else repr(result)
+                retry.append((entry.id, backoff(entry.attempts + 1), error))
+
+        await self.bot.db.remove_outbox_entries(done)
+        await self.bot.db.reschedule_outbox_entries(retry)
+        return len(entries)
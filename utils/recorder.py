@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+import traceback
+from typing import TYPE_CHECKING, BinaryIO, Iterator, List, Optional
+
+import discord
+
+if TYPE_CHECKING:
+    from main import Sincroni
+
+    from .dispatch import PreparedMessage
+
+# bump whenever EVENT changes, older recordings are then refused.
+RECORDING_VERSION = 1
+MAGIC = b"SNCT"
+# magic and version, written once at the start of the file.
+HEADER = struct.Struct("<4sH")
+# created at (UNIX seconds), channel ID, chat type, content length, user, role and channel mentions, flags.
+EVENT = struct.Struct("<dQBIHHHB")
+
+FLAG_MENTION_EVERYONE = 1 << 0
+FLAG_REPLY = 1 << 1
+
+# events are kept in memory for this long before they are appended to the file.
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+class RecordingError(Exception):
+    """The file is not a traffic recording or is from another version."""
+
+
+class RelayEvent:
+    """A message sent in a global chat, without its content or author.
+
+    Attributes
+    ----------
+    created_at : float
+        When it was sent, as a UNIX timestamp.
+    channel_id : int
+        The global chat it was sent in.
+    chat_type : int
+        The raw chat type of the global chat.
+    length : int
+        How many characters the content had.
+    user_mentions : int
+        How many users it mentioned.
+    role_mentions : int
+        How many roles it mentioned.
+    channel_mentions : int
+        How many channels it mentioned.
+    flags : int
+        :data:`FLAG_MENTION_EVERYONE` and :data:`FLAG_REPLY`.
+    """
+
+    __slots__ = (
+        "created_at",
+        "channel_id",
+        "chat_type",
+        "length",
+        "user_mentions",
+        "role_mentions",
+        "channel_mentions",
+        "flags",
+    )
+
+    def __init__(
+        self,
+        created_at: float,
+        channel_id: int,
+        chat_type: int,
+        length: int,
+        user_mentions: int = 0,
+        role_mentions: int = 0,
+        channel_mentions: int = 0,
+        flags: int = 0,
+    ) -> None:
+        self.created_at: float = created_at
+        self.channel_id: int = channel_id
+        self.chat_type: int = chat_type
+        self.length: int = length
+        self.user_mentions: int = user_mentions
+        self.role_mentions: int = role_mentions
+        self.channel_mentions: int = channel_mentions
+        self.flags: int = flags
+
+    def __repr__(self) -> str:
+        return f"<RelayEvent channel_id={self.channel_id} chat_type={self.chat_type} length={self.length}>"
+
+    @classmethod
+    def from_message(cls, message: discord.Message, chat_type: int, /) -> RelayEvent:
+        flags = 0
+        if message.mention_everyone:
+            flags |= FLAG_MENTION_EVERYONE
+        if message.type is discord.MessageType.reply:
+            flags |= FLAG_REPLY
+
+        return cls(
+            message.created_at.timestamp(),
+            message.channel.id,
+            chat_type,
+            len(message.content),
+            len(message.raw_mentions),
+            len(message.raw_role_mentions),
+            len(message.raw_channel_mentions),
+            flags,
+        )
+
+    def pack(self) -> bytes:
+        # counts past what the fields hold are saturated, they would not change the shape of the traffic.
+        return EVENT.pack(
+            self.created_at,
+            self.channel_id,
+            self.chat_type,
+            min(self.length, 0xFFFFFFFF),
+            min(self.user_mentions, 0xFFFF),
+            min(self.role_mentions, 0xFFFF),
+            min(self.channel_mentions, 0xFFFF),
+            self.flags,
+        )
+
+
+def read_events(file: BinaryIO, /) -> Iterator[RelayEvent]:
+    """The events of a recording, in the order they were recorded.
+
+    A last event that was cut off, like when the bot was killed while appending, is skipped.
+    """
+    header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return
+
+    magic, version = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise RecordingError("The file is not a traffic recording.")
+    if version != RECORDING_VERSION:
+        raise RecordingError(f"The recording is version {version}, expected {RECORDING_VERSION}.")
+
+    while True:
+        chunk = file.read(EVENT.size * 4096)
+        # only whole events, a partial one at the end is dropped.
+        usable = len(chunk) - len(chunk) % EVENT.size
+        for values in EVENT.iter_unpack(chunk[:usable]):
+            yield RelayEvent(*values)
+        if len(chunk) < EVENT.size * 4096:
+            return
+
+
+class TrafficRecorder:
+    """Records the shape of the global chat traffic, for replaying it in load tests.
+
+    Only what :class:`RelayEvent` holds is recorded: no content, authors or guilds. Events are
+    buffered and appended to the file by a background task, :data:`EVENT` bytes each.
+    Add :meth:`record` as a consumer of the ``MessageDispatcher``.
+
+    Parameters
+    ----------
+    bot : Sincroni
+        The bot, used to look up the global chat of a message.
+    path : str
+        The file to append to. It is created if it doesn't exist.
+    flush_interval : float
+        Seconds between writes to the file.
+    """
+
+    def __init__(self, bot: Sincroni, path: str, *, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.bot: Sincroni = bot
+        self.path: str = path
+        self.flush_interval: float = flush_interval
+        self.recorded: int = 0
+
+        self._buffer: List[bytes] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"<TrafficRecorder path={self.path} recorded={self.recorded} pending={len(self._buffer)}>"
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+
+    async def record(self, prepared: PreparedMessage, /) -> None:
+        global_chat = self.bot.db.get_global_chat(prepared.message.channel.id)
+        if global_chat is None:
+            return
+
+        self._buffer.append(RelayEvent.from_message(prepared.message, global_chat.raw_chat_type).pack())
+        self.recorded += 1
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+
+        data, self._buffer = b"".join(self._buffer), []
+        try:
+            await asyncio.to_thread(self._append, self.path, data)
+        except (OSError, RecordingError) as err:
+            traceback.print_exception(type(err), err, err.__traceback__)
+
+    @staticmethod
+    def _append(path: str, data: bytes) -> None:
+        with open(path, "ab+") as file:
+            if file.tell() == 0:
+                file.write(HEADER.pack(MAGIC, RECORDING_VERSION))
+            else:
+                file.seek(0)
+                magic, version = HEADER.unpack(file.read(HEADER.size).ljust(HEADER.size, b"\0"))
+                if magic != MAGIC or version != RECORDING_VERSION:
+                    raise RecordingError(f"{path} is not a version {RECORDING_VERSION} traffic recording.")
+
+                # drop an event that was cut off, so the ones after it line up again.
+                size = os.fstat(file.fileno()).st_size
+                partial = (size - HEADER.size) % EVENT.size
+                if partial:
+                    file.truncate(size - partial)
+                file.seek(0, os.SEEK_END)
+
+            file.write(data)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import traceback
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from main import Sincroni
+
+DEFAULT_MAX_MESSAGES = 50_000
+# messages are almost always edited or deleted shortly after they are sent.
+DEFAULT_TTL = 24 * 60 * 60
+# copies waiting in memory to be inserted when persisting, the oldest are dropped past it.
+DEFAULT_MAX_BUFFERED = 100_000
+# every copy takes three unsigned 64 bit integers: channel ID, message ID and webhook ID (0 for none).
+FIELDS = 3
+
+
+class RelayedCopy:
+    """A copy of an origin message that was posted in another global chat.
+
+    Attributes
+    ----------
+    channel_id : int
+        The channel (or thread) it was posted in.
+    message_id : int
+        The ID of the copy.
+    webhook_id : Optional[int]
+        The webhook that posted it. ``None`` if the bot sent it.
+    """
+
+    __slots__ = ("channel_id", "message_id", "webhook_id")
+
+    def __init__(self, channel_id: int, message_id: int, webhook_id: Optional[int]) -> None:
+        self.channel_id: int = channel_id
+        self.message_id: int = message_id
+        self.webhook_id: Optional[int] = webhook_id
+
+    def __repr__(self) -> str:
+        return f"<RelayedCopy channel_id={self.channel_id} message_id={self.message_id} webhook_id={self.webhook_id}>"
+
+
+class RelayStore:
+    """Maps origin message IDs to the copies relayed to other global chats.
+
+    The most recent ``max_messages`` origins are kept in memory for ``ttl`` seconds, each as one
+    flat ``array`` of IDs. With ``persist`` the copies are also inserted into
+    ``SINCRONI_RELAYED_MESSAGES`` in batches, and looked up there when they are not in memory.
+    While the database is down, at most ``max_buffered`` copies wait to be inserted.
+
+    Parameters
+    ----------
+    bot : Sincroni
+        The bot, used for the database.
+    max_messages : int
+        The most origin messages kept in memory, the least recently used are dropped first.
+    ttl : float
+        Seconds an origin message is kept for.
+    persist : bool
+        Whether to store the copies in the database too.
+    flush_interval : float
+        How often buffered rows are inserted when persisting.
+    max_buffered : int
+        The most rows kept in memory until they are inserted, the oldest are dropped first.
+    """
+
+    def __init__(
+        self,
+        bot: Sincroni,
+        *,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        ttl: float = DEFAULT_TTL,
+        persist: bool = False,
+        flush_interval: float = 2.0,
+        max_buffered: int = DEFAULT_MAX_BUFFERED,
+    ) -> None:
+        self.bot: Sincroni = bot
+        self.max_messages: int = max_messages
+        self.ttl: float = ttl
+        self.persist: bool = persist
+        self.flush_interval: float = flush_interval
+        self.max_buffered: int = max_buffered
+
+        self._entries: OrderedDict[int, Tuple[float, array[int]]] = OrderedDict()
+        self._buffer: List[Tuple[int, int, int, Optional[int]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._purged_at: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<RelayStore messages={len(self)} max_messages={self.max_messages} persist={self.persist}>"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def start(self) -> None:
+        if self.persist and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if not (self.persist and self.bot.db.connected):
+            return
+
+        try:
+            await self.flush()
+        except Exception as err:
+            # the rest of the shutdown still has to run.
+            traceback.print_exception(type(err), err, err.__traceback__)
+
+    def add(self, origin_id: int, channel_id: int, message_id: int, webhook_id: Optional[int] = None) -> None:
+        """Record a copy of an origin message."""
+        entry = self._entries.get(origin_id)
+        if entry is None:
+            entry = self._entries[origin_id] = (time.monotonic(), array("Q"))
+            while len(self._entries) > self.max_messages:
+                self._entries.popitem(last=False)
+
+        entry[1].extend((channel_id, message_id, webhook_id or 0))
+
+        if self.persist:
+            self._buffer.append((origin_id, channel_id, message_id, webhook_id))
+            self._trim()
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.bot.metrics.dropped.inc("relay_store_overflow", amount=overflow)
+
+    def _get_cached(self, origin_id: int) -> Optional[array[int]]:
+        entry = self._entries.get(origin_id)
+        if entry is None:
+            return None
+
+        stored_at, ids = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[origin_id]
+            return None
+
+        self._entries.move_to_end(origin_id)
+        return ids
+
+    async def get(self, origin_id: int) -> List[RelayedCopy]:
+        """The copies of an origin message. Empty if it was not relayed or was forgotten."""
+        ids = self._get_cached(origin_id)
+        if ids is not None:
+            return [
+                RelayedCopy(ids[index], ids[index + 1], ids[index + 2] or None) for index in range(0, len(ids), FIELDS)
+            ]
+
+        if not self.persist:
+            return []
+
+        # copies still waiting to be inserted are read from the buffer, without writing to the database here.
+        copies = [RelayedCopy(*row[1:]) for row in self._buffer if row[0] == origin_id]
+        rows = await self.bot.db.fetch_relayed_messages(origin_id, self.ttl)
+        return copies + [RelayedCopy(row["channel_id"], row["message_id"], row["webhook_id"]) for row in rows]
+
+    async def pop(self, origin_id: int) -> List[RelayedCopy]:
+        """Like :meth:`get`, but forgets the origin message as well."""
+        copies = await self.get(origin_id)
+        self._entries.pop(origin_id, None)
+
+        if self.persist and copies:
+            self._buffer = [row for row in self._buffer if row[0] != origin_id]
+            await self.bot.db.remove_relayed_messages(origin_id)
+
+        return copies
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+
+        rows, self._buffer = self._buffer, []
+        try:
+            await self.bot.db.add_relayed_messages(rows)
+        except Exception:
+            # keep them for the next flush.
+            self._buffer[:0] = rows
+            self._trim()
+            raise
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self.bot.db.connected:
+                continue
+
+            try:
+                await self.flush()
+
+                if time.monotonic() - self._purged_at > 60 * 60:
+                    self._purged_at = time.monotonic()
+                    await self.bot.db.purge_relayed_messages(self.ttl)
+            except Exception as err:
+                traceback.print_exception(type(err), err, err.__traceback__)
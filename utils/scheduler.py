@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import aiohttp
+
+from .delivery import DEFAULT_CONCURRENCY
+
+T = TypeVar("T")
+
+# ("webhook", webhook_id) or ("channel", channel_id)
+DestinationKey = Tuple[str, int]
+
+# discord's documented defaults, replaced by whatever the response headers say.
+WEBHOOK_RATE = (5, 2.0)
+CHANNEL_RATE = (5, 5.0)
+
+webhook_url_regex = re.compile(r"/webhooks/(?P<id>[0-9]{15,20})/")
+
+
+class TokenBucket:
+    """A rate limit bucket for a single destination.
+
+    Parameters
+    ----------
+    limit : int
+        The amount of requests allowed per window.
+    per : float
+        The length of the window in seconds.
+    """
+
+    def __init__(self, limit: int, per: float) -> None:
+        self.limit: int = limit
+        self.per: float = per
+        self.remaining: int = limit
+        self.reset_at: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<TokenBucket limit={self.limit} per={self.per} remaining={self.remaining}>"
+
+    def acquire(self) -> float:
+        """Take a token from the bucket.
+
+        Returns
+        -------
+        float
+            ``0.0`` if a token was taken, otherwise how many seconds to wait before trying again.
+        """
+        now = time.monotonic()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+
+        if self.remaining > 0:
+            self.remaining -= 1
+            return 0.0
+
+        return self.reset_at - now
+
+    def update(self, limit: Optional[int], remaining: Optional[int], reset_after: Optional[float]) -> None:
+        """Update the bucket from the rate limit headers of a response."""
+        if limit:
+            self.limit = limit
+        if remaining is not None:
+            self.remaining = remaining
+        if reset_after is not None:
+            self.reset_at = time.monotonic() + reset_after
+            if limit:
+                self.per = max(self.per, reset_after)
+
+
+class QueueStats:
+    """Statistics of a single destination queue.
+
+    Attributes
+    ----------
+    depth : int
+        The amount of messages waiting to be sent.
+    sent : int
+        The amount of messages that were sent or failed.
+    total_wait : float
+        Seconds the sent messages spent in the queue combined.
+    max_wait : float
+        The longest a single message spent in the queue.
+    """
+
+    def __init__(self) -> None:
+        self.depth: int = 0
+        self.sent: int = 0
+        self.total_wait: float = 0.0
+        self.max_wait: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<QueueStats depth={self.depth} sent={self.sent} average_wait={self.average_wait:.3f}>"
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.sent if self.sent else 0.0
+
+
+class DeliveryScheduler:
+    """Queues relayed messages per webhook and per channel.
+
+    Each destination has its own queue and :class:`TokenBucket` that is drained by its own
+    task, one send at a time, so a rate limited or slow destination only delays itself. The
+    buckets start at discord's documented limits and are corrected from the ``X-RateLimit-*``
+    headers seen by :attr:`trace_config`.
+
+    Parameters
+    ----------
+    concurrency : int
+        The maximum amount of requests in flight across every destination. A send holds its
+        slot until it is done, unless it gets a 429: discord.py then sleeps before retrying it,
+        and the destinations it is sleeping on don't hold back the healthy ones.
+    idle_timeout : float
+        Seconds a destination's task waits for new messages before it stops.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        *,
+        idle_timeout: float = 60.0,
+    ) -> None:
+        self.concurrency: int = max(1, concurrency)
+        self.idle_timeout: float = idle_timeout
+
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(self.concurrency)
+        self._queues: Dict[DestinationKey, asyncio.Queue] = {}
+        self._workers: Dict[DestinationKey, asyncio.Task] = {}
+        self._buckets: Dict[DestinationKey, TokenBucket] = {}
+        self._stats: Dict[DestinationKey, QueueStats] = {}
+        # set when the send holding a slot for a destination got a 429.
+        self._rate_limited: Dict[DestinationKey, asyncio.Event] = {}
+
+        self.trace_config: aiohttp.TraceConfig = aiohttp.TraceConfig()
+        self.trace_config.on_request_end.append(self._on_request_end)
+
+    def __repr__(self) -> str:
+        return f"<DeliveryScheduler concurrency={self.concurrency} destinations={len(self._queues)}>"
+
+    def get_bucket(self, key: DestinationKey, /) -> TokenBucket:
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(*(WEBHOOK_RATE if key[0] == "webhook" else CHANNEL_RATE))
+
+        return self._buckets[key]
+
+    def submit(self, key: DestinationKey, send: Callable[[], Awaitable[T]], /) -> asyncio.Future[T]:
+        """Queue a send for a destination.
+
+        Parameters
+        ----------
+        key : DestinationKey
+            ``("webhook", webhook_id)`` or ``("channel", channel_id)``.
+        send : Callable[[], Awaitable[T]]
+            Creates the request once it is the destination's turn.
+
+        Returns
+        -------
+        asyncio.Future[T]
+            Resolves with the result of ``send`` or the exception it raised.
+        """
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+
+        if key not in self._queues:
+            self._queues[key] = asyncio.Queue()
+            self._stats.setdefault(key, QueueStats())
+
+        self._queues[key].put_nowait((send, future, time.monotonic()))
+        self._stats[key].depth += 1
+
+        worker = self._workers.get(key)
+        if worker is None or worker.done():
+            self._workers[key] = asyncio.create_task(self._drain(key))
+
+        return future
+
+    async def _drain(self, key: DestinationKey) -> None:
+        queue = self._queues[key]
+        stats = self._stats[key]
+        bucket = self.get_bucket(key)
+
+        while True:
+            try:
+                send, future, enqueued_at = await asyncio.wait_for(queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self._queues[key]
+                    del self._workers[key]
+                    del self._stats[key]
+                    if self._buckets[key].reset_at <= time.monotonic():
+                        del self._buckets[key]
+                    return
+                continue
+
+            while (delay := bucket.acquire()) > 0:
+                await asyncio.sleep(delay)
+
+            waited = time.monotonic() - enqueued_at
+            stats.depth -= 1
+            stats.sent += 1
+            stats.total_wait += waited
+            stats.max_wait = max(stats.max_wait, waited)
+
+            if future.done():
+                continue
+
+            await self._semaphore.acquire()
+            task = asyncio.ensure_future(send())
+            try:
+                await self._hold_slot(key, task)
+                result = await task
+            except asyncio.CancelledError:
+                # closing, let whoever is waiting know it was not sent.
+                task.cancel()
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as err:
+                self._learn_from_error(key, err)
+                if not future.done():
+                    future.set_exception(err)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    async def _hold_slot(self, key: DestinationKey, task: asyncio.Future) -> None:
+        """Release the slot taken for ``task`` once it is done or gets a 429."""
+        rate_limited = self._rate_limited[key] = asyncio.Event()
+        waiter = asyncio.ensure_future(rate_limited.wait())
+        try:
+            await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            del self._rate_limited[key]
+            self._semaphore.release()
+
+    def _learn_from_error(self, key: DestinationKey, err: Exception) -> None:
+        response = getattr(err, "response", None)
+        if response is not None and getattr(response, "status", None) == 429:
+            self._update_bucket(key, response.headers)
+
+    def _update_bucket(self, key: DestinationKey, headers: Any) -> None:
+        limit = headers.get("X-RateLimit-Limit")
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After") or headers.get("Retry-After")
+
+        if limit is None and remaining is None and reset_after is None:
+            return
+
+        self.get_bucket(key).update(
+            int(limit) if limit is not None else None,
+            int(remaining) if remaining is not None else None,
+            float(reset_after) if reset_after is not None else None,
+        )
+
+    async def _on_request_end(
+        self,
+        session: aiohttp.ClientSession,
+        trace_config_ctx: Any,
+        params: aiohttp.TraceRequestEndParams,
+    ) -> None:
+        match = webhook_url_regex.search(params.url.path)
+        if match:
+            key: DestinationKey = ("webhook", int(match.group("id")))
+            # the mod log, edits and deletes use the session too, without ever being drained here.
+            if key not in self._buckets and key not in self._queues:
+                return
+
+            self._update_bucket(key, params.response.headers)
+
+            # discord.py sleeps and retries it, without the slot.
+            if params.response.status == 429 and key in self._rate_limited:
+                self._rate_limited[key].set()
+
+    def stats(self) -> Dict[DestinationKey, QueueStats]:
+        """Queue depth and wait times of every destination that has been sent to."""
+        return dict(self._stats)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(stats.depth for stats in self._stats.values())
+
+    async def close(self) -> None:
+        for worker in self._workers.values():
+            worker.cancel()
+
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, future, _ = queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+
+        self._queues.clear()
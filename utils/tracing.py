@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import random
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Union
+
+# how many finished traces are kept for the traces command.
+DEFAULT_BUFFER_SIZE = 256
+# seconds between writes of the sampled traces to the export file.
+DEFAULT_EXPORT_INTERVAL = 5.0
+
+SERVICE_NAME = "sincroni"
+# OTLP span kinds and status codes.
+_SPAN_KIND_INTERNAL = 1
+_STATUS_ERROR = 2
+
+# the span the stages of the running task are nested in.
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP JSON encodes 64 bit integers as strings, IDs don't fit in a double.
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _attribute_value(value)} for key, value in attributes.items()]
+
+
+class Span:
+    """A timed stage of a :class:`Trace`, used as a context manager around it.
+
+    Attributes
+    ----------
+    name : str
+        What the stage is.
+    parent : Optional[Span]
+        The span it is nested in, ``None`` for the stages of the trace itself.
+    start_ns : int
+        When it started, from ``time.perf_counter_ns``.
+    end_ns : int
+        When it ended, ``0`` while it runs.
+    error : Optional[str]
+        The name of the exception raised inside it.
+    """
+
+    __slots__ = ("name", "parent", "span_id", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, name: str, parent: Optional[Span]) -> None:
+        self.name: str = name
+        self.parent: Optional[Span] = parent
+        self.span_id: str = f"{random.getrandbits(64):016x}"
+        self.start_ns: int = 0
+        self.end_ns: int = 0
+        self.error: Optional[str] = None
+        self._token: Optional[contextvars.Token] = None
+
+    def __repr__(self) -> str:
+        return f"<Span name={self.name} duration={self.duration / 1e6:.3f}ms>"
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Optional[type], exc: Optional[BaseException], tb: Any) -> None:
+        self.end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+
+    @property
+    def duration(self) -> int:
+        """Nanoseconds it took."""
+        return self.end_ns - self.start_ns if self.end_ns else 0
+
+    @property
+    def depth(self) -> int:
+        depth, parent = 0, self.parent
+        while parent is not None:
+            depth, parent = depth + 1, parent.parent
+        return depth
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, exc_type: Optional[type], exc: Optional[BaseException], tb: Any) -> None:
+        pass
+
+
+class Trace:
+    """The stages of relaying one message.
+
+    Stages are timed with ``with trace.span("name"):``, a span started inside another one
+    of the same task is nested in it.
+
+    Attributes
+    ----------
+    name : str
+        What is traced.
+    trace_id : str
+        The OTLP trace ID, 32 hex digits.
+    attributes : Dict[str, Any]
+        What the trace is about, like the message and channel IDs.
+    spans : List[Span]
+        Every stage, in the order they started.
+    start_ns : int
+        When it started, from ``time.perf_counter_ns``.
+    end_ns : int
+        When it finished, ``0`` until then.
+    """
+
+    __slots__ = ("name", "trace_id", "attributes", "spans", "start_ns", "end_ns", "_epoch_ns")
+
+    sampled: bool = True
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        self.name: str = name
+        self.trace_id: str = f"{random.getrandbits(128):032x}"
+        self.attributes: Dict[str, Any] = attributes
+        self.spans: List[Span] = []
+        self.start_ns: int = time.perf_counter_ns()
+        self.end_ns: int = 0
+        # perf_counter_ns has no epoch, this turns it into unix time for the export.
+        self._epoch_ns: int = time.time_ns() - self.start_ns
+
+    def __repr__(self) -> str:
+        return f"<Trace name={self.name} spans={len(self.spans)} duration={self.duration / 1e6:.3f}ms>"
+
+    def span(self, name: str, /) -> Span:
+        span = Span(name, _current_span.get())
+        self.spans.append(span)
+        return span
+
+    def end(self) -> None:
+        self.end_ns = time.perf_counter_ns()
+
+    def walk(self) -> List[Span]:
+        """The spans with every one followed by the ones nested in it, concurrent stages aren't interleaved."""
+        children: Dict[Optional[Span], List[Span]] = {}
+        for span in self.spans:
+            children.setdefault(span.parent, []).append(span)
+
+        ordered: List[Span] = []
+        stack = list(reversed(children.get(None, [])))
+        while stack:
+            span = stack.pop()
+            ordered.append(span)
+            stack.extend(reversed(children.get(span, [])))
+        return ordered
+
+    @property
+    def duration(self) -> int:
+        """Nanoseconds it took, until now if it didn't finish."""
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    def to_otlp(self) -> List[Dict[str, Any]]:
+        """The trace as OTLP JSON spans, its own being the root of the stages."""
+        root_id = f"{random.getrandbits(64):016x}"
+        spans = [
+            {
+                "traceId": self.trace_id,
+                "spanId": root_id,
+                "name": self.name,
+                "kind": _SPAN_KIND_INTERNAL,
+                "startTimeUnixNano": str(self._epoch_ns + self.start_ns),
+                "endTimeUnixNano": str(self._epoch_ns + (self.end_ns or self.start_ns)),
+                "attributes": _attributes(self.attributes),
+            }
+        ]
+
+        for span in self.spans:
+            data: Dict[str, Any] = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent.span_id if span.parent is not None else root_id,
+                "name": span.name,
+                "kind": _SPAN_KIND_INTERNAL,
+                "startTimeUnixNano": str(self._epoch_ns + span.start_ns),
+                # a stage that never ended, like one still waiting when the trace finished.
+                "endTimeUnixNano": str(self._epoch_ns + (span.end_ns or self.end_ns or span.start_ns)),
+            }
+            if span.error is not None:
+                data["status"] = {"code": _STATUS_ERROR, "message": span.error}
+            spans.append(data)
+
+        return spans
+
+
+class _NullTrace:
+    """What unsampled messages get, its spans record nothing."""
+
+    __slots__ = ()
+
+    sampled: bool = False
+    _span: _NullSpan = _NullSpan()
+
+    def __repr__(self) -> str:
+        return "<NullTrace>"
+
+    def span(self, name: str, /) -> _NullSpan:
+        return self._span
+
+    def end(self) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Tracer:
+    """Samples traces of relayed messages, keeps the recent ones and optionally exports them.
+
+    Unsampled messages get :data:`NULL_TRACE`, whose spans cost a method call each.
+    Exported traces are written in the OTLP JSON file format, one ``ExportTraceServiceRequest``
+    per line, by a background task.
+
+    Parameters
+    ----------
+    sample_rate : float
+        The fraction of messages to trace, between 0 and 1.
+    buffer_size : int
+        How many finished traces to keep.
+    export_path : Optional[str]
+        The file the traces are appended to, ``None`` to not export them.
+    export_interval : float
+        Seconds between writes to the export file.
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_rate: float = 0.0,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        export_path: Optional[str] = None,
+        export_interval: float = DEFAULT_EXPORT_INTERVAL,
+    ) -> None:
+        self.sample_rate: float = max(0.0, min(sample_rate, 1.0))
+        self.export_path: Optional[str] = export_path
+        self.export_interval: float = export_interval
+        self.traces: Deque[Trace] = deque(maxlen=buffer_size)
+
+        self._pending: List[Trace] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"<Tracer sample_rate={self.sample_rate} traces={len(self.traces)} export_path={self.export_path}>"
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def new_trace(self, name: str, **attributes: Any) -> Union[Trace, _NullTrace]:
+        """Start a trace, or get :data:`NULL_TRACE` if it isn't sampled."""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return NULL_TRACE
+        return Trace(name, attributes)
+
+    def finish(self, trace: Union[Trace, _NullTrace], /) -> None:
+        if not isinstance(trace, Trace):
+            return
+
+        trace.end()
+        self.traces.append(trace)
+        if self.export_path is not None:
+            self._pending.append(trace)
+
+    def slowest(self, limit: int = 5, /) -> List[Trace]:
+        return sorted(self.traces, key=lambda trace: trace.duration, reverse=True)[:limit]
+
+    def start(self) -> None:
+        if self.export_path is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Append the pending traces to the export file."""
+        if not self._pending or self.export_path is None:
+            return
+
+        traces, self._pending = self._pending, []
+        # serialised in the event loop, the spans of a finished trace don't change anymore.
+        line = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {"attributes": _attributes({"service.name": SERVICE_NAME})},
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": __name__},
+                                "spans": [span for trace in traces for span in trace.to_otlp()],
+                            }
+                        ],
+                    }
+                ]
+            },
+            separators=(",", ":"),
+        )
+
+        try:
+            await asyncio.to_thread(self._write, self.export_path, line)
+        except OSError as err:
+            traceback.print_exception(type(err), err, err.__traceback__)
+
+    @staticmethod
+    def _write(path: str, line: str) -> None:
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.export_interval)
+            await self.flush()
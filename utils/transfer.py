@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import csv
+import json
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, Iterator, Tuple
+
+from .extra import FilterType
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession
+
+    from .database.models import Blacklist
+
+FORMATS = ("csv", "jsonl")
+# the columns of an exported blacklist, the server is the one it is imported into.
+BLACKLIST_FIELDS = ("entity_id", "blacklist_type", "pub", "dev", "private", "repeat", "reason")
+BOOLEAN_FIELDS = ("pub", "dev", "private", "repeat")
+
+# what the blacklist command defaults to, for the columns a row leaves out. add_blacklist defaults pub to False.
+IMPORT_DEFAULTS: Dict[str, Any] = {"pub": True}
+
+_TRUE = ("1", "true", "yes", "y")
+_FALSE = ("0", "false", "no", "n")
+
+
+def parse_blacklist(row: Dict[str, Any], /) -> Dict[str, Any]:
+    """Turn an imported row into an entry for :meth:`DatabaseConnection.add_blacklists`.
+
+    Empty or missing columns get the defaults of the blacklist command, so a row with only an
+    ``entity_id`` is blacklisted in the public global chat.
+
+    Raises
+    ------
+    ValueError
+        The row has no valid ``entity_id`` or a column has an invalid value.
+    """
+    entity_id = row.get("entity_id")
+    if entity_id is None or not str(entity_id).strip().isdigit():
+        raise ValueError(f"invalid entity_id {entity_id!r}")
+
+    entry: Dict[str, Any] = {**IMPORT_DEFAULTS, "entity_id": int(entity_id)}
+
+    blacklist_type = row.get("blacklist_type")
+    if blacklist_type not in (None, ""):
+        value = str(blacklist_type).strip().lower()
+        if value.isdigit() and int(value) in FilterType._value2member_map_:
+            entry["blacklist_type"] = FilterType(int(value))
+        elif value in FilterType.__members__:
+            entry["blacklist_type"] = FilterType[value]
+        else:
+            raise ValueError(f"invalid blacklist_type {blacklist_type!r}")
+
+    for field in BOOLEAN_FIELDS:
+        value = row.get(field)
+        if value in (None, ""):
+            continue
+        if isinstance(value, bool):
+            entry[field] = value
+        elif str(value).strip().lower() in _TRUE:
+            entry[field] = True
+        elif str(value).strip().lower() in _FALSE:
+            entry[field] = False
+        else:
+            raise ValueError(f"invalid {field} {value!r}")
+
+    if reason := row.get("reason"):
+        entry["reason"] = str(reason)
+
+    return entry
+
+
+def read_rows(file: IO[str], format: str, /) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Read ``(line, row)`` pairs one at a time. CSV needs a header, JSONL an object per line."""
+    if format == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            # yielded either way, so the caller counts it as invalid.
+            yield line_number, row if isinstance(row, dict) else {}
+
+
+def write_rows(file: IO[str], format: str, blacklists: Iterable[Blacklist], /) -> int:
+    """Write blacklists one at a time in the columns of :data:`BLACKLIST_FIELDS`, returning how many."""
+    count = 0
+    if format == "csv":
+        writer = csv.writer(file)
+        writer.writerow(BLACKLIST_FIELDS)
+        for blacklist in blacklists:
+            writer.writerow(
+                (
+                    blacklist.entity_id,
+                    blacklist.blacklist_type.name,
+                    blacklist.pub,
+                    blacklist.dev,
+                    blacklist.private,
+                    blacklist.repeat,
+                    blacklist.reason or "",
+                )
+            )
+            count += 1
+    else:
+        for blacklist in blacklists:
+            row = {field: getattr(blacklist, field) for field in BLACKLIST_FIELDS}
+            row["blacklist_type"] = blacklist.blacklist_type.name
+            file.write(json.dumps(row) + "\n")
+            count += 1
+
+    return count
+
+
+async def download(session: ClientSession, url: str, file: IO[bytes], /, *, chunk_size: int = 64 * 1024) -> int:
+    """Download into a file a chunk at a time, returning how many bytes were written."""
+    size = 0
+    async with session.get(url) as response:
+        response.raise_for_status()
+        async for chunk in response.content.iter_chunked(chunk_size):
+            file.write(chunk)
+            size += len(chunk)
+
+    file.seek(0)
+    return size